@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks reproduzíveis do pagto
+Gera livros-caixa sintéticos, mede as operações principais e grava JSON comparável
+
+Uso:
+    python benchmarks/benchmark.py executar --linhas 10000,100000 --saida base.json
+    python benchmarks/benchmark.py executar --completo --diretorio /tmp/pagto-bench
+    python benchmarks/benchmark.py comparar base.json novo.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import platform
+import argparse
+import tempfile
+import statistics
+import subprocess
+from contextlib import redirect_stdout
+from datetime import datetime
+from typing import Callable, Dict, List
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import pagto  # noqa: E402
+from benchmarks.gerador import (  # noqa: E402
+    popular_banco, adicionar_argumentos_gerador, parametros_gerador
+)
+
+
+TAMANHOS_PADRAO = [10000, 100000]
+TAMANHOS_COMPLETOS = [10000, 100000, 1000000, 10000000]
+
+
+def cenarios(gerenciador: 'pagto.GerenciadorPagamentos') -> Dict[str, Callable]:
+    """Operações medidas em cada tamanho de banco"""
+    return {
+        'listar_todos': lambda: gerenciador.listar_todos(),
+        'listar_todos_contexto': lambda: gerenciador.listar_todos(filtros={'contexto': 'fazenda'}),
+        'listar_todos_filtros': lambda: gerenciador.listar_todos(
+            filtros={'valor': '>100', 'pendente': 's', 'beneficiario': 'silva'}),
+        'listar_todos_sort_valor': lambda: gerenciador.listar_todos(ordenacao='-valor'),
+        'listar_todos_sort_data': lambda: gerenciador.listar_todos(ordenacao='-data'),
+        'listar_deletados': lambda: gerenciador.listar_deletados(),
+        'agregrar_por_categoria': lambda: gerenciador.agregrar_por_categoria(),
+        'agregrar_por_categoria_filtros': lambda: gerenciador.agregrar_por_categoria(
+            filtros={'contexto': 'pessoal', 'conta': 'nubank'}),
+        'listar_contextos': lambda: gerenciador.listar_contextos(),
+        'buscar_por_id': lambda: gerenciador.buscar_por_id(1),
+    }
+
+
+def medir(funcao: Callable, repeticoes: int) -> Dict:
+    """Executa a função várias vezes e retorna estatísticas em milissegundos"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        'min_ms': round(min(tempos), 3),
+        'mediana_ms': round(statistics.median(tempos), 3),
+        'max_ms': round(max(tempos), 3),
+        'repeticoes': repeticoes,
+    }
+
+
+def medir_insercao(gerenciador: 'pagto.GerenciadorPagamentos', quantidade: int) -> Dict:
+    """Mede a vazão de adicionar_pagamento (um commit por pagamento, como no 'pagto novo')"""
+    inicio = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        for n in range(quantidade):
+            gerenciador.adicionar_pagamento(pagto.Pagamento(
+                categoria='Benchmark', beneficiario=f'Inserção {n}', conta='Nubank',
+                valor=10.0 + n, contexto='benchmark'
+            ))
+    duracao = time.perf_counter() - inicio
+    return {
+        'quantidade': quantidade,
+        'total_ms': round(duracao * 1000, 3),
+        'linhas_por_s': round(quantidade / duracao, 1) if duracao else None,
+    }
+
+
+def medir_partida_a_frio(config_dir: str, repeticoes: int) -> Dict:
+    """Mede um processo novo executando 'pagto contextos' contra o banco gerado"""
+    ambiente = dict(os.environ, PAGTO_DIR=config_dir, PAGTO_LENTAS_MS="-1")
+    comando = [sys.executable, os.path.join(RAIZ, 'pagto.py'), 'contextos']
+
+    def executar():
+        subprocess.run(comando, env=ambiente, stdout=subprocess.DEVNULL, check=True)
+
+    return medir(executar, repeticoes)
+
+
+def versao_pagto() -> str:
+    """Identifica a versão do código medido (commit git, se disponível)"""
+    try:
+        saida = subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=RAIZ,
+                               capture_output=True, text=True, check=True)
+        return saida.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconhecida"
+
+
+def executar_benchmark(args: argparse.Namespace):
+    """Gera os bancos, mede os cenários e grava o JSON de resultados"""
+    tamanhos = TAMANHOS_COMPLETOS if args.completo else [int(t) for t in args.linhas.split(',')]
+    parametros = parametros_gerador(args)
+    base_dir = args.diretorio or tempfile.mkdtemp(prefix='pagto-bench-')
+    # Não queremos medir o custo de gravar o log de lentas
+    pagto.LIMIAR_LENTAS_MS = -1
+
+    relatorio = {
+        'rotulo': args.rotulo or versao_pagto(),
+        'versao': versao_pagto(),
+        'momento': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'plataforma': platform.platform(),
+        'parametros': parametros,
+        'resultados': {},
+    }
+
+    try:
+        for linhas in tamanhos:
+            config_dir = os.path.join(base_dir, f"{linhas}")
+            print(f"→ Gerando {linhas} linhas em {config_dir}...", file=sys.stderr)
+            inicio = time.perf_counter()
+            popular_banco(config_dir, linhas, **parametros)
+            geracao_ms = (time.perf_counter() - inicio) * 1000
+
+            gerenciador = pagto.GerenciadorPagamentos(comando="benchmark")
+            resultados = {'geracao_ms': round(geracao_ms, 3)}
+            for nome, funcao in cenarios(gerenciador).items():
+                print(f"  · {nome}", file=sys.stderr)
+                resultados[nome] = medir(funcao, args.repeticoes)
+            resultados['partida_a_frio'] = medir_partida_a_frio(config_dir, args.repeticoes)
+            # Por último: a inserção altera o banco, que deixa de ser reaproveitável
+            resultados['insercao'] = medir_insercao(gerenciador, args.insercoes)
+            os.remove(os.path.join(config_dir, "gerador.json"))
+
+            relatorio['resultados'][str(linhas)] = resultados
+    finally:
+        if not args.diretorio:
+            shutil.rmtree(base_dir, ignore_errors=True)
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            f.write(texto + "\n")
+        print(f"✓ Resultados gravados em {args.saida}", file=sys.stderr)
+    else:
+        print(texto)
+
+
+def _tempo(resultado: Dict) -> float:
+    """Tempo representativo de um cenário (mediana, ou total da inserção)"""
+    if 'mediana_ms' in resultado:
+        return resultado['mediana_ms']
+    return resultado.get('total_ms', 0.0)
+
+
+def comparar(args: argparse.Namespace):
+    """Compara dois arquivos de resultados, cenário a cenário"""
+    with open(args.base, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    with open(args.novo, 'r', encoding='utf-8') as f:
+        novo = json.load(f)
+
+    print(f"\nBase: {base['rotulo']}  ({base['momento']})")
+    print(f"Novo: {novo['rotulo']}  ({novo['momento']})")
+    if base.get('parametros') != novo.get('parametros'):
+        print("⚠ Parâmetros do gerador diferentes: a comparação pode não ser justa")
+
+    for linhas, resultados_novos in novo['resultados'].items():
+        resultados_base = base['resultados'].get(linhas)
+        if not resultados_base:
+            continue
+        print(f"\n=== {int(linhas):,} linhas ===\n".replace(",", "."))
+        print(f"{'Cenário':<32} {'Base (ms)':>12} {'Novo (ms)':>12} {'Variação':>10}")
+        print("-" * 70)
+        for nome, resultado in resultados_novos.items():
+            if not isinstance(resultado, dict) or nome not in resultados_base:
+                continue
+            antes, depois = _tempo(resultados_base[nome]), _tempo(resultado)
+            variacao = f"{(depois / antes - 1) * 100:+.1f}%" if antes else "-"
+            print(f"{nome:<32} {antes:>12.2f} {depois:>12.2f} {variacao:>10}")
+    print()
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Benchmarks do pagto")
+    subparsers = parser.add_subparsers(dest='acao', required=True)
+
+    p_executar = subparsers.add_parser('executar', help='Gera bancos sintéticos e mede as operações')
+    p_executar.add_argument('--linhas', default=",".join(str(t) for t in TAMANHOS_PADRAO),
+                            help='Tamanhos separados por vírgula (padrão: 10000,100000)')
+    p_executar.add_argument('--completo', action='store_true',
+                            help='Usa 10k, 100k, 1M e 10M linhas')
+    p_executar.add_argument('--repeticoes', type=int, default=3, help='Repetições por cenário')
+    p_executar.add_argument('--insercoes', type=int, default=200, help='Pagamentos no teste de inserção')
+    p_executar.add_argument('--diretorio', help='Mantém (e reaproveita) os bancos neste diretório')
+    p_executar.add_argument('--rotulo', help='Nome desta execução no JSON (padrão: commit git)')
+    p_executar.add_argument('--saida', help='Arquivo JSON de resultados (padrão: stdout)')
+    adicionar_argumentos_gerador(p_executar)
+
+    p_comparar = subparsers.add_parser('comparar', help='Compara dois arquivos de resultados')
+    p_comparar.add_argument('base')
+    p_comparar.add_argument('novo')
+
+    args = parser.parse_args()
+    if args.acao == 'executar':
+        executar_benchmark(args)
+    else:
+        comparar(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Teste de estresse de escritores concorrentes do pagto
+Vários processos inserem (alguns com comprovante), editam e deletam ao mesmo tempo;
+no fim, confere se nada se perdeu, se os IDs são únicos e se cada comprovante bate com a linha
+
+Uso:
+    python benchmarks/concorrencia.py --processos 8 --pagamentos 200
+    python benchmarks/concorrencia.py --processos 4 --particionado
+"""
+
+import io
+import os
+import sys
+import time
+import shutil
+import sqlite3
+import argparse
+import tempfile
+import multiprocessing
+from contextlib import redirect_stdout
+from typing import Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pagto  # noqa: E402
+
+
+def escritor(config_dir: str, numero: int, quantidade: int, taxa_comprovantes: int,
+             fila: 'multiprocessing.Queue'):
+    """Processo escritor: insere, edita e deleta seus próprios pagamentos"""
+    pagto.definir_diretorio(config_dir)
+    pagto.LIMIAR_LENTAS_MS = -1
+    gerenciador = pagto.GerenciadorPagamentos(comando="concorrencia")
+    origem = os.path.join(config_dir, f"origem_{numero}.pdf")
+    with open(origem, 'wb') as f:
+        f.write(f"comprovante do escritor {numero}".encode())
+
+    erros = []
+    ids = []
+    inicio = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        for n in range(quantidade):
+            try:
+                comprovante = origem if taxa_comprovantes and n % taxa_comprovantes == 0 else None
+                pagamento_id = gerenciador.adicionar_pagamento(pagto.Pagamento(
+                    categoria='Estresse', beneficiario=f'Escritor {numero}', conta='Nubank',
+                    valor=float(n + 1), contexto=f'proc{numero % 3}', observacao=f'{numero}:{n}'
+                ), comprovante)
+                ids.append(pagamento_id)
+                if n % 5 == 0:
+                    gerenciador.atualizar_pagamento(pagamento_id, {'pendente': 1})
+                if n % 10 == 0:
+                    gerenciador.marcar_como_deletado(pagamento_id)
+            except sqlite3.Error as e:
+                erros.append(str(e))
+    fila.put({'numero': numero, 'ids': ids, 'erros': erros, 'tempo_s': time.perf_counter() - inicio})
+
+
+def verificar(config_dir: str, esperados: int) -> Dict:
+    """Confere o banco final contra o que os escritores relataram"""
+    pagto.definir_diretorio(config_dir)
+    registros = pagto.GerenciadorPagamentos(comando="concorrencia").listar_todos(
+        incluir_deletados=True, incluir_arquivados=True)
+    ids = [r.id for r in registros]
+    sem_arquivo = [r.id for r in registros if r.comprovante and
+                   not os.path.exists(os.path.join(pagto.COMPROVANTES_DIR, r.comprovante))]
+    arquivos = set(pagto._listar_arquivos(pagto.COMPROVANTES_DIR))
+    orfaos = arquivos - {r.comprovante for r in registros if r.comprovante}
+    return {
+        'linhas': len(registros),
+        'esperadas': esperados,
+        'ids_unicos': len(set(ids)) == len(ids),
+        'comprovantes_sem_arquivo': sem_arquivo,
+        'arquivos_orfaos': sorted(orfaos),
+        'pendentes': sum(1 for r in registros if r.pendente),
+        'deletados': sum(1 for r in registros if r.deletado),
+    }
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Estresse de escritores concorrentes do pagto")
+    parser.add_argument('--processos', type=int, default=8, help='Processos escritores simultâneos')
+    parser.add_argument('--pagamentos', type=int, default=200, help='Pagamentos inseridos por processo')
+    parser.add_argument('--comprovante-a-cada', type=int, default=4,
+                        help='Um pagamento com comprovante a cada N (0 = nenhum)')
+    parser.add_argument('--particionado', action='store_true', help='Usa o layout de banco por contexto')
+    parser.add_argument('--diretorio', help='Diretório do banco (padrão: temporário, apagado no fim)')
+    args = parser.parse_args()
+
+    config_dir = args.diretorio or tempfile.mkdtemp(prefix='pagto-conc-')
+    pagto.definir_diretorio(config_dir)
+    gerenciador = pagto.GerenciadorPagamentos(comando="concorrencia")
+    if args.particionado:
+        with redirect_stdout(io.StringIO()):
+            gerenciador.particionar()
+
+    try:
+        fila = multiprocessing.Queue()
+        processos = [multiprocessing.Process(target=escritor,
+                                             args=(config_dir, n, args.pagamentos,
+                                                   args.comprovante_a_cada, fila))
+                     for n in range(args.processos)]
+        inicio = time.perf_counter()
+        for p in processos:
+            p.start()
+        relatos = [fila.get() for _ in processos]
+        for p in processos:
+            p.join()
+        duracao = time.perf_counter() - inicio
+
+        erros = [e for r in relatos for e in r['erros']]
+        relatados = [i for r in relatos for i in r['ids']]
+        total = args.processos * args.pagamentos
+        resultado = verificar(config_dir, total)
+
+        layout = "por contexto" if args.particionado else "arquivo único"
+        print(f"\n=== ESCRITORES CONCORRENTES ({args.processos} processos × {args.pagamentos}, {layout}) ===\n")
+        print(f"Tempo total:          {duracao:.2f} s")
+        print(f"Inserções por segundo: {total / duracao:.0f}")
+        print(f"Busy timeout:         {pagto.BUSY_TIMEOUT_MS} ms, {pagto.TENTATIVAS_ESCRITA} tentativas")
+        print(f"Linhas no banco:      {resultado['linhas']} (esperadas: {total})")
+        print(f"Pendentes/deletados:  {resultado['pendentes']}/{resultado['deletados']}")
+
+        falhas = []
+        if erros:
+            falhas.append(f"{len(erros)} erros de SQLite (ex.: {erros[0]})")
+        if resultado['linhas'] != total or len(relatados) != total:
+            falhas.append("quantidade de linhas diferente do esperado")
+        if not resultado['ids_unicos'] or len(set(relatados)) != len(relatados):
+            falhas.append("IDs repetidos")
+        if resultado['comprovantes_sem_arquivo']:
+            falhas.append(f"{len(resultado['comprovantes_sem_arquivo'])} comprovantes sem arquivo")
+        if resultado['arquivos_orfaos']:
+            falhas.append(f"{len(resultado['arquivos_orfaos'])} arquivos de comprovante órfãos")
+
+        if falhas:
+            for falha in falhas:
+                print(f"✗ {falha}")
+            sys.exit(1)
+        print("✓ Nenhuma escrita perdida, IDs únicos e comprovantes consistentes\n")
+    finally:
+        if not args.diretorio:
+            shutil.rmtree(config_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Gerador de livros-caixa sintéticos para benchmarks do pagto
+Cria bancos realistas e reproduzíveis (mesma semente = mesmos dados)
+"""
+
+import os
+import sys
+import json
+import random
+import argparse
+from datetime import date, timedelta
+from typing import Dict, Iterator, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pagto  # noqa: E402
+
+
+# Categorias típicas por contexto; contextos extras usam a lista genérica
+CATEGORIAS_POR_CONTEXTO = {
+    'pessoal': ['Alimentação', 'Transporte', 'Moradia', 'Saúde', 'Lazer', 'Educação', 'Vestuário'],
+    'fazenda': ['TRATOR', 'Combustível', 'Sementes', 'Adubo', 'Veterinário', 'Funcionários', 'Ração'],
+    'trabalho': ['Escritório', 'Viagem', 'Software', 'Impostos', 'Telefone'],
+}
+CATEGORIAS_GENERICAS = ['Serviços', 'Compras', 'Manutenção', 'Taxas', 'Outros']
+
+CONTAS = ['Nubank', 'Itaú', 'Bradesco', 'Caixa', 'Dinheiro', 'Inter', 'Santander']
+PREFIXOS = ['Supermercado', 'Posto', 'Farmácia', 'Loja', 'Oficina', 'Agropecuária', 'Restaurante', 'Padaria']
+SOBRENOMES = ['Silva', 'Souza', 'Oliveira', 'Santos', 'Pereira', 'Lima', 'Costa', 'Almeida', 'Ferreira']
+EXTENSOES = ['.pdf', '.jpg', '.png']
+
+
+def nomes_contextos(quantidade: int) -> List[str]:
+    """Retorna os nomes dos contextos: os conhecidos primeiro, depois 'contexto_N'"""
+    conhecidos = list(CATEGORIAS_POR_CONTEXTO)
+    extras = [f"contexto_{n}" for n in range(1, max(0, quantidade - len(conhecidos)) + 1)]
+    return (conhecidos + extras)[:quantidade]
+
+
+def gerar_pagamentos(linhas: int, semente: int = 42, contextos: int = 3, categorias: int = 7,
+                     dias: int = 3650, taxa_comprovantes: float = 0.3, taxa_deletados: float = 0.05,
+                     taxa_pendentes: float = 0.1, beneficiarios: int = 2000) -> Iterator[Tuple]:
+    """
+    Gera tuplas na ordem das colunas de INSERT do pagto:
+    (categoria, beneficiario, data_pagamento, conta, valor, devendo_para,
+     pendente, deletado, comprovante, observacao, contexto)
+    """
+    rnd = random.Random(semente)
+
+    lista_contextos = nomes_contextos(contextos)
+    # Distribuição desigual: o primeiro contexto grande, os demais menores
+    pesos_contextos = [1.0 / (posicao + 1) for posicao in range(len(lista_contextos))]
+    cats = {
+        ctx: (CATEGORIAS_POR_CONTEXTO.get(ctx, []) + CATEGORIAS_GENERICAS)[:categorias]
+        for ctx in lista_contextos
+    }
+    pool_beneficiarios = [
+        f"{rnd.choice(PREFIXOS)} {rnd.choice(SOBRENOMES)} {n}" for n in range(beneficiarios)
+    ]
+
+    hoje = date.today()
+    inicio = hoje - timedelta(days=dias)
+
+    for posicao in range(linhas):
+        contexto = rnd.choices(lista_contextos, weights=pesos_contextos)[0]
+        categoria = rnd.choice(cats[contexto])
+        # Poucos beneficiários concentram muitos pagamentos (distribuição de Pareto)
+        indice = min(int(rnd.paretovariate(1.2)) - 1, beneficiarios - 1)
+        beneficiario = pool_beneficiarios[indice]
+        data_pag = inicio + timedelta(days=rnd.randrange(dias + 1))
+        valor = round(min(rnd.lognormvariate(5, 1.3), 500000.0), 2)
+        comprovante = ""
+        if rnd.random() < taxa_comprovantes:
+            comprovante = (f"{pagto._pasta_comprovante(posicao + 1)}/{posicao + 1}_"
+                           f"{beneficiario.replace(' ', '_')[:30]}_{int(round(valor))}{rnd.choice(EXTENSOES)}")
+
+        yield (
+            categoria,
+            beneficiario,
+            data_pag.strftime("%d/%m/%Y"),
+            rnd.choice(CONTAS),
+            valor,
+            rnd.choice(SOBRENOMES) if rnd.random() < 0.05 else "",
+            1 if rnd.random() < taxa_pendentes else 0,
+            1 if rnd.random() < taxa_deletados else 0,
+            comprovante,
+            "Gerado para benchmark" if rnd.random() < 0.1 else "",
+            contexto,
+        )
+
+
+def popular_banco(config_dir: str, linhas: int, lote: int = 50000, **parametros) -> Dict:
+    """
+    Cria (ou recria) um banco sintético em config_dir e retorna os parâmetros usados.
+    Se já existir um banco gerado com os mesmos parâmetros, ele é reaproveitado.
+    """
+    parametros = dict(parametros, linhas=linhas)
+    meta_path = os.path.join(config_dir, "gerador.json")
+
+    pagto.definir_diretorio(config_dir)
+    if os.path.exists(meta_path) and os.path.exists(pagto.DB_PATH):
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            if json.load(f) == parametros:
+                return parametros
+
+    os.makedirs(config_dir, exist_ok=True)
+    for sufixo in ("", "-wal", "-shm", "-journal"):
+        if os.path.exists(pagto.DB_PATH + sufixo):
+            os.remove(pagto.DB_PATH + sufixo)
+
+    gerenciador = pagto.GerenciadorPagamentos(comando="gerador")
+    conn = gerenciador._conectar()
+    cursor = conn.cursor()
+
+    dados = gerar_pagamentos(linhas, **{k: v for k, v in parametros.items() if k != 'linhas'})
+    while True:
+        bloco = [linha for _, linha in zip(range(lote), dados)]
+        if not bloco:
+            break
+        cursor.executemany('''
+            INSERT INTO pagamentos
+            (categoria, beneficiario, data_pagamento, conta, valor,
+             devendo_para, pendente, deletado, comprovante, observacao, contexto)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', bloco)
+    conn.commit()
+    conn.close()
+
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(parametros, f, indent=2)
+
+    return parametros
+
+
+def adicionar_argumentos_gerador(parser: argparse.ArgumentParser):
+    """Argumentos de geração compartilhados com o benchmark"""
+    parser.add_argument('--semente', type=int, default=42, help='Semente do gerador aleatório')
+    parser.add_argument('--contextos', type=int, default=3, help='Quantidade de contextos')
+    parser.add_argument('--categorias', type=int, default=7, help='Categorias por contexto')
+    parser.add_argument('--dias', type=int, default=3650, help='Espalhamento das datas (dias até hoje)')
+    parser.add_argument('--taxa-comprovantes', type=float, default=0.3, help='Fração com comprovante')
+    parser.add_argument('--taxa-deletados', type=float, default=0.05, help='Fração deletada')
+    parser.add_argument('--taxa-pendentes', type=float, default=0.1, help='Fração pendente')
+
+
+def parametros_gerador(args: argparse.Namespace) -> Dict:
+    """Extrai os parâmetros de geração dos argumentos da linha de comando"""
+    return {
+        'semente': args.semente,
+        'contextos': args.contextos,
+        'categorias': args.categorias,
+        'dias': args.dias,
+        'taxa_comprovantes': args.taxa_comprovantes,
+        'taxa_deletados': args.taxa_deletados,
+        'taxa_pendentes': args.taxa_pendentes,
+    }
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Gera um livro-caixa sintético para o pagto")
+    parser.add_argument('diretorio', help='Diretório de destino (usado como PAGTO_DIR)')
+    parser.add_argument('--linhas', type=int, default=10000, help='Quantidade de pagamentos')
+    adicionar_argumentos_gerador(parser)
+    args = parser.parse_args()
+
+    parametros = popular_banco(args.diretorio, args.linhas, **parametros_gerador(args))
+    print(f"✓ {args.linhas} pagamentos gerados em {pagto.DB_PATH}")
+    print(f"  Parâmetros: {parametros}")
+    print(f"  Use: PAGTO_DIR={args.diretorio} pagto todos")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de memória (tracemalloc) da representação das linhas de pagamento
+Compara o formato antigo (sqlite3.Row copiado para dict) com o RegistroPagamento
+
+Uso:
+    python benchmarks/memoria.py --linhas 100000
+"""
+
+import os
+import sys
+import shutil
+import time
+import sqlite3
+import argparse
+import tempfile
+import tracemalloc
+from typing import Callable, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pagto  # noqa: E402
+from benchmarks.gerador import popular_banco  # noqa: E402
+
+
+class PagamentoSemSlots:
+    """Réplica do Pagamento sem __slots__ (mesmo __init__), apenas para comparação"""
+
+    __init__ = pagto.Pagamento.__init__
+
+
+def linhas_como_dict():
+    """Formato antigo: row_factory = sqlite3.Row e cópia de cada linha para dict"""
+    conn = sqlite3.connect(pagto.DB_PATH)
+    conn.row_factory = sqlite3.Row
+    linhas = [dict(row) for row in conn.execute(f"SELECT {pagto.COLUNAS_PAGAMENTO} FROM pagamentos")]
+    conn.close()
+    return linhas
+
+
+def linhas_como_registro():
+    """Formato atual: listar_todos devolvendo RegistroPagamento"""
+    return pagto.GerenciadorPagamentos(comando="benchmark").listar_todos(incluir_deletados=True)
+
+
+def medir(funcao: Callable) -> Dict:
+    """Mede pico e memória retida (tracemalloc) e o tempo de uma carga"""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcao()
+    duracao = time.perf_counter() - inicio
+    retido, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    quantidade = len(resultado)
+    del resultado
+    return {
+        'linhas': quantidade,
+        'retido_mb': retido / 1024 / 1024,
+        'pico_mb': pico / 1024 / 1024,
+        'bytes_por_linha': retido / quantidade if quantidade else 0,
+        'tempo_s': duracao,
+    }
+
+
+def medir_objetos(classe, quantidade: int) -> Dict:
+    """Mede a memória de instâncias de Pagamento criadas em massa"""
+    campos = dict(categoria='Alimentação', beneficiario='Mercado', conta='Nubank', valor=10.0,
+                  data_pagamento='01/01/2026')
+    tracemalloc.start()
+    objetos = [classe(**campos) for _ in range(quantidade)]
+    retido, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objetos
+    return {'bytes_por_objeto': retido / quantidade}
+
+
+def main():
+    """Função principal"""
+    parser = argparse.ArgumentParser(description="Benchmark de memória por linha do pagto")
+    parser.add_argument('--linhas', type=int, default=100000, help='Tamanho do banco sintético')
+    parser.add_argument('--diretorio',
+                        help='Diretório do banco (reaproveitado se já gerado; padrão: temporário, apagado no fim)')
+    args = parser.parse_args()
+
+    config_dir = args.diretorio or tempfile.mkdtemp(prefix='pagto-mem-')
+    try:
+        popular_banco(config_dir, args.linhas)
+        pagto.LIMIAR_LENTAS_MS = -1
+
+        print(f"\n=== MEMÓRIA POR LINHA ({args.linhas} pagamentos) ===\n")
+        print(f"{'Formato':<28} {'Retido (MB)':>12} {'Pico (MB)':>11} {'Bytes/linha':>12} {'Tempo (s)':>10}")
+        print("-" * 77)
+        resultados = {}
+        for nome, funcao in (('dict (sqlite3.Row)', linhas_como_dict),
+                             ('RegistroPagamento', linhas_como_registro)):
+            r = medir(funcao)
+            resultados[nome] = r
+            print(f"{nome:<28} {r['retido_mb']:>12.1f} {r['pico_mb']:>11.1f} "
+                  f"{r['bytes_por_linha']:>12.0f} {r['tempo_s']:>10.3f}")
+
+        antes = resultados['dict (sqlite3.Row)']['bytes_por_linha']
+        depois = resultados['RegistroPagamento']['bytes_por_linha']
+        if antes:
+            print(f"\nRedução por linha: {(1 - depois / antes) * 100:.0f}%")
+
+        sem_slots = medir_objetos(PagamentoSemSlots, 100000)['bytes_por_objeto']
+        com_slots = medir_objetos(pagto.Pagamento, 100000)['bytes_por_objeto']
+        print(f"Pagamento: {sem_slots:.0f} bytes sem __slots__ → {com_slots:.0f} bytes com __slots__\n")
+    finally:
+        if not args.diretorio:
+            shutil.rmtree(config_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,22 +7,465 @@ Aplicação de linha de comando para registrar e consultar pagamentos
 
 import os
 import sys
+import io
+import json
+import time
+import re
+import random
+import shutil
 import sqlite3
-from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+import heapq
+import zlib
+import calendar
+import atexit
+import operator
+from array import array
+from bisect import bisect_left
+from itertools import compress, groupby, islice
+from contextlib import contextmanager
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Optional, Tuple, NamedTuple
 from collections import defaultdict
 from pathlib import Path
 
 
-# Configuração de diretórios
-CONFIG_DIR = os.path.expanduser("~/.pagto")
+# Configuração de diretórios (PAGTO_DIR permite usar outro diretório, ex.: benchmarks);
+# banco e comprovantes podem ficar em outro lugar pelo pagto.conf ou por PAGTO_BANCO/PAGTO_COMPROVANTES
+CONFIG_DIR = os.environ.get("PAGTO_DIR") or os.path.expanduser("~/.pagto")
 DB_PATH = os.path.join(CONFIG_DIR, "pagamentos.db")
 COMPROVANTES_DIR = os.path.join(CONFIG_DIR, "comprovantes")
 
+# Arquivo de configuração opcional (INI, seções [caminhos] e [sqlite]); PAGTO_CONFIG aponta outro
+NOME_CONFIGURACAO = "pagto.conf"
+# PAGTO_DIR=:memoria: → modo efêmero (diretório temporário em memória, apagado ao sair)
+DIRETORIO_MEMORIA = ":memoria:"
+
+# PRAGMAs aplicados a cada conexão: o perfil é o ponto de partida e cada um pode ser
+# sobrescrito no [sqlite] do pagto.conf ou em PAGTO_SQLITE ("cache_size=-65536,synchronous=NORMAL")
+PRAGMAS_AJUSTAVEIS = ('cache_size', 'mmap_size', 'temp_store', 'journal_mode', 'synchronous')
+PERFIS_SQLITE = {
+    'padrao': {},
+    'rapido': {'cache_size': '-65536', 'mmap_size': '268435456', 'temp_store': 'MEMORY',
+               'journal_mode': 'WAL', 'synchronous': 'NORMAL'},
+    'seguro': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+    'memoria': {'cache_size': '-65536', 'temp_store': 'MEMORY', 'journal_mode': 'MEMORY',
+                'synchronous': 'OFF'},
+}
+PERFIL_SQLITE = 'padrao'
+AJUSTES_SQLITE: Dict[str, str] = {}
+_VALOR_PRAGMA = re.compile(r"-?\w+")
+
+
+def _numero_do_ambiente(nome: str, padrao, tipo=int):
+    """Número de uma variável de ambiente; um valor inválido só gera um aviso e fica o padrão"""
+    texto = os.environ.get(nome, "").strip()
+    if not texto:
+        return padrao
+    try:
+        return tipo(texto)
+    except ValueError:
+        print(f"⚠ {nome}={texto}: valor inválido, usando {padrao}", file=sys.stderr)
+        return padrao
+
+
+# Log de consultas lentas (limiar em milissegundos; valor negativo desativa)
+LENTAS_LOG_PATH = os.path.join(CONFIG_DIR, "lentas.log")
+LIMIAR_LENTAS_MS = _numero_do_ambiente("PAGTO_LENTAS_MS", 200.0, float)
+LENTAS_LOG_MAX_BYTES = 1024 * 1024
+LENTAS_LOG_BACKUPS = 3
+
+# Concorrência: espera do SQLite por um banco ocupado e novas tentativas do BEGIN IMMEDIATE
+BUSY_TIMEOUT_MS = _numero_do_ambiente("PAGTO_BUSY_TIMEOUT_MS", 5000)
+TENTATIVAS_ESCRITA = _numero_do_ambiente("PAGTO_TENTATIVAS_ESCRITA", 5)
+ESPERA_BASE_S = 0.05
+
+# Manutenção automática leve a cada N escritas (0 desativa)
+MANUTENCAO_AUTO_ESCRITAS = _numero_do_ambiente("PAGTO_MANUTENCAO_AUTO", 0)
+PAGINAS_VACUUM_LEVE = 256
+
+# Nomes aceitos nos filtros campo:valor e a coluna correspondente
+MAPEAMENTO_FILTROS = {
+    'categoria': 'categoria',
+    'beneficiario': 'beneficiario',
+    'conta': 'conta',
+    'devendo': 'devendo_para',
+    'devendo_para': 'devendo_para',
+    'pendente': 'pendente',
+    'data': 'data_pagamento',
+    'data_pagamento': 'data_pagamento',
+    'id': 'id',
+    'valor': 'valor',
+    'comprovante': 'comprovante',
+    'observacao': 'observacao',
+    'contexto': 'contexto'
+}
+
+# Snapshot colunar de 'pagto estatisticas': colunas de texto guardadas como códigos de dicionário
+ANALISE_DIR = os.path.join(CONFIG_DIR, "analise")
+CAMPOS_SNAPSHOT = ('categoria', 'beneficiario', 'conta', 'contexto', 'data_pagamento')
+
+# Backup online: páginas copiadas por passo (entre os passos os escritores seguem livres)
+PAGINAS_BACKUP = 1024
+MANIFESTO_BACKUP = "backup.json"
+
+# Pacote de comprovantes para o contador (pagto pacote): pasta dos arquivos e manifesto dentro do ZIP
+PASTA_PACOTE = "comprovantes"
+MANIFESTO_PACOTE = "manifesto.csv"
+
+# Sincronização por changesets: cada cópia reserva uma faixa de IDs (faixa N = N * FAIXA_IDS_SYNC + 1 ...)
+# antes de exportar ou importar; poucas faixas, para que os IDs continuem curtos de digitar
+FAIXA_IDS_SYNC = 10 ** 9
+FAIXAS_SYNC = 10
+FORMATO_CHANGESET = "pagto-changeset"
+
+# Recorrências: intervalos por extenso → (passo, unidade), com unidade 'd' (dias) ou 'm' (meses)
+INTERVALOS_RECORRENCIA = {
+    'diario': (1, 'd'),
+    'semanal': (7, 'd'),
+    'quinzenal': (14, 'd'),
+    'mensal': (1, 'm'),
+    'bimestral': (2, 'm'),
+    'trimestral': (3, 'm'),
+    'semestral': (6, 'm'),
+    'anual': (12, 'm'),
+}
+
+# Layout particionado (opcional): um banco por contexto; o principal guarda o diretório de IDs
+CONTEXTOS_DIR = os.path.join(CONFIG_DIR, "contextos")
+
+# Comprovantes em pastas por faixa de ID (0000/, 0001/, ...), no máximo este número de arquivos
+# por pasta; a coluna 'comprovante' guarda o caminho relativo ("0001/1234_Posto_300.pdf")
+COMPROVANTES_POR_PASTA = 1000
+
+# Compressão dos comprovantes ao guardar (PAGTO_COMPRESSAO): nenhuma (padrão), zlib (arquivo .gz)
+# ou lzma (.xz, menor e mais lento). O arquivo comprimido só fica se tiver até LIMIAR_COMPRESSAO do original
+COMPRESSAO_COMPROVANTES = os.environ.get("PAGTO_COMPRESSAO", "nenhuma").strip().lower()
+SUFIXOS_COMPRESSAO = {'zlib': ".gz", 'lzma': ".xz"}
+LIMIAR_COMPRESSAO = 0.9
+# Assinaturas de formatos já comprimidos (JPEG, PNG, GIF, ZIP/Office, gzip, xz, bzip2, 7z, RAR, zstd),
+# guardados como estão; WEBP e HEIC/AVIF/MP4 são reconhecidos à parte
+ASSINATURAS_COMPRIMIDOS = (b"\xff\xd8\xff", b"\x89PNG", b"GIF8", b"PK\x03\x04", b"\x1f\x8b", b"\xfd7zXZ\x00",
+                           b"BZh", b"7z\xbc\xaf\x27\x1c", b"Rar!", b"\x28\xb5\x2f\xfd")
+BLOCO_COMPROVANTE = 1024 * 1024
+
+
+def definir_diretorio(config_dir: str, banco: str = None, comprovantes: str = None):
+    """
+    Aponta o banco, os comprovantes e os logs para outro diretório. O banco (e, com ele, os
+    bancos dos contextos) e os comprovantes podem ficar fora dele, ex.: o banco num disco local rápido.
+    """
+    global CONFIG_DIR, DB_PATH, COMPROVANTES_DIR, LENTAS_LOG_PATH, ANALISE_DIR, CONTEXTOS_DIR
+    CONFIG_DIR = config_dir
+    DB_PATH = banco or os.path.join(CONFIG_DIR, "pagamentos.db")
+    COMPROVANTES_DIR = comprovantes or os.path.join(CONFIG_DIR, "comprovantes")
+    LENTAS_LOG_PATH = os.path.join(CONFIG_DIR, "lentas.log")
+    ANALISE_DIR = os.path.join(CONFIG_DIR, "analise")
+    CONTEXTOS_DIR = os.path.join(os.path.dirname(DB_PATH), "contextos")
+    
+    # Descarta o handler do log de lentas, que aponta para o arquivo antigo
+    # (se o logging nem foi importado, nenhum handler foi criado)
+    logging = sys.modules.get("logging")
+    logger = logging.getLogger("pagto.lentas") if logging else None
+    for handler in list(logger.handlers if logger else ()):
+        logger.removeHandler(handler)
+        handler.close()
+
+
+def definir_perfil(perfil: str = 'padrao', ajustes: Dict[str, str] = None):
+    """Escolhe o perfil de PRAGMAs das próximas conexões, com ajustes individuais por cima dele"""
+    global PERFIL_SQLITE, AJUSTES_SQLITE
+    if perfil not in PERFIS_SQLITE:
+        raise ValueError(f"perfil desconhecido: {perfil} (use {', '.join(PERFIS_SQLITE)})")
+    combinados = dict(PERFIS_SQLITE[perfil])
+    for pragma, valor in (ajustes or {}).items():
+        pragma, valor = pragma.strip().lower(), str(valor).strip()
+        if pragma not in PRAGMAS_AJUSTAVEIS:
+            raise ValueError(f"PRAGMA não ajustável: {pragma} (use {', '.join(PRAGMAS_AJUSTAVEIS)})")
+        if not _VALOR_PRAGMA.fullmatch(valor):
+            raise ValueError(f"valor inválido para {pragma}: {valor}")
+        combinados[pragma] = valor
+    PERFIL_SQLITE = perfil
+    AJUSTES_SQLITE = combinados
+
+
+def _diretorio_efemero() -> str:
+    """Diretório temporário em /dev/shm (memória, quando existe), apagado ao sair do processo"""
+    import tempfile
+    
+    base = "/dev/shm" if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK) else None
+    diretorio = tempfile.mkdtemp(prefix="pagto-", dir=base)
+    atexit.register(shutil.rmtree, diretorio, True)
+    return diretorio
+
+
+def usar_memoria() -> str:
+    """
+    Modo efêmero (testes e benchmarks): banco, comprovantes e logs num diretório temporário
+    em memória, com o perfil 'memoria'. Retorna o diretório.
+    """
+    diretorio = _diretorio_efemero()
+    definir_diretorio(diretorio)
+    definir_perfil('memoria')
+    return diretorio
+
+
+def _ler_ajustes(texto: str) -> Dict[str, str]:
+    """'cache_size=-65536,synchronous=NORMAL' → {'cache_size': '-65536', 'synchronous': 'NORMAL'}"""
+    ajustes = {}
+    for item in texto.split(","):
+        if item.strip():
+            pragma, _, valor = item.partition("=")
+            ajustes[pragma] = valor
+    return ajustes
+
+
+def _carregar_configuracao():
+    """
+    Aplica o pagto.conf (em PAGTO_CONFIG ou no diretório de dados) e as variáveis de ambiente,
+    que têm precedência sobre ele. Um arquivo ou ajuste inválido só gera um aviso.
+    """
+    memoria = CONFIG_DIR == DIRETORIO_MEMORIA
+    caminho = os.environ.get("PAGTO_CONFIG") or (None if memoria else os.path.join(CONFIG_DIR, NOME_CONFIGURACAO))
+    caminhos, ajustes = {}, {}
+    # Sem pagto.conf (o caso comum), nem carrega o configparser
+    if caminho and os.path.isfile(caminho):
+        import configparser
+        
+        arquivo = configparser.ConfigParser(inline_comment_prefixes=(';', '#'))
+        try:
+            arquivo.read(caminho, encoding='utf-8')
+        except configparser.Error as e:
+            print(f"⚠ {caminho} ignorado: {e}", file=sys.stderr)
+        else:
+            caminhos = arquivo['caminhos'] if arquivo.has_section('caminhos') else {}
+            ajustes = dict(arquivo['sqlite']) if arquivo.has_section('sqlite') else {}
+    perfil = ajustes.pop('perfil', 'memoria' if memoria else 'padrao')
+    perfil = os.environ.get("PAGTO_PERFIL") or perfil
+    ajustes.update(_ler_ajustes(os.environ.get("PAGTO_SQLITE", "")))
+    try:
+        definir_perfil(perfil.strip().lower(), ajustes)
+    except ValueError as e:
+        print(f"⚠ Ajustes do SQLite ignorados: {e}", file=sys.stderr)
+    
+    if memoria:
+        definir_diretorio(_diretorio_efemero())
+        return
+    expandir = lambda valor: os.path.expanduser(valor) if valor else None  # noqa: E731
+    definir_diretorio(expandir(caminhos.get('diretorio')) or CONFIG_DIR,
+                      banco=expandir(os.environ.get("PAGTO_BANCO") or caminhos.get('banco')),
+                      comprovantes=expandir(os.environ.get("PAGTO_COMPROVANTES") or caminhos.get('comprovantes')))
+
+
+def _nova_conexao(caminho: str, ajustar: bool = True, **opcoes) -> sqlite3.Connection:
+    """
+    Abre uma conexão SQLite com o busy timeout configurado (PAGTO_BUSY_TIMEOUT_MS) e os PRAGMAs
+    do perfil. ajustar=False abre sem eles (cópias de backup, que devem sair como o original).
+    """
+    conn = sqlite3.connect(caminho, timeout=BUSY_TIMEOUT_MS / 1000, **opcoes)
+    if ajustar and AJUSTES_SQLITE:
+        for pragma, valor in AJUSTES_SQLITE.items():
+            if pragma != 'journal_mode':
+                conn.execute(f"PRAGMA {pragma} = {valor}")
+        modo = AJUSTES_SQLITE.get('journal_mode')
+        # Só o WAL fica gravado no arquivo, e entrar ou sair dele exige o banco livre: troca só se difere
+        if modo and caminho != ":memory:" and conn.execute("PRAGMA journal_mode").fetchone()[0] != modo.lower():
+            try:
+                conn.execute(f"PRAGMA journal_mode = {modo}")
+            except sqlite3.OperationalError:
+                pass  # Outro processo com o banco aberto: fica para a próxima conexão
+    return conn
+
+
+_carregar_configuracao()
+
+
+def _hash_arquivo(caminho: str) -> str:
+    """SHA-256 de um arquivo, lido em blocos"""
+    import hashlib
+    
+    resumo = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b""):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+def _parsear_intervalo(texto: str) -> Tuple[int, str]:
+    """Converte 'mensal', '15d', '2s' (semanas), '3m' ou '1a' em (passo, unidade)"""
+    texto = texto.strip().lower()
+    if texto in INTERVALOS_RECORRENCIA:
+        return INTERVALOS_RECORRENCIA[texto]
+    numero, sufixo = texto[:-1], texto[-1:]
+    multiplicadores = {'d': (1, 'd'), 's': (7, 'd'), 'm': (1, 'm'), 'a': (12, 'm')}
+    if not numero.isdigit() or int(numero) <= 0 or sufixo not in multiplicadores:
+        raise ValueError(f"intervalo inválido: {texto}")
+    fator, unidade = multiplicadores[sufixo]
+    return int(numero) * fator, unidade
+
+
+def _descrever_intervalo(passo: int, unidade: str) -> str:
+    """Nome do intervalo para exibição (o inverso de _parsear_intervalo)"""
+    for nome, intervalo in INTERVALOS_RECORRENCIA.items():
+        if intervalo == (passo, unidade):
+            return nome
+    return f"{passo}{unidade}"
+
+
+def _data_ocorrencia(inicio: date, passo: int, unidade: str, numero: int) -> date:
+    """
+    Data da ocorrência 'numero' (0 = a primeira). Meses são contados a partir do início,
+    não da ocorrência anterior: um vencimento no dia 31 cai no último dia dos meses curtos
+    e volta ao 31 nos seguintes
+    """
+    if unidade == 'd':
+        return inicio + timedelta(days=passo * numero)
+    meses = inicio.month - 1 + passo * numero
+    ano, mes = inicio.year + meses // 12, meses % 12 + 1
+    return date(ano, mes, min(inicio.day, calendar.monthrange(ano, mes)[1]))
+
+
+def _pasta_comprovante(id_pagamento: int) -> str:
+    """Pasta (relativa a COMPROVANTES_DIR) dos comprovantes de um ID, calculada só pelo ID"""
+    return f"{id_pagamento // COMPROVANTES_POR_PASTA:04d}"
+
+
+def _ja_comprimido(cabecalho: bytes) -> bool:
+    """Pelos primeiros bytes, diz se o arquivo já é de um formato comprimido"""
+    return (cabecalho.startswith(ASSINATURAS_COMPRIMIDOS)
+            or (cabecalho[:4] == b"RIFF" and cabecalho[8:12] == b"WEBP")
+            or cabecalho[4:8] == b"ftyp")
+
+
+def _comprimir_comprovante(origem: str, destino: str) -> Optional[str]:
+    """
+    Grava em 'destino' + sufixo a versão comprimida de 'origem' (em blocos, sem carregar o
+    arquivo inteiro) e retorna o sufixo. None se a compressão está desligada, se o formato
+    já é comprimido ou se o ganho não compensa (nesses casos nada fica gravado).
+    """
+    sufixo = SUFIXOS_COMPRESSAO.get(COMPRESSAO_COMPROVANTES)
+    if not sufixo:
+        return None
+    import gzip
+    import lzma
+    
+    with open(origem, 'rb') as entrada:
+        if _ja_comprimido(entrada.read(16)):
+            return None
+        entrada.seek(0)
+        try:
+            with open(destino + sufixo, 'wb') as bruto:
+                if sufixo == ".gz":
+                    saida = gzip.GzipFile(filename=os.path.basename(destino), mode='wb', fileobj=bruto,
+                                          compresslevel=6)
+                else:
+                    saida = lzma.LZMAFile(bruto, mode='wb', preset=6)
+                with saida:
+                    shutil.copyfileobj(entrada, saida, BLOCO_COMPROVANTE)
+        except BaseException:
+            os.remove(destino + sufixo)
+            raise
+    
+    if os.path.getsize(destino + sufixo) > os.path.getsize(origem) * LIMIAR_COMPRESSAO:
+        os.remove(destino + sufixo)
+        return None
+    return sufixo
+
+
+def _abrir_comprovante(caminho: str):
+    """Abre um comprovante guardado para leitura em blocos, descomprimindo pelo sufixo (.gz/.xz)"""
+    if caminho.endswith(".gz"):
+        import gzip
+        return gzip.open(caminho, 'rb')
+    if caminho.endswith(".xz"):
+        import lzma
+        return lzma.open(caminho, 'rb')
+    return open(caminho, 'rb')
+
+
+def _nome_original_comprovante(nome: str) -> str:
+    """Nome do arquivo como o usuário anexou, sem a pasta e sem o sufixo da compressão"""
+    nome = os.path.basename(nome)
+    for sufixo in SUFIXOS_COMPRESSAO.values():
+        if nome.endswith(sufixo):
+            return nome[:-len(sufixo)]
+    return nome
+
+
+def _listar_arquivos(diretorio: str) -> List[str]:
+    """Caminhos relativos de todos os arquivos sob o diretório (recursivo), menos os ocultos (temporários)"""
+    arquivos = []
+    for raiz, _, nomes in os.walk(diretorio):
+        for nome in nomes:
+            if not nome.startswith("."):
+                arquivos.append(os.path.relpath(os.path.join(raiz, nome), diretorio))
+    return sorted(arquivos)
+
+
+# Faixas de valor (R$) do histograma de 'pagto estatisticas'
+FAIXAS_VALOR = [0, 10, 50, 100, 500, 1000, 5000, 10000, 50000]
+PERCENTIS = [10, 25, 50, 75, 90, 99]
+
+
+def _obter_log_lentas() -> "logging.Logger":
+    """Retorna o logger (com rotação de arquivo) das consultas lentas"""
+    # Importado só aqui: a maioria dos comandos nunca grava no log
+    import logging
+    from logging.handlers import RotatingFileHandler
+    
+    logger = logging.getLogger("pagto.lentas")
+    if not logger.handlers:
+        os.makedirs(CONFIG_DIR, exist_ok=True)
+        handler = RotatingFileHandler(LENTAS_LOG_PATH, maxBytes=LENTAS_LOG_MAX_BYTES,
+                                      backupCount=LENTAS_LOG_BACKUPS, encoding='utf-8')
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+
+def registrar_consulta_lenta(query: str, filtros: Optional[Dict[str, str]], linhas: int,
+                             duracao_ms: float, comando: str = ""):
+    """Grava uma instrução lenta no log (uma linha JSON por ocorrência)"""
+    registro = {
+        'momento': datetime.now().isoformat(timespec='seconds'),
+        'comando': comando,
+        'duracao_ms': round(duracao_ms, 3),
+        'linhas': linhas,
+        'sql': " ".join(query.split()),
+        'filtros': filtros or {}
+    }
+    try:
+        _obter_log_lentas().info(json.dumps(registro, ensure_ascii=False))
+    except OSError:
+        # O log é apenas diagnóstico: nunca deve impedir o comando de rodar
+        pass
+
+
+def ler_consultas_lentas() -> List[Dict]:
+    """Lê os registros do log de consultas lentas, incluindo os arquivos rotacionados"""
+    arquivos = [f"{LENTAS_LOG_PATH}.{n}" for n in range(LENTAS_LOG_BACKUPS, 0, -1)]
+    arquivos.append(LENTAS_LOG_PATH)
+    
+    registros = []
+    for arquivo in arquivos:
+        if not os.path.exists(arquivo):
+            continue
+        with open(arquivo, 'r', encoding='utf-8') as f:
+            for linha in f:
+                try:
+                    registros.append(json.loads(linha))
+                except ValueError:
+                    continue
+    return registros
+
 
 class Pagamento:
     """Classe para representar um pagamento"""
     
+    __slots__ = ('id', 'categoria', 'beneficiario', 'data_pagamento', 'conta', 'valor',
+                 'devendo_para', 'pendente', 'deletado', 'comprovante', 'observacao', 'contexto')
+    
     def __init__(self, categoria: str, beneficiario: str, conta: str, 
                  valor: float, data_pagamento: str = None, devendo_para: str = "",
                  id_pagamento: int = None, pendente: bool = False, deletado: bool = False,
@@ -30,7 +473,7 @@ class Pagamento:
         self.id = id_pagamento
         self.categoria = categoria
         self.beneficiario = beneficiario
-        self.data_pagamento = data_pagamento or datetime.now().strftime("%d/%m/%Y")
+        self.data_pagamento = _validar_data(data_pagamento) if data_pagamento else datetime.now().strftime("%d/%m/%Y")
         self.conta = conta
         self.valor = valor
         self.devendo_para = devendo_para
@@ -58,25 +501,430 @@ class Pagamento:
         }
 
 
+class RegistroPagamento(NamedTuple):
+    """Pagamento lido do banco: uma tupla compacta com acesso por nome (pag.valor)"""
+    id: int
+    categoria: str
+    beneficiario: str
+    data_pagamento: str
+    conta: str
+    valor: float
+    devendo_para: Optional[str]
+    pendente: int
+    deletado: int
+    comprovante: Optional[str]
+    observacao: Optional[str]
+    contexto: str
+
+
+# Colunas lidas para montar um RegistroPagamento (na ordem dos campos)
+COLUNAS_PAGAMENTO = ", ".join(RegistroPagamento._fields)
+
+# Colunas copiadas entre a tabela quente e o arquivo (pagamentos_arquivo)
+COLUNAS_ARQUIVADAS = COLUNAS_PAGAMENTO + ", created_at"
+
+# Colunas de cada tabela copiadas entre os bancos do layout particionado
+COLUNAS_PARTICAO = {
+    'pagamentos': COLUNAS_ARQUIVADAS,
+    'pagamentos_arquivo': COLUNAS_ARQUIVADAS + ", arquivado_em",
+}
+
+# Data dd/mm/aaaa convertida em aaaa-mm-dd, para comparar e ordenar cronologicamente
+DATA_ISO_SQL = ("(substr(data_pagamento, 7, 4) || '-' || substr(data_pagamento, 4, 2)"
+                " || '-' || substr(data_pagamento, 1, 2))")
+# Verdadeiro só para datas gravadas no formato estrito (com dia e mês de dois dígitos) e existentes
+# ('+0 days' faz o SQLite normalizar 31/02 para 03/03, que então não bate com o original)
+DATA_VALIDA_SQL = f"date({DATA_ISO_SQL}, '+0 days') IS {DATA_ISO_SQL}"
+_DATA_BR = re.compile(r"(\d{2})/(\d{2})/(\d{4})")
+
+
+def _validar_data(data_pagamento: str) -> str:
+    """Confere o formato estrito dd/mm/aaaa (as consultas leem a data por posição); ValueError se inválida"""
+    partes = _DATA_BR.fullmatch(data_pagamento or "")
+    try:
+        date(int(partes.group(3)), int(partes.group(2)), int(partes.group(1)))
+    except (AttributeError, ValueError):
+        raise ValueError(f"data inválida: {data_pagamento} (use dd/mm/aaaa)")
+    return data_pagamento
+
+
+def _normalizar_data(data_pagamento: str) -> str:
+    """Aceita d/m/aaaa (sem os zeros) e devolve dd/mm/aaaa; ValueError se não for uma data"""
+    try:
+        lida = datetime.strptime(data_pagamento.strip(), "%d/%m/%Y")
+    except (AttributeError, ValueError):
+        raise ValueError(f"data inválida: {data_pagamento} (use dd/mm/aaaa)")
+    return _validar_data(f"{lida.day:02d}/{lida.month:02d}/{lida.year:04d}")
+
+# Impressão digital de um pagamento para achar duplicatas: conta, valor em centavos e beneficiário
+# normalizados. A data não entra na impressão: fica ao lado dela no índice, para buscas por janela
+IMPRESSAO_SQL = ("lower(trim({conta})) || '|' || CAST(round({valor} * 100) AS INTEGER)"
+                 " || '|' || lower(trim({beneficiario}))")
+COLUNA_IMPRESSAO = ("impressao TEXT GENERATED ALWAYS AS ("
+                    + IMPRESSAO_SQL.format(conta='conta', valor='valor', beneficiario='beneficiario')
+                    + ") VIRTUAL")
+JANELA_DUPLICADOS_DIAS = 3
+
+# Navegador interativo (pagto navegar): linhas por página buscada e páginas guardadas em volta da tela
+LINHAS_PAGINA_NAVEGADOR = 200
+PAGINAS_NAVEGADOR = 3
+
+# Ordens do navegador: colunas da chave antes do id, na ordem de um índice parcial 'deletado IS 0'
+# (os textos desempatam pelo valor, como nos índices de ranking; a data vai na forma ISO)
+CHAVES_NAVEGADOR = {
+    'data': (DATA_ISO_SQL,),
+    'valor': ('valor',),
+    'categoria': ('categoria', 'valor'),
+    'beneficiario': ('beneficiario', 'valor'),
+    'conta': ('conta', 'valor'),
+    'id': (),
+}
+
+# Agrupamentos de 'pagto fluxo' sobre a data ISO ('dia'); a semana começa na segunda-feira
+CHAVES_FLUXO = {
+    'dia': "dia",
+    'semana': "date(dia, '-6 days', 'weekday 1')",
+    'mes': "substr(dia, 1, 7)",
+}
+DIAS_FLUXO_PADRAO = 90
+
+# Agrupamentos aceitos por 'pagto ranking'; os de INDICES_RANKING têm índice de cobertura
+INDICES_RANKING = ('beneficiario', 'conta', 'categoria')
+COLUNAS_RANKING = {
+    'beneficiario': 'beneficiario',
+    'conta': 'conta',
+    'categoria': 'categoria',
+    'contexto': 'contexto',
+    'devendo': 'devendo_para',
+}
+
+
+# Campos registrados no diário de mudanças (tabela mudancas)
+CAMPOS_DIARIO = RegistroPagamento._fields[1:]
+# Condição dos gatilhos de mudancas e sugestoes: desligados enquanto a transação em curso
+# move pagamentos entre layouts (pagto particionar), que não são mudanças nos pagamentos
+GATILHOS_ATIVOS_SQL = "NOT EXISTS (SELECT 1 FROM pagto_meta WHERE chave = 'gatilhos_pausados')"
+
+
+def _sql_gatilhos_mudancas() -> List[str]:
+    """
+    Gatilhos que alimentam o diário de mudancas nas duas tabelas. Mover entre a tabela
+    quente e o arquivo insere no destino antes de apagar na origem, então o INSERT vira
+    ARQUIVAR/RESTAURAR e o DELETE correspondente não é registrado.
+    """
+    def linha_json(prefixo: str) -> str:
+        return "json_object(" + ", ".join(f"'{campo}', {prefixo}.{campo}" for campo in CAMPOS_DIARIO) + ")"
+    
+    todos_campos = ",".join(CAMPOS_DIARIO)
+    alterou = " OR ".join(f"OLD.{campo} IS NOT NEW.{campo}" for campo in CAMPOS_DIARIO)
+    gatilhos = []
+    for tabela, outra, movimento in (('pagamentos', 'pagamentos_arquivo', 'RESTAURAR'),
+                                     ('pagamentos_arquivo', 'pagamentos', 'ARQUIVAR')):
+        gatilhos += [
+            f"""CREATE TRIGGER mudancas_{tabela}_mover AFTER INSERT ON {tabela}
+            WHEN EXISTS (SELECT 1 FROM {outra} WHERE id = NEW.id) AND {GATILHOS_ATIVOS_SQL}
+            BEGIN
+                INSERT INTO mudancas (op, pagamento_id) VALUES ('{movimento}', NEW.id);
+            END""",
+            f"""CREATE TRIGGER mudancas_{tabela}_insert AFTER INSERT ON {tabela}
+            WHEN NOT EXISTS (SELECT 1 FROM {outra} WHERE id = NEW.id) AND {GATILHOS_ATIVOS_SQL}
+            BEGIN
+                INSERT INTO mudancas (op, pagamento_id, campos, novos)
+                VALUES ('INSERT', NEW.id, '{todos_campos}', {linha_json('NEW')});
+            END""",
+            f"""CREATE TRIGGER mudancas_{tabela}_delete AFTER DELETE ON {tabela}
+            WHEN NOT EXISTS (SELECT 1 FROM {outra} WHERE id = OLD.id) AND {GATILHOS_ATIVOS_SQL}
+            BEGIN
+                INSERT INTO mudancas (op, pagamento_id, campos, antigos)
+                VALUES ('DELETE', OLD.id, '{todos_campos}', {linha_json('OLD')});
+            END""",
+            f"""CREATE TRIGGER mudancas_{tabela}_update AFTER UPDATE ON {tabela}
+            WHEN ({alterou}) AND {GATILHOS_ATIVOS_SQL}
+            BEGIN
+                INSERT INTO mudancas (op, pagamento_id, campos, antigos, novos)
+                SELECT 'UPDATE', NEW.id, group_concat(antigo.key, ','),
+                       json_group_object(antigo.key, antigo.value), json_group_object(novo.key, novo.value)
+                FROM json_each({linha_json('OLD')}) AS antigo
+                JOIN json_each({linha_json('NEW')}) AS novo ON novo.key = antigo.key
+                WHERE antigo.value IS NOT novo.value;
+            END""",
+        ]
+    return gatilhos
+
+
+# Campos com autocompletar nos prompts (tabela sugestoes)
+CAMPOS_SUGESTOES = ('categoria', 'beneficiario', 'conta', 'contexto')
+SUGESTOES_EXIBIDAS = 6
+
+
+def _sql_gatilhos_sugestoes() -> List[str]:
+    """
+    Gatilhos que mantêm em sugestoes quantos pagamentos ativos usam cada valor, por contexto:
+    +1 ao inserir, -1 ao apagar (inclusive ao mover para o arquivo) e os dois ao editar.
+    Assim os prompts leem uma tabela pequena em vez de agregar pagamentos
+    """
+    def valores(prefixo: str) -> str:
+        return "VALUES " + ", ".join(f"(coalesce({prefixo}.contexto, 'pessoal'), '{campo}', trim({prefixo}.{campo}))"
+                                     for campo in CAMPOS_SUGESTOES)
+    
+    contar = f"""INSERT INTO sugestoes (contexto, campo, valor, usos)
+                SELECT column1, column2, column3, 1 FROM ({valores('NEW')}) WHERE column3 <> ''
+                ON CONFLICT (contexto, campo, valor) DO UPDATE SET usos = usos + 1;"""
+    # Um UPDATE/DELETE por campo: com igualdade em toda a chave, cada um é uma busca pontual
+    chaves = [f"contexto = coalesce(OLD.contexto, 'pessoal') AND campo = '{campo}' AND valor = trim(OLD.{campo})"
+              for campo in CAMPOS_SUGESTOES]
+    descontar = "\n                ".join(
+        [f"UPDATE sugestoes SET usos = usos - 1 WHERE {chave};" for chave in chaves]
+        + [f"DELETE FROM sugestoes WHERE {chave} AND usos <= 0;" for chave in chaves])
+    alterou = " OR ".join(f"OLD.{campo} IS NOT NEW.{campo}" for campo in CAMPOS_SUGESTOES)
+    return [
+        f"""CREATE TRIGGER sugestoes_insert AFTER INSERT ON pagamentos
+            WHEN {GATILHOS_ATIVOS_SQL}
+            BEGIN
+                {contar}
+            END""",
+        f"""CREATE TRIGGER sugestoes_delete AFTER DELETE ON pagamentos
+            WHEN {GATILHOS_ATIVOS_SQL}
+            BEGIN
+                {descontar}
+            END""",
+        f"""CREATE TRIGGER sugestoes_update AFTER UPDATE OF {', '.join(CAMPOS_SUGESTOES)} ON pagamentos
+            WHEN ({alterou}) AND {GATILHOS_ATIVOS_SQL}
+            BEGIN
+                {descontar}
+                {contar}
+            END""",
+    ]
+
+
+def _fabrica_registro(cursor: sqlite3.Cursor, linha: tuple) -> RegistroPagamento:
+    """row_factory que cria o RegistroPagamento direto da tupla do cursor, sem dict intermediário"""
+    return tuple.__new__(RegistroPagamento, linha)
+
+
 class GerenciadorPagamentos:
     """Classe para gerenciar os pagamentos com SQLite"""
     
-    def __init__(self):
+    def __init__(self, comando: str = None):
+        # Nome do comando em execução, registrado junto das consultas lentas
+        self.comando = comando or (sys.argv[1].lower() if len(sys.argv) > 1 else "")
+        self._particionado = False
+        self._particoes_prontas = set()
         self._garantir_diretorios()
         self._garantir_banco()
+        self._particionado = self._ler_meta('layout') == 'contextos'
         self._migrar_csv_se_necessario()
     
+    def _abrir(self, caminho: str) -> sqlite3.Connection:
+        """Abre um arquivo de banco; o de um contexto tem o esquema garantido na primeira abertura"""
+        if caminho != DB_PATH and caminho not in self._particoes_prontas:
+            self._garantir_banco(caminho)
+            self._particoes_prontas.add(caminho)
+        return _nova_conexao(caminho)
+    
+    def _conectar(self, contexto: str = None, filtros: Dict[str, str] = None) -> sqlite3.Connection:
+        """
+        Abre uma conexão com o banco de dados. No layout particionado, com contexto abre
+        o banco daquele contexto (para escrita); sem contexto, abre só o banco do contexto
+        filtrado ou anexa os de todos os contextos que atendem ao filtro 'contexto:'
+        """
+        if not self._particionado:
+            return self._abrir(DB_PATH)
+        if contexto is not None:
+            return self._conectar_particao(contexto)
+        
+        particoes = self._particoes(filtros)
+        if len(particoes) == 1:
+            return self._abrir(next(iter(particoes.values())))
+        return self._conectar_federado(particoes)
+    
+    def _ler_meta(self, chave: str) -> Optional[str]:
+        """Lê um valor de pagto_meta no banco principal"""
+        conn = _nova_conexao(DB_PATH)
+        linha = conn.execute("SELECT valor FROM pagto_meta WHERE chave = ?", (chave,)).fetchone()
+        conn.close()
+        return linha[0] if linha else None
+    
+    def _gravar_meta(self, cursor: sqlite3.Cursor, chave: str, valor):
+        """Grava (ou substitui) um valor em pagto_meta"""
+        cursor.execute('''
+            INSERT INTO pagto_meta (chave, valor) VALUES (?, ?)
+            ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor
+        ''', (chave, valor))
+    
+    @contextmanager
+    def _gatilhos_pausados(self, cursor: sqlite3.Cursor):
+        """
+        Desliga os gatilhos de mudancas e sugestoes no bloco. A marca é gravada e apagada
+        dentro da transação em curso: as outras conexões nunca a veem e, se a transação
+        for desfeita, ela some junto
+        """
+        self._gravar_meta(cursor, 'gatilhos_pausados', 1)
+        yield cursor
+        cursor.execute("DELETE FROM pagto_meta WHERE chave = 'gatilhos_pausados'")
+    
+    def _particoes(self, filtros: Dict[str, str] = None) -> Dict[str, str]:
+        """Contextos e seus arquivos de banco, restritos aos que atendem ao filtro 'contexto:'"""
+        conn = _nova_conexao(DB_PATH)
+        particoes = dict(conn.execute("SELECT contexto, arquivo FROM particoes ORDER BY contexto"))
+        conn.close()
+        
+        for campo, valor_filtro in (filtros or {}).items():
+            if MAPEAMENTO_FILTROS.get(campo.lower()) == 'contexto':
+                # Mesma semântica do LIKE '%valor%' aplicado depois dentro de cada banco
+                particoes = {ctx: arquivo for ctx, arquivo in particoes.items()
+                             if valor_filtro.lower() in ctx.lower()}
+        return {ctx: os.path.join(CONTEXTOS_DIR, arquivo) for ctx, arquivo in particoes.items()}
+    
+    def _conectar_particao(self, contexto: str) -> sqlite3.Connection:
+        """Abre o banco do contexto (criando-o se for novo), com o principal anexado como 'diretorio'"""
+        conn = _nova_conexao(DB_PATH)
+        linha = conn.execute("SELECT arquivo FROM particoes WHERE contexto = ?", (contexto,)).fetchone()
+        if linha:
+            arquivo = linha[0]
+        else:
+            with self._transacao(conn) as cursor:
+                # Relê sob o lock de escrita: outro processo pode ter criado o contexto agora
+                linha = cursor.execute("SELECT arquivo FROM particoes WHERE contexto = ?", (contexto,)).fetchone()
+                arquivo = linha[0] if linha else self._registrar_particao(cursor, contexto)
+        conn.close()
+        
+        conn = self._abrir(os.path.join(CONTEXTOS_DIR, arquivo))
+        conn.execute("ATTACH DATABASE ? AS diretorio", (DB_PATH,))
+        return conn
+    
+    def _registrar_particao(self, cursor: sqlite3.Cursor, contexto: str) -> str:
+        """Escolhe um nome de arquivo único para o banco do contexto e o registra em particoes"""
+        base = "".join(c if c.isalnum() or c in '-_' else '_' for c in contexto.lower())[:40] or "contexto"
+        usados = {row[0] for row in cursor.execute("SELECT arquivo FROM particoes")}
+        arquivo, n = f"{base}.db", 1
+        while arquivo in usados:
+            n += 1
+            arquivo = f"{base}_{n}.db"
+        cursor.execute("INSERT INTO particoes (contexto, arquivo) VALUES (?, ?)", (contexto, arquivo))
+        os.makedirs(CONTEXTOS_DIR, exist_ok=True)
+        return arquivo
+    
+    def _conectar_federado(self, particoes: Dict[str, str]) -> sqlite3.Connection:
+        """
+        Abre o banco principal com os bancos dos contextos anexados (ATTACH); as visões
+        temporárias pagamentos/pagamentos_arquivo (que encobrem as tabelas do principal)
+        reúnem as partições, então as consultas de leitura funcionam sem alteração
+        """
+        for caminho in particoes.values():
+            self._abrir(caminho).close()
+        
+        conn = _nova_conexao(DB_PATH)
+        limite = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED) if hasattr(conn, 'getlimit') else 10
+        if len(particoes) > limite:
+            conn.close()
+            raise RuntimeError(f"{len(particoes)} contextos excedem o limite de {limite} bancos "
+                               f"anexados do SQLite; filtre por contexto:nome")
+        
+        for n, caminho in enumerate(particoes.values()):
+            conn.execute(f"ATTACH DATABASE ? AS p{n}", (caminho,))
+        for tabela, colunas in COLUNAS_PARTICAO.items():
+            partes = [f"SELECT {colunas} FROM main.{tabela}"]
+            partes += [f"SELECT {colunas} FROM p{n}.{tabela}" for n in range(len(particoes))]
+            conn.execute(f"CREATE TEMP VIEW {tabela} AS " + " UNION ALL ".join(partes))
+        return conn
+    
+    def _conectar_por_id(self, id_pagamento: int) -> sqlite3.Connection:
+        """Abre o banco onde o pagamento está (no layout particionado, pelo diretório de IDs)"""
+        if not self._particionado:
+            return self._conectar()
+        contexto = self._contexto_do_id(id_pagamento)
+        # ID desconhecido: o principal não tem pagamentos, então as operações não afetam nada
+        return self._conectar_particao(contexto) if contexto is not None else _nova_conexao(DB_PATH)
+    
+    def _contexto_do_id(self, id_pagamento: int) -> Optional[str]:
+        """Contexto de um pagamento segundo o diretório de IDs do layout particionado"""
+        conn = _nova_conexao(DB_PATH)
+        linha = conn.execute("SELECT contexto FROM ids_pagamentos WHERE id = ?", (id_pagamento,)).fetchone()
+        conn.close()
+        return linha[0] if linha else None
+    
+    def _bancos(self) -> List[str]:
+        """Arquivos de banco em uso: o principal e, no layout particionado, os dos contextos"""
+        if not self._particionado:
+            return [DB_PATH]
+        return [DB_PATH] + list(self._particoes().values())
+    
+    @contextmanager
+    def _transacao(self, conn: sqlite3.Connection):
+        """
+        Transação de escrita com BEGIN IMMEDIATE: o lock de escrita é pego logo no início
+        (sem o 'database is locked' da promoção de leitura para escrita). Se o banco seguir
+        ocupado após o busy timeout, tenta de novo com espera aleatória crescente.
+        Confirma no fim do bloco ou desfaz tudo em caso de erro.
+        """
+        for tentativa in range(TENTATIVAS_ESCRITA):
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                break
+            except sqlite3.OperationalError as e:
+                ocupado = 'locked' in str(e) or 'busy' in str(e)
+                if not ocupado or tentativa == TENTATIVAS_ESCRITA - 1:
+                    raise
+                time.sleep(random.uniform(0, ESPERA_BASE_S * 2 ** tentativa))
+        
+        try:
+            yield conn.cursor()
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+    
+    def _executar(self, cursor: sqlite3.Cursor, query: str, parametros=(),
+                  filtros: Dict[str, str] = None) -> List:
+        """Executa uma instrução e busca suas linhas, registrando-a se ultrapassar o limiar"""
+        inicio = time.perf_counter()
+        cursor.execute(query, parametros)
+        resultados = cursor.fetchall() if cursor.description else []
+        linhas = len(resultados) if cursor.description else cursor.rowcount
+        self._registrar_se_lenta(query, filtros, linhas, inicio)
+        return resultados
+    
+    def _executar_em_blocos(self, cursor: sqlite3.Cursor, query: str, parametros=(),
+                            filtros: Dict[str, str] = None, tamanho: int = 100000):
+        """
+        Como _executar, mas gera as linhas em blocos (fetchmany), sem carregar tudo na memória.
+        O tempo registrado vai até o último bloco, incluindo o processamento de quem os consome
+        """
+        inicio = time.perf_counter()
+        cursor.execute(query, parametros)
+        linhas = 0
+        while True:
+            bloco = cursor.fetchmany(tamanho)
+            if not bloco:
+                break
+            linhas += len(bloco)
+            yield bloco
+        self._registrar_se_lenta(query, filtros, linhas, inicio)
+    
+    def _registrar_se_lenta(self, query: str, filtros: Optional[Dict[str, str]], linhas: int, inicio: float):
+        """Registra a consulta iniciada em 'inicio' (perf_counter) se ela ultrapassou o limiar"""
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+        if 0 <= LIMIAR_LENTAS_MS <= duracao_ms:
+            registrar_consulta_lenta(query, filtros, linhas, duracao_ms, self.comando)
+    
     def _garantir_diretorios(self):
         """Garante que os diretórios necessários existem"""
         os.makedirs(CONFIG_DIR, exist_ok=True)
+        os.makedirs(os.path.dirname(DB_PATH) or ".", exist_ok=True)
         os.makedirs(COMPROVANTES_DIR, exist_ok=True)
     
-    def _garantir_banco(self):
-        """Cria o banco de dados e tabelas se não existirem"""
-        conn = sqlite3.connect(DB_PATH)
+    def _garantir_banco(self, caminho: str = None):
+        """Cria o banco de dados (o principal ou o de um contexto) e tabelas se não existirem"""
+        conn = _nova_conexao(caminho or DB_PATH)
         cursor = conn.cursor()
         
-        cursor.execute('''
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master")
+        if cursor.fetchone()[0] == 0:
+            # Banco novo: o espaço livre é devolvido aos poucos pela manutenção
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        
+        cursor.execute(f'''
             CREATE TABLE IF NOT EXISTS pagamentos (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 categoria TEXT NOT NULL,
@@ -90,12 +938,14 @@ class GerenciadorPagamentos:
                 comprovante TEXT,
                 observacao TEXT,
                 contexto TEXT DEFAULT 'pessoal',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                {COLUNA_IMPRESSAO}
             )
         ''')
         
-        # Verifica se precisa adicionar colunas (migração de versões antigas)
-        cursor.execute("PRAGMA table_info(pagamentos)")
+        # Verifica se precisa adicionar colunas (migração de versões antigas); table_xinfo
+        # também lista as colunas geradas
+        cursor.execute("PRAGMA table_xinfo(pagamentos)")
         colunas = [col[1] for col in cursor.fetchall()]
         
         if 'observacao' not in colunas:
@@ -106,9 +956,339 @@ class GerenciadorPagamentos:
             # Atualiza registros existentes que têm contexto NULL
             cursor.execute("UPDATE pagamentos SET contexto = 'pessoal' WHERE contexto IS NULL")
         
+        if 'impressao' not in colunas:
+            # Coluna gerada: calculada pelo SQLite em toda escrita, sem reescrever a tabela
+            cursor.execute(f"ALTER TABLE pagamentos ADD COLUMN {COLUNA_IMPRESSAO}")
+        
+        # Arquivo (parte fria): deletados e antigos saem da tabela quente
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pagamentos_arquivo'")
+        arquivo_existe = cursor.fetchone() is not None
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pagamentos_arquivo (
+                id INTEGER PRIMARY KEY,
+                categoria TEXT NOT NULL,
+                beneficiario TEXT NOT NULL,
+                data_pagamento TEXT NOT NULL,
+                conta TEXT NOT NULL,
+                valor REAL NOT NULL,
+                devendo_para TEXT,
+                pendente INTEGER DEFAULT 0,
+                deletado INTEGER DEFAULT 0,
+                comprovante TEXT,
+                observacao TEXT,
+                contexto TEXT DEFAULT 'pessoal',
+                created_at TIMESTAMP,
+                arquivado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        
+        if not arquivo_existe:
+            # Primeira execução com arquivo: move os deletados que já existiam
+            self._mover_para_arquivo(cursor, "deletado = 1")
+        # Ativos arquivados por 'pagto arquivar antes:': os relatórios agregados só leem o
+        # arquivo quando há algum, e este índice responde isso sem percorrer a tabela
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_arquivo_ativos
+            ON pagamentos_arquivo (id) WHERE deletado = 0
+        """)
+
+        # Vencimentos em aberto por data (pagto fluxo): índice parcial, só com os pendentes
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_pagamentos_pendentes_data
+            ON pagamentos ({DATA_ISO_SQL}) WHERE pendente = 1
+        """)
+        # Extrato por conta em ordem cronológica (pagto extrato), sem ordenar a tabela inteira
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_pagamentos_conta_data
+            ON pagamentos (conta, {DATA_ISO_SQL})
+        """)
+        # Duplicatas (pagto duplicados e aviso ao inserir): mesma impressão em datas próximas.
+        # Parcial em 'deletado IS 0', como os de ranking, para não ser escolhido pelas outras consultas
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_pagamentos_impressao
+            ON pagamentos (impressao, {DATA_ISO_SQL}) WHERE deletado IS 0
+        """)
+        # Rankings (pagto ranking): agrupar e somar só pelo índice, sem ler as linhas. A condição
+        # é 'deletado IS 0', e não o 'deletado = 0' das outras consultas, para que o planejador
+        # não escolha estes índices nelas (percorrer o índice e buscar cada linha é mais lento)
+        for coluna in INDICES_RANKING:
+            cursor.execute(f"""
+                CREATE INDEX IF NOT EXISTS idx_pagamentos_ranking_{coluna}
+                ON pagamentos ({coluna}, valor) WHERE deletado IS 0
+            """)
+        # Páginas do navegador (pagto navegar) por data e por valor; as outras ordens usam os
+        # de ranking. O id, que desempata, já vai junto em toda entrada de índice
+        cursor.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_pagamentos_data
+            ON pagamentos ({DATA_ISO_SQL}) WHERE deletado IS 0
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_pagamentos_valor
+            ON pagamentos (valor) WHERE deletado IS 0
+        """)
+        
+        # Estado interno do pagto (contadores, marcas de migração)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS pagto_meta (
+                chave TEXT PRIMARY KEY,
+                valor TEXT
+            )
+        ''')
+        
+        if (caminho or DB_PATH) == DB_PATH:
+            # Modelos de pagamentos recorrentes (só no principal; 'geradas' é a próxima ocorrência)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS recorrencias (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    categoria TEXT NOT NULL,
+                    beneficiario TEXT NOT NULL,
+                    conta TEXT NOT NULL,
+                    valor REAL NOT NULL,
+                    devendo_para TEXT,
+                    observacao TEXT,
+                    contexto TEXT DEFAULT 'pessoal',
+                    inicio TEXT NOT NULL,
+                    passo INTEGER NOT NULL,
+                    unidade TEXT NOT NULL,
+                    parcelas INTEGER,
+                    termino TEXT,
+                    geradas INTEGER NOT NULL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+        
+        # Diário de mudanças: seq só cresce (AUTOINCREMENT nunca reutiliza valores)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS mudancas (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                op TEXT NOT NULL,
+                pagamento_id INTEGER NOT NULL,
+                campos TEXT,
+                antigos TEXT,
+                novos TEXT,
+                momento TEXT DEFAULT (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+                origem TEXT
+            )
+        ''')
+        cursor.execute("PRAGMA table_info(mudancas)")
+        if 'origem' not in [col[1] for col in cursor.fetchall()]:
+            # Origem das mudanças aplicadas por 'pagto sync importar' (NULL = feitas aqui)
+            cursor.execute("ALTER TABLE mudancas ADD COLUMN origem TEXT")
+        self._garantir_gatilhos(cursor, 'mudancas', _sql_gatilhos_mudancas())
+        
+        # Valores já usados, com a frequência, para o autocompletar dos prompts
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sugestoes'")
+        sugestoes_existem = cursor.fetchone() is not None
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sugestoes (
+                contexto TEXT NOT NULL,
+                campo TEXT NOT NULL,
+                valor TEXT NOT NULL COLLATE NOCASE,
+                usos INTEGER NOT NULL,
+                PRIMARY KEY (contexto, campo, valor)
+            ) WITHOUT ROWID
+        ''')
+        if not sugestoes_existem:
+            # Primeira execução: conta os pagamentos existentes (daqui em diante, os gatilhos mantêm)
+            for campo in CAMPOS_SUGESTOES:
+                cursor.execute(f'''
+                    INSERT INTO sugestoes (contexto, campo, valor, usos)
+                    SELECT coalesce(contexto, 'pessoal'), '{campo}', trim({campo}), COUNT(*) FROM pagamentos
+                    WHERE trim({campo}) <> ''
+                    GROUP BY coalesce(contexto, 'pessoal'), trim({campo}) COLLATE NOCASE
+                ''')
+        self._garantir_gatilhos(cursor, 'sugestoes', _sql_gatilhos_sugestoes())
+        
+        cursor.execute("SELECT 1 FROM pagto_meta WHERE chave = 'datas_normalizadas'")
+        if cursor.fetchone() is None:
+            # Migração única: datas d/m/aaaa gravadas antes da validação estrita ganham os zeros
+            for tabela in ('pagamentos', 'pagamentos_arquivo'):
+                correcoes = []
+                for id_pag, data in cursor.execute(f"SELECT id, data_pagamento FROM {tabela}"
+                                                   f" WHERE NOT ({DATA_VALIDA_SQL})").fetchall():
+                    try:
+                        correcoes.append((_normalizar_data(data), id_pag))
+                    except ValueError:
+                        continue  # Não é data: fica como está ('pagto fluxo' avisa dos pendentes)
+                cursor.executemany(f"UPDATE {tabela} SET data_pagamento = ? WHERE id = ?", correcoes)
+            self._gravar_meta(cursor, 'datas_normalizadas', 1)
+        
+        cursor.execute("SELECT 1 FROM pagto_meta WHERE chave = 'comprovantes_em_pastas'")
+        migrar_comprovantes = cursor.fetchone() is None
+        conn.commit()
+        conn.close()
+        if migrar_comprovantes:
+            self._migrar_comprovantes(caminho or DB_PATH)
+    
+    def _migrar_comprovantes(self, caminho: str):
+        """
+        Migração única para os comprovantes em pastas: move cada arquivo da raiz de
+        COMPROVANTES_DIR para a pasta do seu ID e grava o novo caminho na coluna. Pode ser
+        repetida: um arquivo que já está na pasta (migração interrompida) só tem a coluna corrigida.
+        """
+        conn = _nova_conexao(caminho)
+        movidos = 0
+        with self._transacao(conn) as cursor:
+            # Outro processo pode ter migrado enquanto este esperava o lock
+            cursor.execute("SELECT 1 FROM pagto_meta WHERE chave = 'comprovantes_em_pastas'")
+            tabelas = () if cursor.fetchone() else ('pagamentos', 'pagamentos_arquivo')
+            
+            for tabela in tabelas:
+                alteracoes = []
+                for id_pag, nome in cursor.execute(f"""
+                    SELECT id, comprovante FROM {tabela}
+                    WHERE comprovante <> '' AND instr(comprovante, '/') = 0
+                """).fetchall():
+                    novo = f"{_pasta_comprovante(id_pag)}/{nome}"
+                    origem = os.path.join(COMPROVANTES_DIR, nome)
+                    destino = os.path.join(COMPROVANTES_DIR, novo)
+                    if os.path.exists(origem):
+                        os.makedirs(os.path.dirname(destino), exist_ok=True)
+                        os.replace(origem, destino)
+                        movidos += 1
+                    elif not os.path.exists(destino):
+                        continue  # Arquivo ausente: a coluna fica como estava
+                    alteracoes.append((novo, id_pag))
+                cursor.executemany(f"UPDATE {tabela} SET comprovante = ? WHERE id = ?", alteracoes)
+            self._gravar_meta(cursor, 'comprovantes_em_pastas', 1)
+        conn.close()
+        
+        if movidos:
+            print(f"✓ {movidos} comprovante(s) movido(s) para pastas por faixa de ID em {COMPROVANTES_DIR}")
+    
+    def _garantir_gatilhos(self, cursor: sqlite3.Cursor, prefixo: str, gatilhos: List[str]):
+        """
+        (Re)cria os gatilhos de um grupo (nomes começados por 'prefixo_') só quando a definição
+        muda, para não alterar o esquema a cada execução
+        """
+        # CRC32 basta para notar a mudança e evita carregar o hashlib em todo comando
+        assinatura = format(zlib.crc32("\n".join(gatilhos).encode('utf-8')), '08x')
+        cursor.execute("SELECT valor FROM pagto_meta WHERE chave = ?", (f"gatilhos_{prefixo}",))
+        linha = cursor.fetchone()
+        if linha and linha[0] == assinatura:
+            return
+        
+        existentes = [row[0] for row in cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE ? ESCAPE '\\'",
+            (f"{prefixo}\\_%",))]
+        for nome in existentes:
+            cursor.execute(f"DROP TRIGGER {nome}")
+        for gatilho in gatilhos:
+            cursor.execute(gatilho)
+        self._gravar_meta(cursor, f"gatilhos_{prefixo}", assinatura)
+    
+    def _registrar_escrita(self, conn: sqlite3.Connection):
+        """Conta as escritas e roda a manutenção leve a cada MANUTENCAO_AUTO_ESCRITAS (se ativada)"""
+        if MANUTENCAO_AUTO_ESCRITAS <= 0:
+            return
+        
+        with self._transacao(conn) as cursor:
+            cursor.execute('''
+                INSERT INTO pagto_meta (chave, valor) VALUES ('escritas_desde_manutencao', 1)
+                ON CONFLICT(chave) DO UPDATE SET valor = valor + 1
+            ''')
+            cursor.execute("SELECT valor FROM pagto_meta WHERE chave = 'escritas_desde_manutencao'")
+            escritas = int(cursor.fetchone()[0])
+            if escritas >= MANUTENCAO_AUTO_ESCRITAS:
+                cursor.execute("UPDATE pagto_meta SET valor = 0 WHERE chave = 'escritas_desde_manutencao'")
+        
+        if escritas >= MANUTENCAO_AUTO_ESCRITAS:
+            conn.execute("PRAGMA optimize")
+            conn.execute(f"PRAGMA incremental_vacuum({PAGINAS_VACUUM_LEVE})").fetchall()
+            conn.commit()
+    
+    def _estado_arquivo(self, cursor: sqlite3.Cursor, caminho: str = None) -> Dict[str, int]:
+        """Tamanho do arquivo do banco e contagem de páginas (total e livres)"""
+        caminho = caminho or DB_PATH
+        tamanho = os.path.getsize(caminho) if os.path.exists(caminho) else 0
+        if os.path.exists(caminho + "-wal"):
+            tamanho += os.path.getsize(caminho + "-wal")
+        return {
+            'tamanho': tamanho,
+            'paginas': cursor.execute("PRAGMA page_count").fetchone()[0],
+            'livres': cursor.execute("PRAGMA freelist_count").fetchone()[0],
+            'tamanho_pagina': cursor.execute("PRAGMA page_size").fetchone()[0],
+        }
+    
+    def executar_manutencao(self, completa: bool = False) -> Dict:
+        """
+        Atualiza estatísticas do planejador (ANALYZE/optimize), devolve páginas livres
+        (incremental vacuum) e verifica a integridade. Retorna um relatório com tempos.
+        No layout particionado, cada banco de contexto passa pelas mesmas etapas.
+        """
+        relatorio = {'antes': {}, 'depois': {}, 'etapas': [], 'integridade': []}
+        tempos = {}
+        
+        for caminho in self._bancos():
+            rotulo = os.path.basename(caminho) if self._particionado else None
+            self._manter_banco(caminho, completa, relatorio, tempos, rotulo)
+        
+        relatorio['etapas'] = list(tempos.items())
+        if all(linha == 'ok' for linha in relatorio['integridade']):
+            relatorio['integridade'] = ['ok']
+        return relatorio
+    
+    def _manter_banco(self, caminho: str, completa: bool, relatorio: Dict, tempos: Dict[str, float],
+                      rotulo: str = None):
+        """Executa as etapas de manutenção em um arquivo de banco, somando tempos e tamanhos"""
+        conn = self._abrir(caminho)
+        cursor = conn.cursor()
+        
+        def acumular(chave: str):
+            for campo, valor in self._estado_arquivo(cursor, caminho).items():
+                if campo == 'tamanho_pagina':
+                    relatorio[chave][campo] = valor
+                else:
+                    relatorio[chave][campo] = relatorio[chave].get(campo, 0) + valor
+        
+        def etapa(nome: str, *instrucoes: str):
+            inicio = time.perf_counter()
+            resultado = None
+            for instrucao in instrucoes:
+                resultado = cursor.execute(instrucao).fetchall()
+            tempos[nome] = tempos.get(nome, 0.0) + (time.perf_counter() - inicio) * 1000
+            return resultado
+        
+        acumular('antes')
+        
+        if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            # Bancos antigos: ativar o modo incremental exige um VACUUM completo (uma vez)
+            etapa("Ativar auto_vacuum incremental (VACUUM)", "PRAGMA auto_vacuum = INCREMENTAL", "VACUUM")
+        elif completa:
+            etapa("VACUUM completo", "VACUUM")
+        
+        etapa("ANALYZE", "ANALYZE")
+        etapa("PRAGMA optimize", "PRAGMA optimize")
+        etapa("Incremental vacuum", "PRAGMA incremental_vacuum")
+        verificacao = "PRAGMA integrity_check" if completa else "PRAGMA quick_check"
+        resultado = etapa("Integridade (integrity_check)" if completa else "Integridade (quick_check)",
+                          verificacao)
+        relatorio['integridade'].extend(row[0] if not rotulo or row[0] == 'ok' else f"{rotulo}: {row[0]}"
+                                        for row in resultado)
+        
+        cursor.execute('''
+            INSERT INTO pagto_meta (chave, valor) VALUES ('escritas_desde_manutencao', 0)
+            ON CONFLICT(chave) DO UPDATE SET valor = 0
+        ''')
+        cursor.execute('''
+            INSERT INTO pagto_meta (chave, valor) VALUES ('ultima_manutencao', ?)
+            ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor
+        ''', (datetime.now().isoformat(timespec='seconds'),))
         conn.commit()
+        
+        acumular('depois')
         conn.close()
     
+    def _mover_para_arquivo(self, cursor: sqlite3.Cursor, condicao: str, parametros=()) -> int:
+        """Move as linhas que atendem à condição da tabela quente para o arquivo"""
+        self._executar(cursor, f'''
+            INSERT INTO pagamentos_arquivo ({COLUNAS_ARQUIVADAS})
+            SELECT {COLUNAS_ARQUIVADAS} FROM pagamentos WHERE {condicao}
+        ''', parametros)
+        self._executar(cursor, f"DELETE FROM pagamentos WHERE {condicao}", parametros)
+        return cursor.rowcount
+    
     def _migrar_csv_se_necessario(self):
         """Migra dados de CSV antigo se existir"""
         csv_path = os.path.join(os.getcwd(), 'pagamentos.csv')
@@ -120,7 +1300,7 @@ class GerenciadorPagamentos:
         
         try:
             import csv
-            conn = sqlite3.connect(DB_PATH)
+            conn = self._conectar()
             cursor = conn.cursor()
             
             # Verifica se já tem dados
@@ -165,13 +1345,35 @@ class GerenciadorPagamentos:
         except Exception as e:
             print(f"✗ Erro na migração: {e}")
     
-    def _copiar_comprovante(self, caminho_origem: str, id_pagamento: int, beneficiario: str, valor: float) -> str:
-        """Copia o comprovante para a pasta e retorna o novo nome"""
+    def _preparar_comprovante(self, caminho_origem: str) -> Optional[Tuple[str, str]]:
+        """
+        Comprime (ou copia) o comprovante para um temporário oculto em COMPROVANTES_DIR, antes
+        da transação: dentro dela só falta renomear (_guardar_comprovante). Retorna o
+        temporário e a extensão que o nome final leva, ou None se não há o que guardar
+        """
         if not caminho_origem or not os.path.exists(caminho_origem):
-            return ""
+            return None
         
         # Pega a extensão do arquivo
         _, extensao = os.path.splitext(caminho_origem)
+        temporario = os.path.join(COMPROVANTES_DIR, f".{os.urandom(16).hex()}.tmp")
+        sufixo = None
+        try:
+            sufixo = _comprimir_comprovante(caminho_origem, temporario)
+            if not sufixo:
+                shutil.copy2(caminho_origem, temporario)
+            return temporario + (sufixo or ""), extensao + (sufixo or "")
+        except Exception as e:
+            print(f"  ⚠ Erro ao copiar comprovante: {e}")
+            for resto in (temporario, temporario + (sufixo or "")):
+                if os.path.exists(resto):
+                    os.remove(resto)
+            return None
+    
+    def _guardar_comprovante(self, preparado: Tuple[str, str], id_pagamento: int,
+                             beneficiario: str, valor: float) -> str:
+        """Renomeia o comprovante preparado para a pasta do ID e retorna o caminho relativo a COMPROVANTES_DIR"""
+        temporario, extensao = preparado
         
         # Limpa o nome do beneficiário (remove caracteres especiais)
         beneficiario_limpo = "".join(c for c in beneficiario if c.isalnum() or c in (' ', '-', '_')).strip()
@@ -180,18 +1382,25 @@ class GerenciadorPagamentos:
         # Valor arredondado
         valor_arredondado = int(round(valor))
         
-        # Monta o novo nome: ID_BENEFICIARIO_VALOR.extensao
-        novo_nome = f"{id_pagamento}_{beneficiario_limpo}_{valor_arredondado}{extensao}"
+        # Monta o novo nome: PASTA/ID_BENEFICIARIO_VALOR.extensao (a renomeação é atômica: o
+        # comprovante nunca aparece pela metade)
+        novo_nome = f"{_pasta_comprovante(id_pagamento)}/{id_pagamento}_{beneficiario_limpo}_{valor_arredondado}{extensao}"
         caminho_destino = os.path.join(COMPROVANTES_DIR, novo_nome)
-        
-        # Copia o arquivo
-        import shutil
+        os.makedirs(os.path.dirname(caminho_destino), exist_ok=True)
+        os.replace(temporario, caminho_destino)
+        return novo_nome
+    
+    def _descartar_preparado(self, preparado: Optional[Tuple[str, str]]):
+        """Apaga o temporário de um comprovante preparado que não chegou a ser guardado"""
+        if preparado and os.path.exists(preparado[0]):
+            os.remove(preparado[0])
+    
+    def _remover_comprovante(self, nome: str):
+        """Remove um comprovante copiado por uma transação que foi desfeita"""
         try:
-            shutil.copy2(caminho_origem, caminho_destino)
-            return novo_nome
-        except Exception as e:
-            print(f"  ⚠ Erro ao copiar comprovante: {e}")
-            return ""
+            os.remove(os.path.join(COMPROVANTES_DIR, nome))
+        except OSError:
+            pass
     
     def _aplicar_filtros_sql(self, filtros: Dict[str, str]) -> Tuple[str, List]:
         """Gera cláusula WHERE e parâmetros para filtros SQL"""
@@ -202,21 +1411,7 @@ class GerenciadorPagamentos:
         parametros = []
         
         # Mapeamento de campos
-        mapeamento = {
-            'categoria': 'categoria',
-            'beneficiario': 'beneficiario',
-            'conta': 'conta',
-            'devendo': 'devendo_para',
-            'devendo_para': 'devendo_para',
-            'pendente': 'pendente',
-            'data': 'data_pagamento',
-            'data_pagamento': 'data_pagamento',
-            'id': 'id',
-            'valor': 'valor',
-            'comprovante': 'comprovante',
-            'observacao': 'observacao',
-            'contexto': 'contexto'
-        }
+        mapeamento = MAPEAMENTO_FILTROS
         
         for campo, valor_filtro in filtros.items():
             campo_lower = campo.lower()
@@ -282,66 +1477,164 @@ class GerenciadorPagamentos:
         return f"{campo_sql} {direcao}, id ASC"
     
     def adicionar_pagamento(self, pagamento: Pagamento, caminho_comprovante: str = None) -> Optional[int]:
-        """Adiciona um novo pagamento ao banco"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        """Adiciona um novo pagamento ao banco (e o comprovante, na mesma transação)"""
+        # A compressão, que pode demorar, fica fora da transação (e do lock de escrita)
+        preparado = self._preparar_comprovante(caminho_comprovante) if caminho_comprovante else None
+        conn = self._conectar(contexto=pagamento.contexto)
+        nome_comprovante = ""
         
-        cursor.execute('''
-            INSERT INTO pagamentos 
-            (categoria, beneficiario, data_pagamento, conta, valor, 
-             devendo_para, pendente, deletado, comprovante, observacao, contexto)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            pagamento.categoria,
-            pagamento.beneficiario,
-            pagamento.data_pagamento,
-            pagamento.conta,
-            pagamento.valor,
-            pagamento.devendo_para,
-            1 if pagamento.pendente else 0,
-            1 if pagamento.deletado else 0,
-            pagamento.comprovante,
-            pagamento.observacao,
-            pagamento.contexto
-        ))
-        
-        pagamento_id = cursor.lastrowid
-        conn.commit()
+        try:
+            with self._transacao(conn) as cursor:
+                semelhantes = self._semelhantes(cursor, pagamento)
+                pagamento_id = self._reservar_ids(cursor, pagamento.contexto, 1)[0]
+                self._executar(cursor, '''
+                    INSERT INTO pagamentos 
+                    (id, categoria, beneficiario, data_pagamento, conta, valor, 
+                     devendo_para, pendente, deletado, comprovante, observacao, contexto)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    pagamento_id,
+                    pagamento.categoria,
+                    pagamento.beneficiario,
+                    pagamento.data_pagamento,
+                    pagamento.conta,
+                    pagamento.valor,
+                    pagamento.devendo_para,
+                    1 if pagamento.pendente else 0,
+                    1 if pagamento.deletado else 0,
+                    pagamento.comprovante,
+                    pagamento.observacao,
+                    pagamento.contexto
+                ))
+                pagamento_id = cursor.lastrowid
+                
+                # Guarda o comprovante preparado (o nome leva o ID, conhecido só agora)
+                if preparado:
+                    nome_comprovante = self._guardar_comprovante(
+                        preparado,
+                        pagamento_id,
+                        pagamento.beneficiario,
+                        pagamento.valor
+                    )
+                    self._executar(cursor, "UPDATE pagamentos SET comprovante = ? WHERE id = ?",
+                                   (nome_comprovante, pagamento_id))
+        except BaseException:
+            # Transação desfeita: o arquivo copiado não pode ficar órfão
+            if nome_comprovante:
+                self._remover_comprovante(nome_comprovante)
+            else:
+                self._descartar_preparado(preparado)
+            conn.close()
+            raise
+        
+        self._registrar_escrita(conn)
         conn.close()
         
-        # Copia o comprovante se fornecido
-        if caminho_comprovante:
-            nome_comprovante = self._copiar_comprovante(
-                caminho_comprovante,
-                pagamento_id,
-                pagamento.beneficiario,
-                pagamento.valor
-            )
-            if nome_comprovante:
-                # Atualiza o registro com o nome do comprovante
-                conn = sqlite3.connect(DB_PATH)
-                cursor = conn.cursor()
-                cursor.execute("UPDATE pagamentos SET comprovante = ? WHERE id = ?",
-                             (nome_comprovante, pagamento_id))
-                conn.commit()
-                conn.close()
-        
         msg = f"\n✓ Pagamento registrado com sucesso! (ID: {pagamento_id}, Contexto: {pagamento.contexto})"
         if caminho_comprovante and nome_comprovante:
             msg += f"\n✓ Comprovante salvo: {nome_comprovante}"
         print(msg)
+        if semelhantes:
+            print(f"⚠ Possível duplicata: mesmo beneficiário, valor e conta em "
+                  f"{', '.join(f'ID {id_pag} ({data_pag})' for id_pag, data_pag in semelhantes)}")
+            print(f"💡 Se for repetido, use: pagto delete {pagamento_id}")
         
         return pagamento_id
     
+    def _semelhantes(self, cursor: sqlite3.Cursor, pagamento: Pagamento,
+                     janela: int = JANELA_DUPLICADOS_DIAS) -> List[Tuple[int, str]]:
+        """
+        (id, data) dos pagamentos com a mesma impressão (beneficiário, valor e conta) a até
+        'janela' dias da data do pagamento: uma busca por faixa no índice de impressão.
+        Os limites da janela saem do próprio SQLite (data inválida: NULL, nenhuma linha)
+        """
+        data = pagamento.data_pagamento or ""
+        data_iso = f"{data[6:10]}-{data[3:5]}-{data[0:2]}"
+        return self._executar(cursor, f'''
+            SELECT id, data_pagamento FROM pagamentos
+            WHERE impressao = {IMPRESSAO_SQL.format(conta='?', valor='?', beneficiario='?')}
+              AND {DATA_ISO_SQL} BETWEEN date(?, ?) AND date(?, ?) AND deletado IS 0
+            ORDER BY {DATA_ISO_SQL}, id
+        ''', (pagamento.conta, pagamento.valor, pagamento.beneficiario,
+              data_iso, f"-{janela} days", data_iso, f"+{janela} days"))
+    
+    def adicionar_lote(self, pagamentos: List[Pagamento]) -> Tuple[List[int], List[int]]:
+        """
+        Insere vários pagamentos numa única transação (no layout particionado, uma por contexto):
+        se algo falhar, nenhum pagamento daquele banco é gravado. Retorna os IDs, na ordem
+        recebida, e os dos que parecem duplicatas (de pagamentos existentes ou do próprio lote)
+        """
+        grupos = defaultdict(list)
+        for posicao, pagamento in enumerate(pagamentos):
+            grupos[pagamento.contexto if self._particionado else None].append(posicao)
+        
+        ids = [None] * len(pagamentos)
+        suspeitos = []
+        for contexto, posicoes in grupos.items():
+            conn = self._conectar(contexto=contexto)
+            try:
+                with self._transacao(conn) as cursor:
+                    reservados = self._reservar_ids(cursor, contexto, len(posicoes))
+                    for posicao, pagamento_id in zip(posicoes, reservados):
+                        pagamento = pagamentos[posicao]
+                        semelhantes = self._semelhantes(cursor, pagamento)
+                        cursor.execute('''
+                            INSERT INTO pagamentos
+                            (id, categoria, beneficiario, data_pagamento, conta, valor,
+                             devendo_para, pendente, deletado, comprovante, observacao, contexto)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, '', ?, ?)
+                        ''', (pagamento_id, pagamento.categoria, pagamento.beneficiario,
+                              pagamento.data_pagamento, pagamento.conta, pagamento.valor,
+                              pagamento.devendo_para, 1 if pagamento.pendente else 0,
+                              pagamento.observacao, pagamento.contexto))
+                        ids[posicao] = cursor.lastrowid
+                        if semelhantes:
+                            suspeitos.append(cursor.lastrowid)
+            except BaseException:
+                conn.close()
+                raise
+            
+            self._registrar_escrita(conn)
+            conn.close()
+        
+        return ids, suspeitos
+    
+    def _reservar_ids(self, cursor: sqlite3.Cursor, contexto: str, quantidade: int) -> List[Optional[int]]:
+        """
+        IDs dos próximos pagamentos, reservados dentro da transação em curso.
+        None deixa o AUTOINCREMENT escolher (banco único sem faixa de sincronização)
+        """
+        faixa = None if self._particionado else cursor.execute(
+            "SELECT valor FROM pagto_meta WHERE chave = 'sync_faixa'").fetchone()
+        if faixa:
+            # Cópia sincronizada: os IDs saem da faixa reservada para esta máquina
+            primeiro = self._proximo_id_faixa(cursor, int(faixa[0]))
+            return list(range(primeiro, primeiro + quantidade))
+        if self._particionado:
+            # O ID é global: reservado no diretório do banco principal, na mesma transação
+            ids = []
+            for _ in range(quantidade):
+                self._executar(cursor, "INSERT INTO diretorio.ids_pagamentos (contexto) VALUES (?)", (contexto,))
+                ids.append(cursor.lastrowid)
+            return ids
+        return [None] * quantidade
+    
     def listar_todos(self, incluir_deletados: bool = False, filtros: Dict[str, str] = None,
-                    ordenacao: str = None) -> List[Dict]:
-        """Lista todos os pagamentos"""
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
+                    ordenacao: str = None, incluir_arquivados: bool = False,
+                    conn: sqlite3.Connection = None) -> List[RegistroPagamento]:
+        """Lista todos os pagamentos (da tabela quente, ou também do arquivo), numa conexão nova ou na dada"""
+        propria = conn is None
+        if propria:
+            conn = self._conectar(filtros=filtros)
         cursor = conn.cursor()
+        cursor.row_factory = _fabrica_registro
         
         # Monta a query base
-        query = "SELECT * FROM pagamentos"
+        if incluir_arquivados:
+            query = (f"SELECT {COLUNAS_PAGAMENTO} FROM (SELECT {COLUNAS_PAGAMENTO} FROM pagamentos"
+                     f" UNION ALL SELECT {COLUNAS_PAGAMENTO} FROM pagamentos_arquivo)")
+        else:
+            query = f"SELECT {COLUNAS_PAGAMENTO} FROM pagamentos"
         parametros = []
         
         # Adiciona condição de deletados
@@ -367,20 +1660,122 @@ class GerenciadorPagamentos:
         order_by = self._parsear_ordenacao(ordenacao)
         query += f" ORDER BY {order_by}"
         
-        cursor.execute(query, parametros)
-        resultados = cursor.fetchall()
-        conn.close()
+        resultados = self._executar(cursor, query, parametros, filtros)
+        if propria:
+            conn.close()
         
-        # Converte para lista de dicionários
-        return [dict(row) for row in resultados]
+        return resultados
+    
+    def _topologia(self, filtros: Dict[str, str] = None) -> Tuple:
+        """Layout e contextos que uma listagem com esses filtros lê (atualiza self._particionado)"""
+        self._particionado = self._ler_meta('layout') == 'contextos'
+        return (self._particionado, tuple(self._particoes(filtros)) if self._particionado else ())
     
-    def listar_deletados(self, filtros: Dict[str, str] = None, ordenacao: str = None) -> List[Dict]:
-        """Lista apenas os pagamentos deletados"""
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
+    def acompanhar_listagem(self, filtros: Dict[str, str] = None, ordenacao: str = None,
+                            incluir_arquivados: bool = False, intervalo: float = 1.0):
+        """
+        Gera a listagem de novo a cada mudança no banco. Uma única conexão fica aberta e, entre
+        uma consulta e outra, só se lê o PRAGMA data_version de cada banco dela (muda quando
+        outra conexão grava no arquivo) a cada 'intervalo' segundos. Se o layout ou os
+        contextos lidos mudarem (pagto particionar, contexto novo), a conexão é refeita.
+        """
+        conn, bancos, versao, topologia = None, [], None, None
+        try:
+            while True:
+                if conn is None:
+                    topologia = self._topologia(filtros)
+                    conn = self._conectar(filtros=filtros)
+                    arquivos = {os.path.abspath(row[2]) for row in conn.execute("PRAGMA database_list") if row[2]}
+                    if os.path.abspath(DB_PATH) not in arquivos:
+                        # Banco de um só contexto: o principal é anexado para ver contextos novos
+                        conn.execute("ATTACH DATABASE ? AS diretorio", (DB_PATH,))
+                    bancos = [row[1] for row in conn.execute("PRAGMA database_list") if row[1] != 'temp']
+                
+                atual = tuple(conn.execute(f"PRAGMA {banco}.data_version").fetchone()[0] for banco in bancos)
+                if atual != versao:
+                    if versao is not None and self._topologia(filtros) != topologia:
+                        conn.close()
+                        conn, versao = None, None
+                        continue
+                    versao = atual
+                    yield self.listar_todos(filtros=filtros, ordenacao=ordenacao,
+                                            incluir_arquivados=incluir_arquivados, conn=conn)
+                time.sleep(intervalo)
+        finally:
+            if conn is not None:
+                conn.close()
+    
+    def pagina_pagamentos(self, filtros: Dict[str, str] = None, ordem: str = 'data', descendente: bool = False,
+                          a_partir: Tuple = None, para_tras: bool = False,
+                          limite: int = LINHAS_PAGINA_NAVEGADOR) -> List[Tuple]:
+        """
+        Uma página da listagem dos ativos por keyset: os 'limite' pagamentos seguintes à linha
+        de chave 'a_partir' (ou os anteriores, com para_tras; sem 'a_partir', os primeiros ou os
+        últimos). Não há OFFSET: a consulta desce pelo índice da ordem a partir da chave dada,
+        então o custo de uma página não depende de quão longe ela está do início. No layout
+        particionado cada banco devolve a sua página e só essas linhas são intercaladas.
+        Retorna tuplas (chave, RegistroPagamento) na ordem da listagem; a chave é a tupla das
+        colunas de CHAVES_NAVEGADOR[ordem] mais o id.
+        """
+        colunas = CHAVES_NAVEGADOR[ordem]
+        # Para trás, a página é lida no sentido inverso e desvirada no fim
+        maior, direcao = ('<', 'DESC') if descendente != para_tras else ('>', 'ASC')
+        where_filtros, parametros = self._aplicar_filtros_sql(filtros)
+        condicoes = ["deletado IS 0"] + ([where_filtros] if where_filtros else [])
+        if a_partir is not None:
+            condicoes.append(f"({', '.join(colunas + ('id',))}) {maior} ({', '.join('?' * len(a_partir))})")
+            parametros = parametros + list(a_partir)
+            if colunas and not colunas[0].isidentifier():
+                # O SQLite não delimita um índice de expressão por row value: a data ganha um limite só dela
+                condicoes.append(f"{colunas[0]} {maior}= ?")
+                parametros.append(a_partir[0])
+
+        nomes = [f"chave{n}" for n in range(len(colunas))]
+        selecao = "".join(f"{coluna} AS {nome}, " for coluna, nome in zip(colunas, nomes))
+        ordenacao = ", ".join(f"{coluna} {direcao}" for coluna in colunas + ('id',))
+
+        conn = self._conectar(filtros=filtros)
+        bancos = [linha[1] for linha in conn.execute("PRAGMA database_list")
+                  if linha[1] == 'main' or re.fullmatch(r'p\d+', linha[1])]
+        consultas = [f"SELECT {selecao}{COLUNAS_PAGAMENTO} FROM {banco}.pagamentos"
+                     f" WHERE {' AND '.join(condicoes)} ORDER BY {ordenacao} LIMIT ?" for banco in bancos]
+        if len(consultas) == 1:
+            query = consultas[0]
+        else:
+            query = (" UNION ALL ".join(f"SELECT * FROM ({consulta})" for consulta in consultas)
+                     + f" ORDER BY {', '.join(f'{nome} {direcao}' for nome in nomes + ['id'])} LIMIT ?")
+        linhas = self._executar(conn.cursor(), query, (parametros + [limite]) * len(consultas)
+                                + ([limite] if len(consultas) > 1 else []), filtros)
+        conn.close()
+
+        pagina = []
+        for linha in linhas:
+            registro = tuple.__new__(RegistroPagamento, linha[len(colunas):])
+            pagina.append((linha[:len(colunas)] + (registro.id,), registro))
+        return pagina[::-1] if para_tras else pagina
+
+    def resumo_listagem(self, filtros: Dict[str, str] = None) -> Tuple[int, float]:
+        """Quantidade e total dos pagamentos ativos que atendem aos filtros"""
+        where_filtros, parametros = self._aplicar_filtros_sql(filtros)
+        condicoes = " AND ".join(["deletado = 0"] + ([where_filtros] if where_filtros else []))
+
+        conn = self._conectar(filtros=filtros)
+        quantidade, total = self._executar(conn.cursor(), f'''
+            SELECT COUNT(*), SUM(valor) FROM pagamentos WHERE {condicoes}
+        ''', parametros, filtros)[0]
+        conn.close()
+        return quantidade, total or 0.0
+
+    def listar_deletados(self, filtros: Dict[str, str] = None, ordenacao: str = None) -> List[RegistroPagamento]:
+        """Lista apenas os pagamentos deletados (arquivados ou ainda na tabela quente)"""
+        conn = self._conectar(filtros=filtros)
         cursor = conn.cursor()
+        cursor.row_factory = _fabrica_registro
         
-        query = "SELECT * FROM pagamentos WHERE deletado = 1"
+        query = (f"SELECT {COLUNAS_PAGAMENTO} FROM ("
+                 f"SELECT {COLUNAS_PAGAMENTO} FROM pagamentos_arquivo"
+                 f" UNION ALL SELECT {COLUNAS_PAGAMENTO} FROM pagamentos"
+                 f") WHERE deletado = 1")
         parametros = []
         
         # Aplica filtros
@@ -396,65 +1791,215 @@ class GerenciadorPagamentos:
         order_by = self._parsear_ordenacao(ordenacao)
         query += f" ORDER BY {order_by}"
         
-        cursor.execute(query, parametros)
-        resultados = cursor.fetchall()
+        resultados = self._executar(cursor, query, parametros, filtros)
         conn.close()
         
-        return [dict(row) for row in resultados]
+        return resultados
     
-    def buscar_por_id(self, id_busca: int) -> Optional[Dict]:
+    def buscar_por_id(self, id_busca: int) -> Optional[RegistroPagamento]:
         """Busca um pagamento por ID"""
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row
+        conn = self._conectar_por_id(id_busca)
         cursor = conn.cursor()
+        cursor.row_factory = _fabrica_registro
         
-        cursor.execute("SELECT * FROM pagamentos WHERE id = ?", (id_busca,))
-        resultado = cursor.fetchone()
+        # Procura primeiro na tabela quente e depois no arquivo
+        resultados = self._executar(cursor, f'''
+            SELECT {COLUNAS_PAGAMENTO} FROM pagamentos WHERE id = ?
+            UNION ALL
+            SELECT {COLUNAS_PAGAMENTO} FROM pagamentos_arquivo WHERE id = ?
+        ''', (id_busca, id_busca))
         conn.close()
         
-        return dict(resultado) if resultado else None
+        return resultados[0] if resultados else None
+    
+    def caminho_comprovante(self, id_pagamento: int) -> Optional[str]:
+        """
+        Caminho do comprovante de um pagamento (ativo ou arquivado), pela chave primária:
+        a coluna já diz a pasta, então nunca é preciso listar o diretório
+        """
+        conn = self._conectar_por_id(id_pagamento)
+        linhas = self._executar(conn.cursor(), '''
+            SELECT comprovante FROM pagamentos WHERE id = ?
+            UNION ALL
+            SELECT comprovante FROM pagamentos_arquivo WHERE id = ?
+        ''', (id_pagamento, id_pagamento))
+        conn.close()
+        
+        if not linhas or not linhas[0][0]:
+            return None
+        return os.path.join(COMPROVANTES_DIR, linhas[0][0])
+    
+    def compactar_comprovantes(self) -> Dict[str, int]:
+        """
+        Comprime os comprovantes já guardados sem compressão. Os arquivos são comprimidos fora
+        de transação e a coluna é trocada em lotes curtos (só se o pagamento ainda aponta para o
+        mesmo arquivo); o original é apagado depois do commit. Retorna contagens e bytes.
+        """
+        resultado = {'comprimidos': 0, 'mantidos': 0, 'ausentes': 0, 'antes': 0, 'depois': 0}
+        sufixos = tuple(SUFIXOS_COMPRESSAO.values())
+        for caminho in self._bancos():
+            conn = self._abrir(caminho)
+            for tabela in ('pagamentos', 'pagamentos_arquivo'):
+                linhas = conn.execute(f"SELECT id, comprovante FROM {tabela} WHERE comprovante <> ''").fetchall()
+                pendentes = []
+                for posicao, (id_pag, nome) in enumerate(linhas):
+                    if not nome.endswith(sufixos):
+                        atual = os.path.join(COMPROVANTES_DIR, nome)
+                        if not os.path.exists(atual):
+                            resultado['ausentes'] += 1
+                        else:
+                            sufixo = _comprimir_comprovante(atual, atual)
+                            if sufixo:
+                                pendentes.append((id_pag, nome, nome + sufixo))
+                            else:
+                                resultado['mantidos'] += 1
+                    if pendentes and (len(pendentes) >= 200 or posicao == len(linhas) - 1):
+                        self._trocar_comprovantes(conn, tabela, pendentes, resultado)
+                        pendentes = []
+            conn.close()
+        return resultado
+    
+    def _trocar_comprovantes(self, conn: sqlite3.Connection, tabela: str, trocas: List[Tuple[int, str, str]],
+                             resultado: Dict[str, int]):
+        """Grava os nomes comprimidos de um lote e apaga os arquivos que deixaram de ser usados"""
+        trocados = []
+        with self._transacao(conn) as cursor:
+            for id_pag, antigo, novo in trocas:
+                cursor.execute(f"UPDATE {tabela} SET comprovante = ? WHERE id = ? AND comprovante = ?",
+                               (novo, id_pag, antigo))
+                trocados.append(cursor.rowcount == 1)
+        for (_, antigo, novo), trocado in zip(trocas, trocados):
+            # Pagamento editado nesse meio-tempo: a cópia comprimida é que sobra
+            sobra = os.path.join(COMPROVANTES_DIR, antigo if trocado else novo)
+            if trocado:
+                resultado['comprimidos'] += 1
+                resultado['antes'] += os.path.getsize(sobra)
+                resultado['depois'] += os.path.getsize(os.path.join(COMPROVANTES_DIR, novo))
+            os.remove(sobra)
     
     def marcar_como_deletado(self, id_pagamento: int) -> bool:
-        """Marca um pagamento como deletado"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        """Marca um pagamento como deletado e o move para o arquivo"""
+        conn = self._conectar_por_id(id_pagamento)
         
-        cursor.execute("UPDATE pagamentos SET deletado = 1 WHERE id = ?", (id_pagamento,))
-        linhas_afetadas = cursor.rowcount
+        with self._transacao(conn) as cursor:
+            self._executar(cursor, "UPDATE pagamentos SET deletado = 1 WHERE id = ?", (id_pagamento,))
+            linhas_afetadas = cursor.rowcount
+            
+            if linhas_afetadas:
+                self._mover_para_arquivo(cursor, "id = ?", (id_pagamento,))
+            else:
+                # Pagamento antigo já arquivado: basta marcar lá
+                self._executar(cursor, "UPDATE pagamentos_arquivo SET deletado = 1 WHERE id = ?",
+                               (id_pagamento,))
+                linhas_afetadas = cursor.rowcount
         
-        conn.commit()
+        self._registrar_escrita(conn)
         conn.close()
         
         return linhas_afetadas > 0
     
+    def restaurar_pagamento(self, id_pagamento: int) -> bool:
+        """Traz um pagamento do arquivo de volta à tabela quente, como não deletado"""
+        conn = self._conectar_por_id(id_pagamento)
+        
+        with self._transacao(conn) as cursor:
+            self._executar(cursor, f'''
+                INSERT INTO pagamentos ({COLUNAS_ARQUIVADAS})
+                SELECT {COLUNAS_ARQUIVADAS} FROM pagamentos_arquivo WHERE id = ?
+            ''', (id_pagamento,))
+            restaurados = cursor.rowcount
+            
+            if restaurados:
+                self._executar(cursor, "DELETE FROM pagamentos_arquivo WHERE id = ?", (id_pagamento,))
+                self._executar(cursor, "UPDATE pagamentos SET deletado = 0 WHERE id = ?", (id_pagamento,))
+            else:
+                # Deletado de versões anteriores, ainda na tabela quente
+                self._executar(cursor, "UPDATE pagamentos SET deletado = 0 WHERE id = ? AND deletado = 1",
+                               (id_pagamento,))
+                restaurados = cursor.rowcount
+        
+        self._registrar_escrita(conn)
+        conn.close()
+        
+        return restaurados > 0
+    
+    def arquivar(self, antes_de: str = None) -> Dict[str, int]:
+        """
+        Move para o arquivo os deletados que ainda estão na tabela quente e,
+        se antes_de (aaaa-mm-dd) for informado, também os pagamentos anteriores a essa data
+        """
+        resultado = {'deletados': 0, 'antigos': 0, 'quente': 0, 'arquivo': 0}
+        
+        for caminho in self._bancos():
+            conn = self._abrir(caminho)
+            
+            with self._transacao(conn) as cursor:
+                resultado['deletados'] += self._mover_para_arquivo(cursor, "deletado = 1")
+                if antes_de:
+                    resultado['antigos'] += self._mover_para_arquivo(cursor, f"{DATA_ISO_SQL} < ?",
+                                                                     (antes_de,))
+            self._registrar_escrita(conn)
+            
+            resultado['quente'] += self._executar(cursor, "SELECT COUNT(*) FROM pagamentos")[0][0]
+            resultado['arquivo'] += self._executar(cursor, "SELECT COUNT(*) FROM pagamentos_arquivo")[0][0]
+            conn.close()
+        
+        return resultado
+    
     def atualizar_pagamento(self, id_pagamento: int, dados_atualizados: Dict,
                           caminho_comprovante: str = None) -> bool:
         """Atualiza um pagamento existente"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+        if 'data_pagamento' in dados_atualizados:
+            _validar_data(dados_atualizados['data_pagamento'])
+        novo_contexto = dados_atualizados.get('contexto')
+        if self._particionado and novo_contexto is not None:
+            contexto_atual = self._contexto_do_id(id_pagamento)
+            if contexto_atual is not None and contexto_atual != novo_contexto:
+                self._mover_entre_particoes(id_pagamento, contexto_atual, novo_contexto)
+        
+        preparado = self._preparar_comprovante(caminho_comprovante) if caminho_comprovante else None
+        conn = self._conectar_por_id(id_pagamento)
+        try:
+            with self._transacao(conn) as cursor:
+                linhas_afetadas = self._atualizar_na_transacao(cursor, id_pagamento, dados_atualizados,
+                                                               preparado)
+        except BaseException:
+            # Transação desfeita: remove o comprovante que acabou de ser guardado (ou o preparado)
+            if preparado and os.path.exists(preparado[0]):
+                self._descartar_preparado(preparado)
+            elif preparado and dados_atualizados.get('comprovante'):
+                self._remover_comprovante(dados_atualizados['comprovante'])
+            conn.close()
+            raise
         
-        # Se há novo comprovante, copia e atualiza
-        if caminho_comprovante:
+        if linhas_afetadas:
+            self._registrar_escrita(conn)
+        conn.close()
+        
+        return linhas_afetadas > 0
+    
+    def _atualizar_na_transacao(self, cursor: sqlite3.Cursor, id_pagamento: int, dados_atualizados: Dict,
+                                preparado: Tuple[str, str] = None) -> int:
+        """Guarda o comprovante preparado (se houver) e grava os campos alterados; retorna as linhas afetadas"""
+        # Se há novo comprovante, guarda e atualiza
+        if preparado:
             beneficiario = dados_atualizados.get('beneficiario')
             valor = dados_atualizados.get('valor', 0)
             
             # Se beneficiario ou valor não estão nos dados atualizados, busca do banco
             if not beneficiario or not valor:
-                cursor.execute("SELECT beneficiario, valor FROM pagamentos WHERE id = ?",
-                             (id_pagamento,))
-                row = cursor.fetchone()
-                if row:
-                    beneficiario = beneficiario or row[0]
-                    valor = valor or row[1]
+                linhas = self._executar(cursor, "SELECT beneficiario, valor FROM pagamentos WHERE id = ?",
+                                        (id_pagamento,))
+                if linhas:
+                    beneficiario = beneficiario or linhas[0][0]
+                    valor = valor or linhas[0][1]
             
-            nome_comprovante = self._copiar_comprovante(
-                caminho_comprovante,
+            dados_atualizados['comprovante'] = self._guardar_comprovante(
+                preparado,
                 id_pagamento,
                 beneficiario,
                 float(valor)
             )
-            if nome_comprovante:
-                dados_atualizados['comprovante'] = nome_comprovante
         
         # Monta a query de atualização
         campos = []
@@ -466,83 +2011,1566 @@ class GerenciadorPagamentos:
                 valores.append(valor)
         
         if not campos:
-            conn.close()
-            return False
+            return 0
         
         valores.append(id_pagamento)
         query = f"UPDATE pagamentos SET {', '.join(campos)} WHERE id = ?"
         
-        cursor.execute(query, valores)
+        self._executar(cursor, query, valores)
         linhas_afetadas = cursor.rowcount
         
+        if not linhas_afetadas:
+            # Pagamento antigo, já movido para o arquivo
+            self._executar(cursor, query.replace("UPDATE pagamentos ", "UPDATE pagamentos_arquivo ", 1),
+                           valores)
+            linhas_afetadas = cursor.rowcount
+        
+        return linhas_afetadas
+    
+    def _mover_entre_particoes(self, id_pagamento: int, origem: str, destino: str):
+        """Leva um pagamento (quente ou arquivado) do banco de um contexto para o de outro"""
+        caminho_origem = self._particoes()[origem]
+        conn = self._conectar_particao(destino)
+        conn.execute("ATTACH DATABASE ? AS origem", (caminho_origem,))
+        
+        with self._transacao(conn) as cursor:
+            for tabela, colunas in COLUNAS_PARTICAO.items():
+                self._executar(cursor, f'''
+                    INSERT INTO main.{tabela} ({colunas})
+                    SELECT {colunas} FROM origem.{tabela} WHERE id = ?
+                ''', (id_pagamento,))
+                self._executar(cursor, f"DELETE FROM origem.{tabela} WHERE id = ?", (id_pagamento,))
+            self._executar(cursor, "UPDATE diretorio.ids_pagamentos SET contexto = ? WHERE id = ?",
+                           (destino, id_pagamento))
+        conn.close()
+    
+    def agregrar_por_categoria(self, filtros: Dict[str, str] = None) -> Dict[str, float]:
+        """Agrega os valores por categoria"""
+        conn = self._conectar(filtros=filtros)
+        cursor = conn.cursor()
+        
+        query = f"SELECT categoria, SUM(valor) as total FROM {self._origem_consulta(cursor)} WHERE deletado = 0"
+        parametros = []
+        
+        # Aplica filtros
+        if filtros:
+            filtros_limpos = {k: v for k, v in filtros.items() if k.lower() != 'sort'}
+            if filtros_limpos:
+                where_filtros, params_filtros = self._aplicar_filtros_sql(filtros_limpos)
+                if where_filtros:
+                    query += " AND " + where_filtros
+                    parametros.extend(params_filtros)
+        
+        query += " GROUP BY categoria ORDER BY categoria"
+        
+        resultados = self._executar(cursor, query, parametros, filtros)
+        conn.close()
+        
+        return {row[0]: row[1] for row in resultados}
+    
+    def _condicoes_filtros(self, filtros: Dict[str, str], condicoes: List[str] = None) -> Tuple[str, List]:
+        """Monta o WHERE completo a partir de condições fixas e dos filtros da linha de comando"""
+        condicoes = list(condicoes or [])
+        parametros = []
+        
+        if filtros:
+            filtros_limpos = {k: v for k, v in filtros.items() if k.lower() != 'sort'}
+            if filtros_limpos:
+                where_filtros, params_filtros = self._aplicar_filtros_sql(filtros_limpos)
+                if where_filtros:
+                    condicoes.append(where_filtros)
+                    parametros.extend(params_filtros)
+        
+        where = " WHERE " + " AND ".join(condicoes) if condicoes else ""
+        return where, parametros
+    
+    def _chave_snapshot(self) -> str:
+        """Identifica o estado do banco pelo tamanho e mtime dos arquivos (e dos WAL, se houver)"""
+        partes = []
+        for banco in self._bancos():
+            for caminho in (banco, banco + "-wal"):
+                if os.path.exists(caminho):
+                    info = os.stat(caminho)
+                    partes.append(f"{info.st_size}:{info.st_mtime_ns}")
+        return "|".join(partes)
+    
+    def _construir_snapshot(self, chave: str) -> Dict:
+        """Lê as colunas dos pagamentos ativos e grava o snapshot colunar em ANALISE_DIR"""
+        conn = self._conectar()
+        cursor = conn.cursor()
+        
+        query = (f"SELECT valor, pendente, {', '.join(CAMPOS_SNAPSHOT)}"
+                 f" FROM {self._origem_consulta(cursor)} WHERE deletado = 0")
+        dicionarios = {campo: {} for campo in CAMPOS_SNAPSHOT}
+        snapshot = {'valor': array('d'), 'pendente': array('b')}
+        snapshot.update({campo: array('l') for campo in CAMPOS_SNAPSHOT})
+        
+        # Processa em blocos, coluna a coluna: cada texto vira o índice no seu dicionário
+        for bloco in self._executar_em_blocos(cursor, query):
+            colunas = list(zip(*bloco))
+            snapshot['valor'].extend(colunas[0])
+            snapshot['pendente'].extend(p or 0 for p in colunas[1])
+            for campo, valores in zip(CAMPOS_SNAPSHOT, colunas[2:]):
+                dicionario = dicionarios[campo]
+                snapshot[campo].extend(dicionario.setdefault(v, len(dicionario)) for v in valores)
+        conn.close()
+        
+        snapshot['dicionarios'] = {campo: list(d) for campo, d in dicionarios.items()}
+        
+        # Grava os arrays primeiro e o meta.json por último: ele é quem valida o conjunto
+        os.makedirs(ANALISE_DIR, exist_ok=True)
+        for nome in ('valor', 'pendente') + CAMPOS_SNAPSHOT:
+            temporario = os.path.join(ANALISE_DIR, f"{nome}.bin.tmp")
+            with open(temporario, 'wb') as f:
+                snapshot[nome].tofile(f)
+            os.replace(temporario, os.path.join(ANALISE_DIR, f"{nome}.bin"))
+        meta = {
+            'chave': chave,
+            'linhas': len(snapshot['valor']),
+            'tipos': {nome: snapshot[nome].typecode for nome in ('valor', 'pendente') + CAMPOS_SNAPSHOT},
+            'dicionarios': snapshot['dicionarios'],
+        }
+        temporario = os.path.join(ANALISE_DIR, "meta.json.tmp")
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(temporario, os.path.join(ANALISE_DIR, "meta.json"))
+        
+        return snapshot
+    
+    def _ler_snapshot(self, chave: str) -> Optional[Dict]:
+        """Carrega o snapshot colunar do disco, se existir e corresponder ao estado atual do banco"""
+        try:
+            with open(os.path.join(ANALISE_DIR, "meta.json"), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('chave') != chave:
+                return None
+            
+            snapshot = {'dicionarios': meta['dicionarios']}
+            for nome, tipo in meta['tipos'].items():
+                dados = array(tipo)
+                with open(os.path.join(ANALISE_DIR, f"{nome}.bin"), 'rb') as f:
+                    dados.fromfile(f, meta['linhas'])
+                snapshot[nome] = dados
+            return snapshot
+        except (OSError, ValueError, KeyError, EOFError):
+            return None
+    
+    def _snapshot_analitico(self) -> Dict:
+        """Retorna o snapshot colunar atual, reconstruindo-o se o banco mudou"""
+        chave = self._chave_snapshot()
+        return self._ler_snapshot(chave) or self._construir_snapshot(chave)
+    
+    def carregar_colunas(self, filtros: Dict[str, str] = None) -> Dict:
+        """
+        Retorna valor, ano e categoria (como códigos em 'categorias') dos pagamentos ativos
+        filtrados, em arrays compactos. Usa o snapshot colunar quando os filtros permitem.
+        """
+        filtros_limpos = {k: v for k, v in (filtros or {}).items() if k.lower() != 'sort'}
+        campos_snapshot = {'valor', 'pendente'} | set(CAMPOS_SNAPSHOT)
+        
+        if all(MAPEAMENTO_FILTROS.get(k.lower()) in campos_snapshot for k in filtros_limpos):
+            return filtrar_snapshot(self._snapshot_analitico(), filtros_limpos)
+        
+        # Filtros fora do snapshot (id, observação, ...): consulta direta ao banco
+        conn = self._conectar(filtros=filtros)
+        cursor = conn.cursor()
+        
+        where, parametros = self._condicoes_filtros(filtros, ["deletado = 0"])
+        origem = self._origem_consulta(cursor)
+        
+        nomes = self._executar(cursor, f"SELECT DISTINCT categoria FROM {origem}{where} ORDER BY categoria",
+                               parametros, filtros)
+        linhas = self._executar(cursor, f'''
+            SELECT valor,
+                   CAST(substr(data_pagamento, 7, 4) AS INTEGER),
+                   DENSE_RANK() OVER (ORDER BY categoria) - 1
+            FROM {origem}{where}
+        ''', parametros, filtros)
+        conn.close()
+        
+        # Transpõe as linhas em colunas sem laço Python por linha
+        valores, anos, codigos = zip(*linhas) if linhas else ((), (), ())
+        return {
+            'valores': array('d', valores),
+            'anos': array('l', anos),
+            'codigos': array('l', codigos),
+            'categorias': [row[0] for row in nomes],
+        }
+    
+    def listar_contextos(self) -> List[Dict[str, any]]:
+        """Lista todos os contextos com estatísticas"""
+        conn = self._conectar()
+        cursor = conn.cursor()
+        
+        resultados = self._executar(cursor, '''
+            SELECT 
+                contexto,
+                COUNT(*) as total_registros,
+                SUM(CASE WHEN deletado = 0 THEN 1 ELSE 0 END) as ativos,
+                SUM(CASE WHEN deletado = 0 THEN valor ELSE 0 END) as total_valor
+            FROM (
+                SELECT contexto, deletado, valor FROM pagamentos
+                UNION ALL
+                SELECT contexto, deletado, valor FROM pagamentos_arquivo
+            )
+            GROUP BY contexto
+            ORDER BY contexto
+        ''')
+        conn.close()
+        
+        contextos = []
+        for row in resultados:
+            contextos.append({
+                'contexto': row[0],
+                'total_registros': row[1],
+                'ativos': row[2],
+                'total_valor': row[3]
+            })
+        
+        return contextos
+    
+    def listar_sugestoes(self, campo: str, contexto: str = None) -> List[str]:
+        """
+        Valores já usados num campo (categoria, beneficiario, conta ou contexto), dos mais
+        usados aos menos; com contexto, os usados nele vêm primeiro. Lê só a tabela sugestoes
+        (e, no layout particionado, a de cada contexto)
+        """
+        caminhos = list(self._particoes().values()) if self._particionado else [DB_PATH]
+        encontrados = {}
+        for caminho in caminhos:
+            conn = self._abrir(caminho)
+            for valor, usos, local in self._executar(conn.cursor(), '''
+                SELECT valor, SUM(usos), MAX(contexto = ?) FROM sugestoes
+                WHERE campo = ? GROUP BY valor
+            ''', (contexto, campo)):
+                # Mesma grafia sem diferenciar maiúsculas (como a coluna): fica a primeira vista
+                chave = valor.lower()
+                anterior = encontrados.get(chave, (valor, 0, 0))
+                encontrados[chave] = (anterior[0], anterior[1] + usos, max(anterior[2], local or 0))
+            conn.close()
+        ordenados = sorted(encontrados.values(), key=lambda v: (-v[2], -v[1], v[0].lower()))
+        return [valor for valor, _, _ in ordenados]
+    
+    def listar_mudancas(self, desde=0, filtros: Dict[str, str] = None, limite: int = None):
+        """
+        Gera as mudanças com seq > desde, em ordem, lendo o diário em blocos (sem carregar
+        tudo na memória). No layout particionado cada banco de contexto tem a sua sequência:
+        os registros trazem o 'contexto', desde pode ser um dicionário contexto → seq (None é
+        o diário do principal, com o histórico de antes do particionamento; contextos ausentes
+        começam do 0) e os diários são intercalados pelo momento, com o limite valendo para o total.
+        """
+        bancos = {None: DB_PATH}
+        if self._particionado:
+            por_contexto = any(MAPEAMENTO_FILTROS.get(campo.lower()) == 'contexto' for campo in (filtros or {}))
+            bancos = {**({} if por_contexto else bancos), **self._particoes(filtros)}
+        query = "SELECT seq, op, pagamento_id, campos, antigos, novos, momento FROM mudancas WHERE seq > ? ORDER BY seq"
+        if limite:
+            query += f" LIMIT {int(limite)}"
+        
+        conexoes = []
+        
+        def diario(contexto: Optional[str], caminho: str):
+            conn = self._abrir(caminho)
+            conexoes.append(conn)
+            posicao = desde.get(contexto, 0) if isinstance(desde, dict) else desde
+            for bloco in self._executar_em_blocos(conn.cursor(), query, (posicao,), filtros, 1000):
+                for linha in bloco:
+                    yield contexto, linha
+        
+        try:
+            diarios = [diario(contexto, caminho) for contexto, caminho in bancos.items()]
+            intercalados = heapq.merge(*diarios, key=lambda item: item[1][6])
+            for contexto, (seq, op, pagamento_id, campos, antigos, novos, momento) in islice(intercalados, limite):
+                mudanca = {'seq': seq, 'op': op, 'id': pagamento_id,
+                           'campos': campos.split(',') if campos else [],
+                           'antigos': json.loads(antigos) if antigos else None,
+                           'novos': json.loads(novos) if novos else None,
+                           'momento': momento}
+                if contexto is not None:
+                    mudanca['contexto'] = contexto
+                yield mudanca
+        finally:
+            for conn in conexoes:
+                conn.close()
+    
+    def criar_recorrencia(self, modelo: Pagamento, inicio: date, passo: int, unidade: str,
+                          parcelas: int = None, termino: date = None) -> int:
+        """Grava um modelo de pagamento recorrente; as ocorrências são criadas por gerar_recorrencias"""
+        conn = _nova_conexao(DB_PATH)
+        with self._transacao(conn) as cursor:
+            self._executar(cursor, '''
+                INSERT INTO recorrencias
+                (categoria, beneficiario, conta, valor, devendo_para, observacao, contexto,
+                 inicio, passo, unidade, parcelas, termino)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                modelo.categoria,
+                modelo.beneficiario,
+                modelo.conta,
+                modelo.valor,
+                modelo.devendo_para,
+                modelo.observacao,
+                modelo.contexto,
+                inicio.isoformat(),
+                passo,
+                unidade,
+                parcelas,
+                termino.isoformat() if termino else None
+            ))
+            recorrencia_id = cursor.lastrowid
+        conn.close()
+        return recorrencia_id
+    
+    def listar_recorrencias(self) -> List[Dict]:
+        """Modelos recorrentes com a data da próxima ocorrência (None quando já terminaram)"""
+        conn = _nova_conexao(DB_PATH)
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        recorrencias = [dict(row) for row in self._executar(cursor, "SELECT * FROM recorrencias ORDER BY id")]
+        conn.close()
+        
+        for recorrencia in recorrencias:
+            proximas = self._ocorrencias_devidas(recorrencia, date.max, limite=1)
+            recorrencia['proxima'] = proximas[0][1] if proximas else None
+        return recorrencias
+    
+    def remover_recorrencia(self, recorrencia_id: int) -> bool:
+        """Remove o modelo; os pagamentos já gerados continuam no banco"""
+        conn = _nova_conexao(DB_PATH)
+        with self._transacao(conn) as cursor:
+            self._executar(cursor, "DELETE FROM recorrencias WHERE id = ?", (recorrencia_id,))
+            removidas = cursor.rowcount
+        conn.close()
+        return removidas > 0
+    
+    def _ocorrencias_devidas(self, recorrencia: Dict, ate: date, limite: int = None) -> List[Tuple[int, date]]:
+        """Ocorrências ainda não geradas com data até 'ate', como (número, data)"""
+        inicio = date.fromisoformat(recorrencia['inicio'])
+        termino = date.fromisoformat(recorrencia['termino']) if recorrencia['termino'] else None
+        ultima = min(ate, termino) if termino else ate
+        
+        ocorrencias = []
+        numero = recorrencia['geradas']
+        while recorrencia['parcelas'] is None or numero < recorrencia['parcelas']:
+            if limite is not None and len(ocorrencias) >= limite:
+                break
+            data_ocorrencia = _data_ocorrencia(inicio, recorrencia['passo'], recorrencia['unidade'], numero)
+            if data_ocorrencia > ultima:
+                break
+            ocorrencias.append((numero, data_ocorrencia))
+            numero += 1
+        return ocorrencias
+    
+    def gerar_recorrencias(self, ate: date = None) -> Dict[int, int]:
+        """
+        Cria como pendentes todas as ocorrências vencidas até 'ate' (padrão: hoje), em lote,
+        numa transação por banco. O contador 'geradas' avança na mesma transação e é relido
+        sob o lock de escrita, então repetir (ou rodar em paralelo) nunca duplica pagamentos.
+        Retorna quantos pagamentos foram criados por recorrência.
+        """
+        ate = ate or date.today()
+        if self._particionado:
+            # Cada contexto no seu banco, com o principal (e as recorrências) anexado como 'diretorio'
+            conn = _nova_conexao(DB_PATH)
+            grupos = [row[0] for row in conn.execute("SELECT DISTINCT contexto FROM recorrencias")]
+            conn.close()
+        else:
+            grupos = [None]
+        
+        geradas = {}
+        for contexto in grupos:
+            conn = self._conectar(contexto=contexto)
+            tabela = "diretorio.recorrencias" if contexto is not None else "recorrencias"
+            condicao, parametros = ("WHERE contexto = ?", (contexto,)) if contexto is not None else ("", ())
+            
+            try:
+                with self._transacao(conn) as cursor:
+                    cursor.row_factory = sqlite3.Row
+                    modelos = [dict(row) for row in self._executar(
+                        cursor, f"SELECT * FROM {tabela} {condicao} ORDER BY id", parametros)]
+                    for modelo in modelos:
+                        ocorrencias = self._ocorrencias_devidas(modelo, ate)
+                        if not ocorrencias:
+                            continue
+                        
+                        ids = self._reservar_ids(cursor, modelo['contexto'], len(ocorrencias))
+                        linhas = []
+                        for pagamento_id, (numero, data_ocorrencia) in zip(ids, ocorrencias):
+                            marca = f"Recorrência #{modelo['id']}"
+                            if modelo['parcelas']:
+                                marca += f" ({numero + 1}/{modelo['parcelas']})"
+                            linhas.append((
+                                pagamento_id,
+                                modelo['categoria'],
+                                modelo['beneficiario'],
+                                data_ocorrencia.strftime("%d/%m/%Y"),
+                                modelo['conta'],
+                                modelo['valor'],
+                                modelo['devendo_para'],
+                                f"{modelo['observacao']} - {marca}" if modelo['observacao'] else marca,
+                                modelo['contexto']
+                            ))
+                        cursor.executemany('''
+                            INSERT INTO pagamentos
+                            (id, categoria, beneficiario, data_pagamento, conta, valor,
+                             devendo_para, pendente, deletado, comprovante, observacao, contexto)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, 1, 0, '', ?, ?)
+                        ''', linhas)
+                        self._executar(cursor, f"UPDATE {tabela} SET geradas = ? WHERE id = ?",
+                                       (ocorrencias[-1][0] + 1, modelo['id']))
+                        geradas[modelo['id']] = len(linhas)
+            except BaseException:
+                conn.close()
+                raise
+            
+            if geradas:
+                self._registrar_escrita(conn)
+            conn.close()
+        
+        return geradas
+    
+    def projetar_fluxo(self, filtros: Dict[str, str] = None, por: str = 'mes',
+                       ate: date = None) -> List[Dict]:
+        """
+        Saídas previstas por período (dia, semana ou mês) até 'ate' (padrão: 90 dias): os
+        pagamentos pendentes, inclusive vencidos, e as ocorrências das recorrências ainda não
+        geradas. A soma por período e o acumulado saem de uma única consulta com função de
+        janela, sobre o índice parcial da data ISO dos pendentes.
+        """
+        ate = ate or date.today() + timedelta(days=DIAS_FLUXO_PADRAO)
+        # O fluxo é sempre dos pendentes: um filtro pendente:n não faria sentido aqui
+        filtros = {campo: valor for campo, valor in (filtros or {}).items()
+                   if MAPEAMENTO_FILTROS.get(campo.lower()) != 'pendente'}
+        where_filtros, params_filtros = self._aplicar_filtros_sql(filtros)
+        filtro_sql = f" AND {where_filtros}" if where_filtros else ""
+
+        previstos = []
+        for modelo in self.listar_recorrencias():
+            for _, data_ocorrencia in self._ocorrencias_devidas(modelo, ate):
+                previstos.append((modelo['categoria'], modelo['beneficiario'], modelo['conta'], modelo['valor'],
+                                  modelo['devendo_para'], modelo['observacao'], modelo['contexto'],
+                                  data_ocorrencia.strftime("%d/%m/%Y")))
+
+        conn = self._conectar(filtros=filtros)
+        cursor = conn.cursor()
+        # Mesmas colunas de pagamentos, para que os filtros valham igualmente para os previstos
+        cursor.execute('''
+            CREATE TEMP TABLE fluxo_previstos (
+                id INTEGER, categoria TEXT, beneficiario TEXT, conta TEXT, valor REAL,
+                devendo_para TEXT, observacao TEXT, contexto TEXT, data_pagamento TEXT,
+                pendente INTEGER DEFAULT 1, comprovante TEXT DEFAULT ''
+            )
+        ''')
+        cursor.executemany('''
+            INSERT INTO temp.fluxo_previstos
+            (categoria, beneficiario, conta, valor, devendo_para, observacao, contexto, data_pagamento)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', previstos)
+
+        linhas = self._executar(cursor, f'''
+            WITH itens AS (
+                SELECT {DATA_ISO_SQL} AS dia, valor, 0 AS previsto FROM {self._origem_consulta(cursor)}
+                WHERE pendente = 1 AND deletado = 0 AND {DATA_ISO_SQL} <= ? AND {DATA_VALIDA_SQL}{filtro_sql}
+                UNION ALL
+                SELECT {DATA_ISO_SQL}, valor, 1 FROM temp.fluxo_previstos
+                WHERE 1 = 1{filtro_sql}
+            ),
+            periodos AS (
+                SELECT {CHAVES_FLUXO[por]} AS periodo,
+                       COUNT(*) AS quantidade,
+                       SUM(valor * (1 - previsto)) AS pendentes,
+                       SUM(valor * previsto) AS previstos,
+                       SUM(valor) AS total,
+                       SUM(CASE WHEN dia < ? THEN valor ELSE 0 END) AS vencido
+                FROM itens
+                GROUP BY periodo
+            )
+            SELECT periodo, quantidade, pendentes, previstos, total, vencido,
+                   SUM(total) OVER (ORDER BY periodo ROWS UNBOUNDED PRECEDING) AS acumulado
+            FROM periodos
+            ORDER BY periodo
+        ''', [ate.isoformat()] + params_filtros + params_filtros + [date.today().isoformat()], filtros)
+        conn.close()
+
+        campos = ('periodo', 'quantidade', 'pendentes', 'previstos', 'total', 'vencido', 'acumulado')
+        return [dict(zip(campos, linha)) for linha in linhas]
+
+    def _origem_consulta(self, cursor: sqlite3.Cursor, incluir_arquivados: Optional[bool] = None) -> str:
+        """
+        Tabela (ou união com o arquivo) lida pelos relatórios agregados. Sem escolha explícita
+        (None), o arquivo entra quando guarda pagamentos ativos (os antigos movidos por
+        'pagto arquivar antes:'), para que os totais não mudem ao arquivar; sem eles, a consulta
+        segue só na tabela quente, com os índices dela
+        """
+        if incluir_arquivados is None:
+            cursor.execute("SELECT 1 FROM pagamentos_arquivo WHERE deletado = 0 LIMIT 1")
+            incluir_arquivados = cursor.fetchone() is not None
+        if not incluir_arquivados:
+            return "pagamentos"
+        return (f"(SELECT {COLUNAS_PAGAMENTO} FROM pagamentos"
+                f" UNION ALL SELECT {COLUNAS_PAGAMENTO} FROM pagamentos_arquivo)")
+
+    def pendentes_com_data_invalida(self, filtros: Dict[str, str] = None) -> List[Tuple]:
+        """(id, data_pagamento) dos pendentes ativos cuja data não é uma dd/mm/aaaa válida (fora do fluxo)"""
+        filtros = {campo: valor for campo, valor in (filtros or {}).items()
+                   if MAPEAMENTO_FILTROS.get(campo.lower()) != 'pendente'}
+        where_filtros, parametros = self._aplicar_filtros_sql(filtros)
+        filtro_sql = f" AND {where_filtros}" if where_filtros else ""
+
+        conn = self._conectar(filtros=filtros)
+        cursor = conn.cursor()
+        linhas = self._executar(cursor, f'''
+            SELECT id, data_pagamento FROM {self._origem_consulta(cursor)}
+            WHERE pendente = 1 AND deletado = 0 AND NOT ({DATA_VALIDA_SQL}){filtro_sql}
+            ORDER BY id
+        ''', parametros, filtros)
+        conn.close()
+        return linhas
+
+    def extrato_por_conta(self, filtros: Dict[str, str] = None,
+                          incluir_arquivados: Optional[bool] = None) -> List[Tuple]:
+        """
+        Pagamentos ativos em ordem cronológica por conta, cada um com o acumulado da sua conta
+        (SUM OVER PARTITION BY conta). Retorna tuplas
+        (conta, id, data_pagamento, categoria, beneficiario, valor, pendente, acumulado)
+        """
+        where_filtros, parametros = self._aplicar_filtros_sql(filtros)
+        condicoes = " AND ".join(["deletado = 0"] + ([where_filtros] if where_filtros else []))
+
+        conn = self._conectar(filtros=filtros)
+        cursor = conn.cursor()
+        linhas = self._executar(cursor, f'''
+            SELECT conta, id, data_pagamento, categoria, beneficiario, valor, pendente,
+                   SUM(valor) OVER (
+                       PARTITION BY conta ORDER BY {DATA_ISO_SQL}, id ROWS UNBOUNDED PRECEDING
+                   ) AS acumulado
+            FROM {self._origem_consulta(cursor, incluir_arquivados)}
+            WHERE {condicoes}
+            ORDER BY conta, {DATA_ISO_SQL}, id
+        ''', parametros, filtros)
+        conn.close()
+        return linhas
+
+    def saldos_por_conta(self, filtros: Dict[str, str] = None,
+                         incluir_arquivados: Optional[bool] = None) -> List[Dict]:
+        """Subtotais de todas as contas (que atendem aos filtros) numa única consulta agregada"""
+        where_filtros, parametros = self._aplicar_filtros_sql(filtros)
+        condicoes = " AND ".join(["deletado = 0"] + ([where_filtros] if where_filtros else []))
+
+        conn = self._conectar(filtros=filtros)
+        cursor = conn.cursor()
+        linhas = self._executar(cursor, f'''
+            SELECT conta,
+                   COUNT(*) AS quantidade,
+                   SUM(valor) AS total,
+                   SUM(CASE WHEN pendente = 1 THEN valor ELSE 0 END) AS pendentes,
+                   MIN({DATA_ISO_SQL}) AS primeiro,
+                   MAX({DATA_ISO_SQL}) AS ultimo,
+                   SUM(valor) * 100.0 / SUM(SUM(valor)) OVER () AS participacao
+            FROM {self._origem_consulta(cursor, incluir_arquivados)}
+            WHERE {condicoes}
+            GROUP BY conta
+            ORDER BY total DESC
+        ''', parametros, filtros)
+        conn.close()
+
+        campos = ('conta', 'quantidade', 'total', 'pendentes', 'primeiro', 'ultimo', 'participacao')
+        return [dict(zip(campos, linha)) for linha in linhas]
+
+    def ranking(self, por: str = 'beneficiario', limite: int = 10, filtros: Dict[str, str] = None,
+                incluir_arquivados: Optional[bool] = None) -> List[Dict]:
+        """
+        Os 'limite' maiores grupos por valor total, ordenados e cortados no SQL. Participação,
+        posição e participação acumulada (Pareto) são funções de janela sobre os grupos,
+        então consideram todos eles, não só os devolvidos. Cada linha traz também os totais
+        gerais (grupos, quantidade e valor) para o resumo do que ficou de fora.
+        """
+        coluna = COLUNAS_RANKING[por]
+        where_filtros, parametros = self._aplicar_filtros_sql(filtros)
+        # O índice parcial só compensa quando cobre todos os filtros; com outros filtros, a
+        # forma 'deletado = 0' o deixa de fora e a tabela é varrida uma vez
+        filtradas = {MAPEAMENTO_FILTROS.get(campo.lower(), campo.lower()) for campo in (filtros or {})}
+        cobre = coluna in INDICES_RANKING and filtradas <= {coluna, 'valor'}
+        ativos = "deletado IS 0" if cobre else "deletado = 0"
+        condicoes = " AND ".join([ativos] + ([where_filtros] if where_filtros else []))
+
+        conn = self._conectar(filtros=filtros)
+        cursor = conn.cursor()
+        linhas = self._executar(cursor, f'''
+            SELECT {coluna} AS grupo,
+                   COUNT(*) AS quantidade,
+                   SUM(valor) AS total,
+                   RANK() OVER (ORDER BY SUM(valor) DESC) AS posicao,
+                   SUM(valor) * 100.0 / SUM(SUM(valor)) OVER () AS participacao,
+                   SUM(SUM(valor)) OVER (ORDER BY SUM(valor) DESC, {coluna} ROWS UNBOUNDED PRECEDING)
+                       * 100.0 / SUM(SUM(valor)) OVER () AS acumulado,
+                   COUNT(*) OVER () AS grupos,
+                   SUM(COUNT(*)) OVER () AS quantidade_geral,
+                   SUM(SUM(valor)) OVER () AS total_geral
+            FROM {self._origem_consulta(cursor, incluir_arquivados)}
+            WHERE {condicoes}
+            GROUP BY {coluna}
+            ORDER BY total DESC, {coluna}
+            LIMIT ?
+        ''', parametros + [limite], filtros)
+        conn.close()
+
+        campos = ('grupo', 'quantidade', 'total', 'posicao', 'participacao', 'acumulado',
+                  'grupos', 'quantidade_geral', 'total_geral')
+        return [dict(zip(campos, linha)) for linha in linhas]
+
+    def encontrar_duplicados(self, filtros: Dict[str, str] = None,
+                             janela: int = JANELA_DUPLICADOS_DIAS) -> List[List[RegistroPagamento]]:
+        """
+        Grupos de pagamentos com a mesma impressão (beneficiário, valor e conta) e datas a até
+        'janela' dias uma da seguinte. Uma única passada na ordem do índice (impressão, data)
+        compara cada linha só com a anterior, em vez de todos os pares; só as linhas dos grupos
+        encontrados são lidas por inteiro depois. No layout particionado, cada contexto é
+        examinado no seu banco
+        """
+        where_filtros, parametros = self._aplicar_filtros_sql(filtros)
+        condicoes = " AND ".join(["deletado IS 0"] + ([where_filtros] if where_filtros else []))
+        query = f'''
+            SELECT id, impressao, julianday({DATA_ISO_SQL}) FROM pagamentos
+            WHERE {condicoes}
+            ORDER BY impressao, {DATA_ISO_SQL}, id
+        '''
+        caminhos = list(self._particoes(filtros).values()) if self._particionado else [DB_PATH]
+        
+        grupos = []
+        for caminho in caminhos:
+            conn = self._abrir(caminho)
+            ids_grupos = []
+            anterior, dia_anterior, id_anterior = None, None, None
+            # Em blocos: só os IDs dos grupos ficam em memória, não o índice inteiro
+            for bloco in self._executar_em_blocos(conn.cursor(), query, parametros, filtros):
+                for id_pag, impressao, dia in bloco:
+                    if impressao == anterior and dia is not None and dia_anterior is not None \
+                            and dia - dia_anterior <= janela:
+                        if not ids_grupos or ids_grupos[-1][-1] != id_anterior:
+                            ids_grupos.append([id_anterior])
+                        ids_grupos[-1].append(id_pag)
+                    anterior, dia_anterior, id_anterior = impressao, dia, id_pag
+            
+            ids = [id_pag for grupo in ids_grupos for id_pag in grupo]
+            cursor = conn.cursor()
+            cursor.row_factory = _fabrica_registro
+            registros = {}
+            for n in range(0, len(ids), 500):
+                lote = ids[n:n + 500]
+                registros.update((r.id, r) for r in self._executar(
+                    cursor,
+                    f"SELECT {COLUNAS_PAGAMENTO} FROM pagamentos WHERE id IN ({', '.join('?' * len(lote))})",
+                    lote))
+            conn.close()
+            grupos += [[registros[id_pag] for id_pag in grupo] for grupo in ids_grupos]
+        return grupos
+    
+    def _origem(self, cursor: sqlite3.Cursor) -> str:
+        """
+        Identificador desta cópia do banco nos changesets (criado no primeiro uso). Exige a
+        faixa de IDs reservada com 'pagto sync faixa:N': sem ela, os pagamentos novos das
+        duas cópias sairiam da mesma sequência (ValueError)
+        """
+        if not cursor.execute("SELECT 1 FROM pagto_meta WHERE chave = 'sync_faixa'").fetchone():
+            raise ValueError(f"esta cópia ainda não tem faixa de IDs; reserve uma com 'pagto sync faixa:N' "
+                             f"(0 a {FAIXAS_SYNC - 1}, diferente em cada máquina)")
+        linha = cursor.execute("SELECT valor FROM pagto_meta WHERE chave = 'sync_origem'").fetchone()
+        if linha:
+            return linha[0]
+        import uuid
+        
+        origem = uuid.uuid4().hex
+        self._gravar_meta(cursor, 'sync_origem', origem)
+        return origem
+    
+    def definir_faixa_ids(self, faixa: int) -> int:
+        """Reserva a faixa de IDs desta cópia, para que pagamentos novos não colidam entre máquinas"""
+        if not 0 <= faixa < FAIXAS_SYNC:
+            raise ValueError(f"faixa fora de 0 a {FAIXAS_SYNC - 1}: {faixa}")
+        conn = self._conectar()
+        with self._transacao(conn) as cursor:
+            self._gravar_meta(cursor, 'sync_faixa', faixa)
+            proximo = self._proximo_id_faixa(cursor, faixa)
+        conn.close()
+        return proximo
+    
+    def _proximo_id_faixa(self, cursor: sqlite3.Cursor, faixa: int) -> int:
+        """
+        Próximo ID dentro da faixa desta cópia. O AUTOINCREMENT sempre passa do maior ID
+        da tabela, então, depois de importar IDs de outra faixa, os novos cairiam nela
+        """
+        base, teto = faixa * FAIXA_IDS_SYNC, (faixa + 1) * FAIXA_IDS_SYNC
+        maior = cursor.execute('''
+            SELECT MAX(maior) FROM (
+                SELECT MAX(id) AS maior FROM pagamentos WHERE id > ? AND id < ?
+                UNION ALL
+                SELECT MAX(id) FROM pagamentos_arquivo WHERE id > ? AND id < ?
+            )
+        ''', (base, teto, base, teto)).fetchone()[0]
+        return (maior or base) + 1
+    
+    def exportar_changeset(self, arquivo: str, desde: int = None) -> Dict:
+        """
+        Grava em arquivo (JSON por linha, gzip) as mudanças feitas nesta cópia após a seq
+        'desde' (padrão: o fim da última exportação). Mudanças vindas de outras cópias não
+        são reexportadas.
+        """
+        import gzip
+        
+        conn = self._conectar()
+        cursor = conn.cursor()
+        origem = self._origem(cursor)
+        if desde is None:
+            linha = cursor.execute("SELECT valor FROM pagto_meta WHERE chave = 'sync_exportado_ate'").fetchone()
+            desde = int(linha[0]) if linha else 0
+        ate = cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM mudancas").fetchone()[0]
+        
+        quantidade = 0
+        temporario = arquivo + ".tmp"
+        with gzip.open(temporario, 'wt', encoding='utf-8') as f:
+            cabecalho = {'formato': FORMATO_CHANGESET, 'versao': 1, 'origem': origem, 'desde': desde,
+                         'ate': ate, 'momento': datetime.now().isoformat(timespec='seconds')}
+            f.write(json.dumps(cabecalho, ensure_ascii=False) + "\n")
+            consulta = cursor.execute('''
+                SELECT seq, op, pagamento_id, antigos, novos FROM mudancas
+                WHERE seq > ? AND seq <= ? AND origem IS NULL ORDER BY seq
+            ''', (desde, ate))
+            for seq, op, pagamento_id, antigos, novos in consulta:
+                registro = {'seq': seq, 'op': op, 'id': pagamento_id}
+                if antigos:
+                    registro['antigos'] = json.loads(antigos)
+                if novos:
+                    registro['novos'] = json.loads(novos)
+                f.write(json.dumps(registro, ensure_ascii=False, separators=(',', ':')) + "\n")
+                quantidade += 1
+        os.replace(temporario, arquivo)
+        
+        self._gravar_meta(cursor, 'sync_exportado_ate', ate)
         conn.commit()
         conn.close()
+        return {'mudancas': quantidade, 'desde': desde, 'ate': ate, 'origem': origem,
+                'tamanho': os.path.getsize(arquivo)}
+    
+    def _linha_sync(self, cursor: sqlite3.Cursor, id_pagamento: int) -> Tuple[Optional[str], Optional[Dict]]:
+        """Tabela ('pagamentos' ou 'pagamentos_arquivo') e campos atuais de um pagamento"""
+        for tabela in ('pagamentos', 'pagamentos_arquivo'):
+            linha = cursor.execute(f"SELECT {', '.join(CAMPOS_DIARIO)} FROM {tabela} WHERE id = ?",
+                                   (id_pagamento,)).fetchone()
+            if linha:
+                return tabela, dict(zip(CAMPOS_DIARIO, linha))
+        return None, None
+    
+    def _aplicar_mudanca(self, cursor: sqlite3.Cursor, mudanca: Dict, forcar: bool) -> Optional[str]:
+        """Aplica uma mudança importada; retorna a descrição do conflito, se houver (e não forçado)"""
+        op, id_pagamento = mudanca['op'], mudanca['id']
+        tabela, atual = self._linha_sync(cursor, id_pagamento)
+        # Só campos conhecidos: os nomes viram colunas no SQL
+        antigos = {k: v for k, v in (mudanca.get('antigos') or {}).items() if k in CAMPOS_DIARIO}
+        novos = {k: v for k, v in (mudanca.get('novos') or {}).items() if k in CAMPOS_DIARIO}
         
-        return linhas_afetadas > 0
+        def atualizar(campos: Dict):
+            atribuicoes = ", ".join(f"{campo} = ?" for campo in campos)
+            self._executar(cursor, f"UPDATE {tabela} SET {atribuicoes} WHERE id = ?",
+                           list(campos.values()) + [id_pagamento])
+        
+        if op == 'INSERT':
+            if atual is None:
+                colunas = ", ".join(novos)
+                self._executar(cursor, f"INSERT INTO pagamentos (id, {colunas}) VALUES (?{', ?' * len(novos)})",
+                               [id_pagamento] + list(novos.values()))
+            elif any(atual.get(campo) != valor for campo, valor in novos.items()):
+                if not forcar:
+                    return "ID já existe aqui com outro conteúdo (reserve faixas com 'pagto sync faixa:N')"
+                atualizar(novos)
+        
+        elif op == 'UPDATE':
+            if atual is None:
+                return "pagamento não existe nesta cópia"
+            if all(atual.get(campo) == valor for campo, valor in novos.items()):
+                return None
+            if any(atual.get(campo) != valor for campo, valor in antigos.items()) and not forcar:
+                alterados = ", ".join(campo for campo in antigos if atual.get(campo) != antigos[campo])
+                return f"alterado nas duas cópias ({alterados})"
+            atualizar(novos)
+        
+        elif op == 'DELETE':
+            if atual is None:
+                return None
+            if any(atual.get(campo) != valor for campo, valor in antigos.items()) and not forcar:
+                return "removido lá, mas alterado aqui"
+            self._executar(cursor, f"DELETE FROM {tabela} WHERE id = ?", (id_pagamento,))
+        
+        elif op == 'ARQUIVAR' and tabela == 'pagamentos':
+            self._mover_para_arquivo(cursor, "id = ?", (id_pagamento,))
+        
+        elif op == 'RESTAURAR' and tabela == 'pagamentos_arquivo':
+            self._executar(cursor, f'''
+                INSERT INTO pagamentos ({COLUNAS_ARQUIVADAS})
+                SELECT {COLUNAS_ARQUIVADAS} FROM pagamentos_arquivo WHERE id = ?
+            ''', (id_pagamento,))
+            self._executar(cursor, "DELETE FROM pagamentos_arquivo WHERE id = ?", (id_pagamento,))
+        
+        return None
+    
+    def importar_changeset(self, arquivo: str, forcar: bool = False) -> Dict:
+        """
+        Aplica um changeset de outra cópia numa única transação. Mudanças já importadas
+        (seq até a última vista daquela origem) são puladas; conflitos no mesmo ID são
+        relatados e não aplicados, a menos que forcar=True (a mudança importada prevalece),
+        e voltam a ser avaliados na próxima importação do mesmo changeset.
+        """
+        import gzip
+        
+        with gzip.open(arquivo, 'rt', encoding='utf-8') as f:
+            cabecalho = json.loads(f.readline())
+            if cabecalho.get('formato') != FORMATO_CHANGESET:
+                raise ValueError("arquivo não é um changeset do pagto")
+            
+            conn = self._conectar()
+            try:
+                with self._transacao(conn) as cursor:
+                    if cabecalho['origem'] == self._origem(cursor):
+                        raise ValueError("o changeset foi exportado por esta mesma cópia")
+                    
+                    chave_origem = f"sync_importado:{cabecalho['origem']}"
+                    linha = cursor.execute("SELECT valor FROM pagto_meta WHERE chave = ?",
+                                           (chave_origem,)).fetchone()
+                    ja_importado = int(linha[0]) if linha else 0
+                    inicio_diario = cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM mudancas").fetchone()[0]
+                    
+                    resultado = {'aplicadas': 0, 'puladas': 0, 'conflitos': []}
+                    for texto in f:
+                        mudanca = json.loads(texto)
+                        if mudanca['seq'] <= ja_importado:
+                            resultado['puladas'] += 1
+                            continue
+                        conflito = self._aplicar_mudanca(cursor, mudanca, forcar)
+                        if conflito:
+                            resultado['conflitos'].append((mudanca['seq'], mudanca['op'], mudanca['id'], conflito))
+                        else:
+                            resultado['aplicadas'] += 1
+                    
+                    # O que foi aplicado aqui fica marcado com a origem e não volta no próximo 'exportar'
+                    self._executar(cursor, "UPDATE mudancas SET origem = ? WHERE seq > ?",
+                                   (cabecalho['origem'], inicio_diario))
+                    # Com conflitos, a próxima importação recomeça no primeiro deles (as demais são idempotentes)
+                    ate = resultado['conflitos'][0][0] - 1 if resultado['conflitos'] else cabecalho['ate']
+                    self._gravar_meta(cursor, chave_origem, max(ja_importado, ate))
+            except BaseException:
+                conn.close()
+                raise
+        
+        self._registrar_escrita(conn)
+        conn.close()
+        return resultado
+    
+    def particionar(self) -> Dict[str, int]:
+        """
+        Passa para o layout particionado: copia os pagamentos de cada contexto para o seu
+        banco em CONTEXTOS_DIR e deixa no principal só o diretório de IDs. Retorna as linhas
+        copiadas por contexto. Pode ser repetido com segurança se for interrompido.
+        """
+        if self._particionado:
+            return {}
+        
+        conn = _nova_conexao(DB_PATH)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS particoes (
+                contexto TEXT PRIMARY KEY,
+                arquivo TEXT NOT NULL
+            )
+        ''')
+        # Reserva os IDs de todos os contextos: continuam únicos entre os bancos
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS ids_pagamentos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                contexto TEXT NOT NULL
+            )
+        ''')
+        for tabela in COLUNAS_PARTICAO:
+            cursor.execute(f"UPDATE {tabela} SET contexto = 'pessoal' WHERE contexto IS NULL")
+        contextos = [row[0] for row in self._executar(cursor, '''
+            SELECT contexto FROM pagamentos UNION SELECT contexto FROM pagamentos_arquivo
+        ''')]
+        existentes = dict(cursor.execute("SELECT contexto, arquivo FROM particoes"))
+        for contexto in contextos:
+            if contexto not in existentes:
+                existentes[contexto] = self._registrar_particao(cursor, contexto)
+        conn.commit()
+        
+        copiados = {}
+        for contexto in contextos:
+            particao = self._abrir(os.path.join(CONTEXTOS_DIR, existentes[contexto]))
+            particao.execute("ATTACH DATABASE ? AS origem", (DB_PATH,))
+            cursor_particao = particao.cursor()
+            copiados[contexto] = 0
+            with self._gatilhos_pausados(cursor_particao):
+                for tabela, colunas in COLUNAS_PARTICAO.items():
+                    self._executar(cursor_particao, f'''
+                        INSERT OR REPLACE INTO main.{tabela} ({colunas})
+                        SELECT {colunas} FROM origem.{tabela} WHERE contexto = ?
+                    ''', (contexto,))
+                    copiados[contexto] += cursor_particao.rowcount
+                # Com os gatilhos pausados, as sugestões do contexto vão junto, já contadas
+                self._executar(cursor_particao, '''
+                    INSERT OR REPLACE INTO main.sugestoes (contexto, campo, valor, usos)
+                    SELECT contexto, campo, valor, usos FROM origem.sugestoes WHERE contexto = ?
+                ''', (contexto,))
+                # O diário do contexto continua depois do principal: a seq não volta para trás
+                ultima_seq = cursor_particao.execute('''
+                    SELECT COALESCE(MAX(seq), 0) FROM (
+                        SELECT seq FROM main.sqlite_sequence WHERE name = 'mudancas'
+                        UNION ALL SELECT seq FROM origem.sqlite_sequence WHERE name = 'mudancas'
+                    )
+                ''').fetchone()[0]
+                cursor_particao.execute("DELETE FROM main.sqlite_sequence WHERE name = 'mudancas'")
+                cursor_particao.execute("INSERT INTO main.sqlite_sequence (name, seq) VALUES ('mudancas', ?)",
+                                        (ultima_seq,))
+            particao.commit()
+            particao.close()
+        
+        # Só depois de todas as cópias gravadas o principal deixa de ter os pagamentos. O
+        # diário do principal fica como está: é o histórico de antes do particionamento
+        self._executar(cursor, '''
+            INSERT OR REPLACE INTO ids_pagamentos (id, contexto)
+            SELECT id, contexto FROM pagamentos UNION ALL SELECT id, contexto FROM pagamentos_arquivo
+        ''')
+        ultimo_id = cursor.execute('''
+            SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name IN ('pagamentos', 'ids_pagamentos')
+        ''').fetchone()[0]
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'ids_pagamentos'")
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('ids_pagamentos', ?)", (ultimo_id,))
+        with self._gatilhos_pausados(cursor):
+            for tabela in COLUNAS_PARTICAO:
+                self._executar(cursor, f"DELETE FROM {tabela}")
+            cursor.execute("DELETE FROM sugestoes")
+        cursor.execute('''
+            INSERT INTO pagto_meta (chave, valor) VALUES ('layout', 'contextos')
+            ON CONFLICT(chave) DO UPDATE SET valor = excluded.valor
+        ''')
+        conn.commit()
+        conn.close()
+        
+        self._particionado = True
+        return copiados
+    
+    def juntar_particoes(self) -> int:
+        """Volta ao banco único: traz os pagamentos de cada contexto para o principal e remove as partições"""
+        if not self._particionado:
+            return 0
+        
+        particoes = self._particoes()
+        conn = _nova_conexao(DB_PATH)
+        cursor = conn.cursor()
+        
+        total = 0
+        for caminho in particoes.values():
+            self._abrir(caminho).close()
+            cursor.execute("ATTACH DATABASE ? AS origem", (caminho,))
+            with self._gatilhos_pausados(cursor):
+                for tabela, colunas in COLUNAS_PARTICAO.items():
+                    self._executar(cursor, f'''
+                        INSERT OR REPLACE INTO main.{tabela} ({colunas})
+                        SELECT {colunas} FROM origem.{tabela}
+                    ''')
+                    total += cursor.rowcount
+            conn.commit()
+            cursor.execute("DETACH DATABASE origem")
+        
+        # Diários e sugestões dos contextos voltam ao principal na mesma transação que troca o
+        # layout (se for interrompido, nada é copiado duas vezes). As mudanças são intercaladas
+        # pelo momento e numeradas de novo pelo principal, depois do histórico que ele já tem
+        leitores = [_nova_conexao(caminho) for caminho in particoes.values()]
+        diarios = [leitor.execute('''
+            SELECT momento, op, pagamento_id, campos, antigos, novos, origem FROM mudancas ORDER BY seq
+        ''') for leitor in leitores]
+        cursor.executemany('''
+            INSERT INTO mudancas (momento, op, pagamento_id, campos, antigos, novos, origem)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', heapq.merge(*diarios, key=operator.itemgetter(0)))
+        cursor.execute("DELETE FROM sugestoes")
+        for leitor in leitores:
+            cursor.executemany('''
+                INSERT INTO sugestoes (contexto, campo, valor, usos) VALUES (?, ?, ?, ?)
+                ON CONFLICT (contexto, campo, valor) DO UPDATE SET usos = usos + excluded.usos
+            ''', leitor.execute("SELECT contexto, campo, valor, usos FROM sugestoes"))
+            leitor.close()
+        
+        # A sequência da tabela quente não pode reutilizar IDs já entregues pelo diretório
+        ultimo_id = cursor.execute('''
+            SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name IN ('pagamentos', 'ids_pagamentos')
+        ''').fetchone()[0]
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = 'pagamentos'")
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('pagamentos', ?)", (ultimo_id,))
+        cursor.execute("DELETE FROM ids_pagamentos")
+        cursor.execute("DELETE FROM particoes")
+        cursor.execute("UPDATE pagto_meta SET valor = 'unico' WHERE chave = 'layout'")
+        conn.commit()
+        conn.close()
+        
+        for caminho in particoes.values():
+            for sufixo in ("", "-wal", "-shm", "-journal"):
+                if os.path.exists(caminho + sufixo):
+                    os.remove(caminho + sufixo)
+        
+        self._particionado = False
+        return total
+    
+    def _copiar_banco(self, origem: str, destino: str) -> int:
+        """
+        Copia um banco com a API de backup online, PAGINAS_BACKUP páginas por passo,
+        para um .tmp verificado com quick_check e trocado no fim. Retorna as páginas copiadas.
+        """
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        temporario = destino + ".tmp"
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        
+        fonte = _nova_conexao(origem, ajustar=False)
+        alvo = _nova_conexao(temporario, ajustar=False)
+        paginas = [0]
+        fonte.backup(alvo, pages=PAGINAS_BACKUP,
+                     progress=lambda status, restantes, total: paginas.append(total))
+        verificacao = [row[0] for row in alvo.execute("PRAGMA quick_check")]
+        alvo.close()
+        fonte.close()
+        
+        if verificacao != ['ok']:
+            os.remove(temporario)
+            raise sqlite3.DatabaseError(f"cópia de {origem} falhou na verificação: {verificacao[0]}")
+        os.replace(temporario, destino)
+        return paginas[-1]
+    
+    def fazer_backup(self, destino: str) -> Dict:
+        """
+        Backup online em destino: os bancos pela API de backup do SQLite e os comprovantes
+        de forma incremental (só os novos ou alterados, comparando tamanho/mtime e SHA-256
+        com o manifesto do backup anterior). Retorna um relatório.
+        """
+        caminho_manifesto = os.path.join(destino, MANIFESTO_BACKUP)
+        try:
+            with open(caminho_manifesto, 'r', encoding='utf-8') as f:
+                manifesto = json.load(f)
+        except (OSError, ValueError):
+            manifesto = {}
+        
+        relatorio = {'bancos': {}, 'paginas': 0, 'copiados': 0, 'inalterados': 0, 'bytes': 0}
+        bancos = {}
+        for caminho in self._bancos():
+            relativo = os.path.relpath(caminho, os.path.dirname(DB_PATH))
+            copia = os.path.join(destino, relativo)
+            paginas = self._copiar_banco(caminho, copia)
+            bancos[relativo] = {'sha256': _hash_arquivo(copia), 'tamanho': os.path.getsize(copia)}
+            relatorio['bancos'][relativo] = paginas
+            relatorio['paginas'] += paginas
+        
+        indice = manifesto.get('comprovantes', {})
+        destino_comprovantes = os.path.join(destino, "comprovantes")
+        for relativo in _listar_arquivos(COMPROVANTES_DIR):
+            origem = os.path.join(COMPROVANTES_DIR, relativo)
+            copia = os.path.join(destino_comprovantes, relativo)
+            info = os.stat(origem)
+            anterior = indice.get(relativo)
+            
+            if (anterior and os.path.exists(copia) and anterior['tamanho'] == info.st_size
+                    and anterior['mtime_ns'] == info.st_mtime_ns):
+                relatorio['inalterados'] += 1
+                continue
+            
+            resumo = _hash_arquivo(origem)
+            if not (anterior and os.path.exists(copia) and anterior['sha256'] == resumo):
+                os.makedirs(os.path.dirname(copia), exist_ok=True)
+                shutil.copy2(origem, copia + ".tmp")
+                os.replace(copia + ".tmp", copia)
+                relatorio['copiados'] += 1
+                relatorio['bytes'] += info.st_size
+            else:
+                relatorio['inalterados'] += 1
+            indice[relativo] = {'tamanho': info.st_size, 'mtime_ns': info.st_mtime_ns, 'sha256': resumo}
+        
+        # O manifesto é gravado por último: um backup interrompido não é dado como completo
+        manifesto = {
+            'momento': datetime.now().isoformat(timespec='seconds'),
+            'origem': CONFIG_DIR,
+            'bancos': bancos,
+            'comprovantes': indice,
+        }
+        with open(caminho_manifesto + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=1)
+        os.replace(caminho_manifesto + ".tmp", caminho_manifesto)
+        
+        relatorio['comprovantes'] = len(indice)
+        return relatorio
+    
+    def verificar_backup(self, destino: str, completa: bool = False) -> Dict:
+        """Confere os bancos (SHA-256 e quick_check/integrity_check) e os comprovantes de um backup"""
+        with open(os.path.join(destino, MANIFESTO_BACKUP), 'r', encoding='utf-8') as f:
+            manifesto = json.load(f)
+        
+        problemas = []
+        for relativo, dados in manifesto['bancos'].items():
+            copia = os.path.join(destino, relativo)
+            if not os.path.exists(copia):
+                problemas.append(f"{relativo}: ausente")
+                continue
+            if _hash_arquivo(copia) != dados['sha256']:
+                problemas.append(f"{relativo}: conteúdo diferente do registrado")
+            conn = _nova_conexao(f"file:{copia}?mode=ro", ajustar=False, uri=True)
+            verificacao = "PRAGMA integrity_check" if completa else "PRAGMA quick_check"
+            resultado = [row[0] for row in conn.execute(verificacao)]
+            conn.close()
+            if resultado != ['ok']:
+                problemas.extend(f"{relativo}: {linha}" for linha in resultado[:20])
+        
+        for relativo, dados in manifesto['comprovantes'].items():
+            copia = os.path.join(destino, "comprovantes", relativo)
+            if not os.path.exists(copia):
+                problemas.append(f"comprovantes/{relativo}: ausente")
+            elif _hash_arquivo(copia) != dados['sha256']:
+                problemas.append(f"comprovantes/{relativo}: conteúdo diferente do registrado")
+        
+        return {
+            'momento': manifesto.get('momento'),
+            'bancos': len(manifesto['bancos']),
+            'comprovantes': len(manifesto['comprovantes']),
+            'problemas': problemas,
+        }
+    
+    def restaurar_backup(self, origem: str) -> Dict[str, int]:
+        """
+        Restaura um backup: cada banco é gravado sobre o atual pela API de backup (seguro
+        mesmo com o pagto aberto em outro processo) e os comprovantes ausentes ou diferentes
+        são copiados de volta
+        """
+        with open(os.path.join(origem, MANIFESTO_BACKUP), 'r', encoding='utf-8') as f:
+            manifesto = json.load(f)
+        
+        resultado = {'bancos': 0, 'comprovantes': 0}
+        for relativo in manifesto['bancos']:
+            atual = os.path.join(os.path.dirname(DB_PATH), relativo)
+            os.makedirs(os.path.dirname(atual), exist_ok=True)
+            fonte = _nova_conexao(f"file:{os.path.join(origem, relativo)}?mode=ro", ajustar=False, uri=True)
+            alvo = _nova_conexao(atual, ajustar=False)
+            fonte.backup(alvo, pages=PAGINAS_BACKUP)
+            alvo.close()
+            fonte.close()
+            resultado['bancos'] += 1
+        
+        for relativo, dados in manifesto['comprovantes'].items():
+            atual = os.path.join(COMPROVANTES_DIR, relativo)
+            if (os.path.exists(atual) and os.path.getsize(atual) == dados['tamanho']
+                    and _hash_arquivo(atual) == dados['sha256']):
+                continue
+            os.makedirs(os.path.dirname(atual), exist_ok=True)
+            shutil.copy2(os.path.join(origem, "comprovantes", relativo), atual)
+            resultado['comprovantes'] += 1
+        
+        self._particionado = self._ler_meta('layout') == 'contextos'
+        return resultado
+
+    def gerar_pacote(self, destino: str, filtros: Dict[str, str] = None, ordenacao: str = None,
+                     incluir_arquivados: bool = False) -> Dict:
+        """
+        Grava em destino um ZIP com os comprovantes dos pagamentos que atendem aos filtros
+        (já descomprimidos, como foram anexados) e um manifesto CSV de todos eles. Cada arquivo
+        passa em blocos direto para o ZIP, então a memória não cresce com o tamanho do pacote;
+        formatos já comprimidos entram sem nova compressão. Retorna um relatório.
+        """
+        import csv
+        import zipfile
+        
+        pagamentos = self.listar_todos(filtros=filtros, ordenacao=ordenacao, incluir_arquivados=incluir_arquivados)
+        relatorio = {'pagamentos': len(pagamentos), 'arquivos': 0, 'sem_comprovante': 0,
+                     'ausentes': [], 'bytes': 0}
+        manifesto = io.StringIO()
+        escritor = csv.writer(manifesto, delimiter=';', lineterminator='\r\n')
+        escritor.writerow(['id', 'data', 'contexto', 'categoria', 'beneficiario', 'conta', 'valor',
+                           'pendente', 'devendo_para', 'observacao', 'arquivo', 'tamanho', 'sha256'])
+        
+        temporario = destino + ".tmp"
+        with zipfile.ZipFile(temporario, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=6) as pacote:
+            for pag in pagamentos:
+                arquivo, tamanho, resumo = "", "", ""
+                caminho = os.path.join(COMPROVANTES_DIR, pag.comprovante) if pag.comprovante else None
+                if not caminho:
+                    relatorio['sem_comprovante'] += 1
+                elif not os.path.exists(caminho):
+                    relatorio['ausentes'].append(pag.id)
+                else:
+                    arquivo = f"{PASTA_PACOTE}/{_nome_original_comprovante(pag.comprovante)}"
+                    tamanho, resumo = self._adicionar_ao_pacote(pacote, caminho, arquivo)
+                    relatorio['arquivos'] += 1
+                    relatorio['bytes'] += tamanho
+                escritor.writerow([pag.id, pag.data_pagamento, pag.contexto or 'pessoal', pag.categoria,
+                                   pag.beneficiario, pag.conta, f"{pag.valor:.2f}".replace('.', ','),
+                                   "sim" if pag.pendente else "não", pag.devendo_para or "",
+                                   pag.observacao or "", arquivo, tamanho, resumo])
+            # BOM para o Excel reconhecer UTF-8; ';' e vírgula decimal como no Excel em português
+            pacote.writestr(MANIFESTO_PACOTE, "\ufeff" + manifesto.getvalue())
+        os.replace(temporario, destino)
+        
+        relatorio['tamanho_pacote'] = os.path.getsize(destino)
+        return relatorio
+    
+    def _adicionar_ao_pacote(self, pacote: "zipfile.ZipFile", caminho: str, nome: str) -> Tuple[int, str]:
+        """Copia um comprovante (descomprimindo, se guardado comprimido) para o ZIP; retorna tamanho e SHA-256"""
+        import hashlib
+        import zipfile
+        
+        info = zipfile.ZipInfo(nome, date_time=time.localtime(max(os.path.getmtime(caminho), 315532800))[:6])
+        resumo = hashlib.sha256()
+        tamanho = 0
+        with _abrir_comprovante(caminho) as entrada:
+            bloco = entrada.read(BLOCO_COMPROVANTE)
+            info.compress_type = zipfile.ZIP_STORED if _ja_comprimido(bloco[:16]) else zipfile.ZIP_DEFLATED
+            # force_zip64: o tamanho descomprimido só é conhecido no fim, e pode passar de 4 GB
+            with pacote.open(info, 'w', force_zip64=True) as saida:
+                while bloco:
+                    saida.write(bloco)
+                    resumo.update(bloco)
+                    tamanho += len(bloco)
+                    bloco = entrada.read(BLOCO_COMPROVANTE)
+        return tamanho, resumo.hexdigest()
+
+
+# Troca os separadores do formato americano (1,234.56) pelos brasileiros (1.234,56)
+_TABELA_MOEDA = str.maketrans(",.", ".,")
+
+
+def formatar_moeda(valor: float) -> str:
+    """Formata um valor como moeda brasileira"""
+    return f"R$ {valor:,.2f}".translate(_TABELA_MOEDA)
+
+
+def _codigos_compativeis(dicionario: List[str], valor_filtro: str) -> List[int]:
+    """Códigos do dicionário cujo texto casa com o filtro, com a mesma semântica LIKE do SQL"""
+    conn = sqlite3.connect(":memory:")
+    linhas = conn.execute("SELECT key FROM json_each(?) WHERE LOWER(value) LIKE ?",
+                          (json.dumps(dicionario), f"%{valor_filtro.lower()}%")).fetchall()
+    conn.close()
+    return [row[0] for row in linhas]
+
+
+def _condicao_valor(valor_filtro: str) -> Tuple[str, float]:
+    """Interpreta um filtro de valor (>100, <=50, 10.5) como (operador, número)"""
+    for operador in ('>=', '<=', '>', '<'):
+        if valor_filtro.startswith(operador):
+            return operador, float(valor_filtro[len(operador):])
+    return '=', float(valor_filtro)
+
+
+def filtrar_snapshot(snapshot: Dict, filtros: Dict[str, str]) -> Dict:
+    """Aplica os filtros ao snapshot colunar e devolve as colunas usadas nas estatísticas"""
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
     
-    def agregrar_por_categoria(self, filtros: Dict[str, str] = None) -> Dict[str, float]:
-        """Agrega os valores por categoria"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        
-        query = "SELECT categoria, SUM(valor) as total FROM pagamentos WHERE deletado = 0"
-        parametros = []
-        
-        # Aplica filtros
-        if filtros:
-            filtros_limpos = {k: v for k, v in filtros.items() if k.lower() != 'sort'}
-            if filtros_limpos:
-                where_filtros, params_filtros = self._aplicar_filtros_sql(filtros_limpos)
-                if where_filtros:
-                    query += " AND " + where_filtros
-                    parametros.extend(params_filtros)
+    operadores = {'>=': operator.ge, '<=': operator.le, '>': operator.gt,
+                  '<': operator.lt, '=': operator.eq}
+    
+    mascaras = []
+    for campo, valor_filtro in filtros.items():
+        campo_real = MAPEAMENTO_FILTROS[campo.lower()]
+        coluna = snapshot[campo_real]
         
-        query += " GROUP BY categoria ORDER BY categoria"
+        if campo_real == 'valor':
+            operador, numero = _condicao_valor(valor_filtro.lower())
+            comparar = operadores[operador]
+            if np is not None:
+                mascaras.append(comparar(np.frombuffer(coluna, dtype=coluna.typecode), numero))
+            else:
+                mascaras.append(bytes(comparar(v, numero) for v in coluna))
+            continue
         
-        cursor.execute(query, parametros)
-        resultados = cursor.fetchall()
-        conn.close()
+        if campo_real == 'pendente':
+            esperado = 1 if valor_filtro.lower() in ['s', 'sim', '1', 'true', 'yes'] else 0
+            aceitos = bytearray([esperado == 0, esperado == 1])
+        else:
+            dicionario = snapshot['dicionarios'][campo_real]
+            aceitos = bytearray(len(dicionario))
+            for codigo in _codigos_compativeis(dicionario, valor_filtro):
+                aceitos[codigo] = 1
         
-        return {row[0]: row[1] for row in resultados}
+        # Tabela de aceitação por código: a máscara por linha é uma indexação
+        if np is not None:
+            tabela = np.frombuffer(bytes(aceitos), dtype=np.bool_)
+            mascaras.append(tabela[np.frombuffer(coluna, dtype=coluna.typecode)])
+        else:
+            mascaras.append(bytes(aceitos[c] for c in coluna))
     
-    def listar_contextos(self) -> List[Dict[str, any]]:
-        """Lista todos os contextos com estatísticas"""
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
+    anos_por_data = array('l', (int(d[6:10]) if d and d[6:10].isdigit() else 0
+                                for d in snapshot['dicionarios']['data_pagamento']))
+    colunas = {'categorias': snapshot['dicionarios']['categoria']}
+    
+    if np is not None:
+        valores = np.frombuffer(snapshot['valor'], dtype=snapshot['valor'].typecode)
+        codigos = np.frombuffer(snapshot['categoria'], dtype=snapshot['categoria'].typecode)
+        datas = np.frombuffer(snapshot['data_pagamento'], dtype=snapshot['data_pagamento'].typecode)
+        anos = np.frombuffer(anos_por_data, dtype=anos_por_data.typecode)[datas] if len(anos_por_data) \
+            else np.zeros(0, dtype=np.int64)
+        if mascaras:
+            mascara = np.logical_and.reduce(mascaras)
+            valores, codigos, anos = valores[mascara], codigos[mascara], anos[mascara]
+        colunas.update(valores=valores, codigos=codigos, anos=anos)
+    else:
+        anos = array('l', (anos_por_data[d] for d in snapshot['data_pagamento']))
+        valores, codigos = snapshot['valor'], snapshot['categoria']
+        if mascaras:
+            mascara = mascaras[0] if len(mascaras) == 1 else bytes(map(all, zip(*mascaras)))
+            valores = array('d', compress(valores, mascara))
+            codigos = array('l', compress(codigos, mascara))
+            anos = array('l', compress(anos, mascara))
+        colunas.update(valores=valores, codigos=codigos, anos=anos)
+    
+    return colunas
+
+
+def _percentil_ordenado(ordenados, p: float) -> float:
+    """Percentil com interpolação linear (mesmo critério padrão do NumPy) sobre valores ordenados"""
+    if not ordenados:
+        return 0.0
+    posicao = (len(ordenados) - 1) * p / 100
+    inferior = int(posicao)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    fracao = posicao - inferior
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * fracao
+
+
+def _estatisticas_numpy(np, colunas: Dict) -> Dict:
+    """Calcula as estatísticas de forma vetorizada com NumPy"""
+    def como_numpy(dados):
+        return dados if isinstance(dados, np.ndarray) else np.frombuffer(dados, dtype=dados.typecode)
+    
+    valores = como_numpy(colunas['valores'])
+    codigos = como_numpy(colunas['codigos']).astype(np.int64, copy=False)
+    anos = como_numpy(colunas['anos'])
+    quantidade_categorias = len(colunas['categorias'])
+    
+    limites = FAIXAS_VALOR + [np.inf]
+    histograma, _ = np.histogram(valores, bins=limites)
+    
+    # Mediana por categoria: ordena por (categoria, valor) e pega o meio de cada fatia
+    ordem = np.lexsort((valores, codigos))
+    contagens = np.bincount(codigos, minlength=quantidade_categorias)
+    somas = np.bincount(codigos, weights=valores, minlength=quantidade_categorias)
+    inicios = np.concatenate(([0], np.cumsum(contagens)[:-1]))
+    ordenados = valores[ordem]
+    medianas = [float(np.median(ordenados[i:i + c])) if c else 0.0 for i, c in zip(inicios, contagens)]
+    
+    anos_unicos, inverso = np.unique(anos, return_inverse=True)
+    
+    return {
+        'quantidade': int(valores.size),
+        'total': float(valores.sum()),
+        'media': float(valores.mean()),
+        'minimo': float(valores.min()),
+        'maximo': float(valores.max()),
+        'desvio': float(valores.std()),
+        'percentis': dict(zip(PERCENTIS, (float(v) for v in np.percentile(valores, PERCENTIS)))),
+        'histograma': [int(v) for v in histograma],
+        'por_categoria': [
+            (colunas['categorias'][i], int(contagens[i]), float(somas[i]), medianas[i])
+            for i in range(quantidade_categorias)
+        ],
+        'por_ano': list(zip((int(a) for a in anos_unicos),
+                            (int(c) for c in np.bincount(inverso)),
+                            (float(t) for t in np.bincount(inverso, weights=valores)))),
+    }
+
+
+def _estatisticas_stdlib(colunas: Dict) -> Dict:
+    """Calcula as estatísticas apenas com a biblioteca padrão (sem NumPy)"""
+    valores = colunas['valores']
+    ordenados = sorted(valores)
+    quantidade = len(ordenados)
+    total = sum(ordenados)
+    media = total / quantidade
+    variancia = sum((v - media) ** 2 for v in ordenados) / quantidade
+    
+    # Histograma: cada limite de faixa é uma busca binária na lista ordenada
+    posicoes = [bisect_left(ordenados, limite) for limite in FAIXAS_VALOR[1:]]
+    histograma = [b - a for a, b in zip([0] + posicoes, posicoes + [quantidade])]
+    
+    por_codigo = [array('d') for _ in colunas['categorias']]
+    for codigo, valor in zip(colunas['codigos'], valores):
+        por_codigo[codigo].append(valor)
+    
+    por_ano = {}
+    for ano, valor in zip(colunas['anos'], valores):
+        contagem, soma = por_ano.get(ano, (0, 0.0))
+        por_ano[ano] = (contagem + 1, soma + valor)
+    
+    return {
+        'quantidade': quantidade,
+        'total': total,
+        'media': media,
+        'minimo': ordenados[0],
+        'maximo': ordenados[-1],
+        'desvio': variancia ** 0.5,
+        'percentis': {p: _percentil_ordenado(ordenados, p) for p in PERCENTIS},
+        'histograma': histograma,
+        'por_categoria': [
+            (nome, len(vals), sum(vals), _percentil_ordenado(sorted(vals), 50))
+            for nome, vals in zip(colunas['categorias'], por_codigo)
+        ],
+        'por_ano': [(ano, c, t) for ano, (c, t) in sorted(por_ano.items())],
+    }
+
+
+def calcular_estatisticas(colunas: Dict) -> Dict:
+    """Calcula as estatísticas das colunas carregadas, com NumPy quando disponível"""
+    if not len(colunas['valores']):
+        return {'quantidade': 0}
+    
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    
+    if np is not None:
+        resultado = _estatisticas_numpy(np, colunas)
+        resultado['motor'] = f"NumPy {np.__version__}"
+    else:
+        resultado = _estatisticas_stdlib(colunas)
+        resultado['motor'] = "biblioteca padrão"
+    return resultado
+
+
+class RenderizadorTabela:
+    """Escreve tabelas em blocos num único fluxo de saída, com formato de linha pré-calculado"""
+    
+    TAMANHO_BLOCO = 2000
+    
+    def __init__(self, colunas: List[Tuple[str, int, str, Optional[int]]], largura_separador: int,
+                 saida=None):
+        """
+        colunas: lista de (título, largura, alinhamento '<' ou '>', máximo de caracteres ou None)
+        """
+        self.saida = saida or sys.stdout
+        self.separador = "-" * largura_separador + "\n"
         
-        cursor.execute('''
-            SELECT 
-                contexto,
-                COUNT(*) as total_registros,
-                SUM(CASE WHEN deletado = 0 THEN 1 ELSE 0 END) as ativos,
-                SUM(CASE WHEN deletado = 0 THEN valor ELSE 0 END) as total_valor
-            FROM pagamentos
-            GROUP BY contexto
-            ORDER BY contexto
-        ''')
+        # Um único str.format por linha: largura e truncamento já embutidos no formato
+        partes = []
+        for _, largura, alinhamento, maximo in colunas:
+            precisao = f".{maximo}" if maximo else ""
+            partes.append(f"{{:{alinhamento}{largura}{precisao}}}")
+        self._formato = " ".join(partes) + "\n"
+        self._cabecalho = " ".join(f"{titulo:{alinhamento}{largura}}"
+                                   for titulo, largura, alinhamento, _ in colunas) + "\n"
+    
+    def escrever(self, texto: str):
+        """Escreve um texto livre no fluxo de saída"""
+        self.saida.write(texto)
+    
+    def escrever_cabecalho(self):
+        """Escreve o cabeçalho seguido do separador"""
+        self.saida.write(self._cabecalho + self.separador)
+    
+    def escrever_linhas(self, linhas) -> int:
+        """Formata e escreve as linhas (tuplas na ordem das colunas) em blocos"""
+        formatar = self._formato.format
+        bloco = []
+        quantidade = 0
         
-        resultados = cursor.fetchall()
-        conn.close()
+        for valores in linhas:
+            bloco.append(formatar(*valores))
+            if len(bloco) >= self.TAMANHO_BLOCO:
+                self.saida.write("".join(bloco))
+                quantidade += len(bloco)
+                bloco.clear()
         
-        contextos = []
-        for row in resultados:
-            contextos.append({
-                'contexto': row[0],
-                'total_registros': row[1],
-                'ativos': row[2],
-                'total_valor': row[3]
-            })
+        if bloco:
+            self.saida.write("".join(bloco))
+            quantidade += len(bloco)
         
-        return contextos
+        return quantidade
 
 
-def formatar_moeda(valor: float) -> str:
-    """Formata um valor como moeda brasileira"""
-    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+def _largura_id(ids, minimo: int) -> int:
+    """Largura da coluna de ID: a padrão da tabela ou, se não couber, a do maior ID (faixas de sincronização)"""
+    return max(minimo, len(str(max(ids, default=0))))
+
+
+def imprimir_tabela_pagamentos(pagamentos: List[RegistroPagamento], mostrar_status: bool = True):
+    """Imprime a tabela de pagamentos (usada por 'todos' e 'deletados') com total e contagem"""
+    largura_id = _largura_id((pag.id for pag in pagamentos), 5)
+    extra = largura_id - 5
+    colunas = [
+        ('ID', largura_id, '<', None),
+        ('Data', 12, '<', None),
+        ('Categoria', 16, '<', 15),
+        ('Beneficiário', 30, '<', 29),
+        ('Conta', 15, '<', 14),
+        ('Valor', 13, '>', None),
+    ]
+    if mostrar_status:
+        colunas.append(('St', 6, '<', None))
+    colunas += [('📎', 3, '<', None), ('📝', 3, '<', None)]
+    largura = (120 if mostrar_status else 110) + extra
+    
+    renderizador = RenderizadorTabela(colunas, largura)
+    totais = [0.0]
+    
+    def gerar_linhas():
+        for pag in pagamentos:
+            valor = pag.valor or 0.0
+            totais[0] += valor
+            
+            # Indicadores de comprovante e observação
+            comp_icon = "📎" if pag.comprovante else ""
+            obs_icon = "📝" if pag.observacao else ""
+            
+            if mostrar_status:
+                # Status do pagamento (versão curta)
+                status = "⏳Pend" if pag.pendente == 1 else "✓Pago"
+                yield (pag.id, pag.data_pagamento, pag.categoria, pag.beneficiario, pag.conta,
+                       formatar_moeda(valor), status, comp_icon, obs_icon)
+            else:
+                yield (pag.id, pag.data_pagamento, pag.categoria, pag.beneficiario, pag.conta,
+                       formatar_moeda(valor), comp_icon, obs_icon)
+    
+    renderizador.escrever_cabecalho()
+    quantidade = renderizador.escrever_linhas(gerar_linhas())
+    renderizador.escrever(renderizador.separador)
+    renderizador.escrever(f"{'TOTAL:':<{78 + extra}} {formatar_moeda(totais[0]):>13}\n")
+    renderizador.escrever(f"\nRegistros encontrados: {quantidade}\n\n")
+
+
+@contextmanager
+def _autocompletar(sugestoes: Optional[List[str]]):
+    """Completa com TAB (readline) a partir das sugestões durante um input, se houver readline"""
+    try:
+        import readline
+    except ImportError:
+        yield
+        return
+    
+    def completar(texto: str, estado: int) -> Optional[str]:
+        inicio = texto.lower()
+        opcoes = [s for s in sugestoes or [] if s.lower().startswith(inicio)]
+        return opcoes[estado] if estado < len(opcoes) else None
+    
+    completador, delimitadores = readline.get_completer(), readline.get_completer_delims()
+    readline.set_completer(completar)
+    # Sem delimitadores: valores com espaço ('Posto Silva') completam inteiros
+    readline.set_completer_delims("")
+    if 'libedit' in (readline.__doc__ or ""):
+        readline.parse_and_bind("bind ^I rl_complete")
+    else:
+        readline.parse_and_bind("tab: complete")
+    try:
+        yield
+    finally:
+        readline.set_completer(completador)
+        readline.set_completer_delims(delimitadores)
 
 
-def solicitar_input(prompt: str, obrigatorio: bool = False, default: str = None, valor_atual: str = None, permite_limpar: bool = False) -> str:
-    """Solicita input do usuário com validação"""
+def solicitar_input(prompt: str, obrigatorio: bool = False, default: str = None, valor_atual: str = None,
+                    permite_limpar: bool = False, sugestoes: List[str] = None) -> str:
+    """Solicita input do usuário com validação (sugestoes: valores já usados, para o TAB)"""
     # Se há valor atual, mostra entre colchetes
     if valor_atual:
         if permite_limpar:
@@ -554,8 +3582,13 @@ def solicitar_input(prompt: str, obrigatorio: bool = False, default: str = None,
     else:
         prompt_completo = f"{prompt}: "
     
+    if sugestoes:
+        mais = f" (+{len(sugestoes) - SUGESTOES_EXIBIDAS}, TAB completa)" if len(sugestoes) > SUGESTOES_EXIBIDAS else ""
+        print(f"  Sugestões: {', '.join(sugestoes[:SUGESTOES_EXIBIDAS])}{mais}")
+    
     while True:
-        valor = input(prompt_completo).strip()
+        with _autocompletar(sugestoes):
+            valor = input(prompt_completo).strip()
         
         # Se digitou LIMPAR (case-insensitive), retorna string vazia
         if permite_limpar and valor.upper() == "LIMPAR":
@@ -610,10 +3643,9 @@ def solicitar_data(valor_atual: str = None) -> str:
     if not data:
         return valor_atual if valor_atual else hoje
     
-    # Validação básica de formato
+    # Grava sempre com os zeros (1/2/2026 → 01/02/2026): as consultas leem a data por posição
     try:
-        datetime.strptime(data, "%d/%m/%Y")
-        return data
+        return _normalizar_data(data)
     except ValueError:
         valor_padrao = valor_atual if valor_atual else hoje
         print(f"  ⚠ Data inválida. Usando: {valor_padrao}")
@@ -658,20 +3690,16 @@ def solicitar_comprovante() -> str:
     return caminho
 
 
-def solicitar_contexto(valor_atual: str = None) -> str:
-    """Solicita o contexto do pagamento"""
-    # Lista contextos existentes
-    gerenciador = GerenciadorPagamentos()
-    contextos = gerenciador.listar_contextos()
-    
-    if contextos:
-        contextos_unicos = sorted(set([c['contexto'] for c in contextos]))
-        print(f"  Contextos disponíveis: {', '.join(contextos_unicos)}")
+def solicitar_contexto(valor_atual: str = None, sugestoes: List[str] = None) -> str:
+    """Solicita o contexto do pagamento (sugestoes: contextos em uso, dos mais usados aos menos)"""
+    if sugestoes:
+        print(f"  Contextos disponíveis: {', '.join(sugestoes)}")
     
-    if valor_atual:
-        contexto = input(f"Contexto [{valor_atual}]: ").strip().lower()
-    else:
-        contexto = input("Contexto [pessoal]: ").strip().lower()
+    with _autocompletar(sugestoes):
+        if valor_atual:
+            contexto = input(f"Contexto [{valor_atual}]: ").strip().lower()
+        else:
+            contexto = input("Contexto [pessoal]: ").strip().lower()
     
     if not contexto:
         return valor_atual if valor_atual else "pessoal"
@@ -702,15 +3730,163 @@ def parsear_filtros(args: List[str]) -> Tuple[Dict[str, str], str]:
     return filtros, ordenacao
 
 
-def comando_novo():
-    """Executa o comando 'pagto novo'"""
+def extrair_opcao(filtros: Optional[Dict[str, str]], nome: str, padrao: str = None) -> Optional[str]:
+    """Remove dos filtros uma opção do comando (ex.: limite:10) e retorna seu valor"""
+    if filtros:
+        for campo in list(filtros):
+            if campo.lower() == nome:
+                return filtros.pop(campo)
+    return padrao
+
+
+def opcao_arquivo(filtros: Optional[Dict[str, str]]) -> Optional[bool]:
+    """Opção arquivo:s/n dos relatórios: força incluir ou excluir o arquivo; ausente, decide o gerenciador"""
+    valor = extrair_opcao(filtros, 'arquivo')
+    if valor is None:
+        return None
+    return valor.lower() in ['s', 'sim', '1', 'true', 'yes']
+
+
+def _pagamento_de_campos(campos: Dict[str, str]) -> Tuple[Pagamento, str]:
+    """
+    Monta um Pagamento a partir de opções campo:valor (mesmos nomes dos filtros) e devolve
+    também o caminho do comprovante, se houver. ValueError com o motivo se algo for inválido
+    """
+    dados = {}
+    for campo, valor in campos.items():
+        coluna = MAPEAMENTO_FILTROS.get(campo.lower())
+        if coluna is None or coluna == 'id':
+            raise ValueError(f"campo desconhecido: {campo}")
+        dados[coluna] = valor.strip()
+    
+    faltando = [campo for campo in ('categoria', 'beneficiario', 'conta', 'valor') if not dados.get(campo)]
+    if faltando:
+        raise ValueError(f"faltam {', '.join(campo + ':' for campo in faltando)}")
+    try:
+        valor = float(dados['valor'].replace(",", "."))
+    except ValueError:
+        raise ValueError(f"valor inválido: {dados['valor']} (use 150.50 ou 150,50)")
+    if valor < 0:
+        raise ValueError("o valor não pode ser negativo")
+    # Aceita 1/2/2025 como o solicitar_data e grava dd/mm/aaaa: as consultas leem a data por posição
+    data_pagamento = _normalizar_data(dados.get('data_pagamento') or datetime.now().strftime("%d/%m/%Y"))
+    pendente = dados.get('pendente', 'n').lower()
+    if pendente not in ['s', 'sim', '1', 'true', 'yes', 'n', 'nao', 'não', '0', 'false', 'no']:
+        raise ValueError(f"pendente inválido: {pendente} (use s ou n)")
+    comprovante = dados.get('comprovante', '').strip('"').strip("'")
+    if comprovante and not os.path.isfile(comprovante):
+        raise ValueError(f"comprovante não encontrado: {comprovante}")
+    
+    pagamento = Pagamento(
+        categoria=dados['categoria'],
+        beneficiario=dados['beneficiario'],
+        data_pagamento=data_pagamento,
+        conta=dados['conta'],
+        valor=valor,
+        devendo_para=dados.get('devendo_para', ""),
+        pendente=pendente in ['s', 'sim', '1', 'true', 'yes'],
+        observacao=dados.get('observacao', ""),
+        contexto=(dados.get('contexto') or "pessoal").lower()
+    )
+    return pagamento, comprovante
+
+
+# Argumento de uma linha de 'pagto novo -': trechos sem espaço ou entre aspas (beneficiario:"Posto Silva")
+_ARGUMENTO_LINHA = re.compile(r'''\s*((?:[^\s"']+|"[^"]*"|'[^']*')+)''')
+_TRECHO_ENTRE_ASPAS = re.compile(r'"([^"]*)"' r"|'([^']*)'")
+
+
+def _dividir_linha(linha: str) -> List[str]:
+    """Divide uma linha em argumentos como o shell (aspas agrupam espaços), bem mais rápido que o shlex"""
+    argumentos = []
+    posicao = 0
+    while True:
+        encontrado = _ARGUMENTO_LINHA.match(linha, posicao)
+        if not encontrado:
+            if linha[posicao:].strip():
+                raise ValueError("aspas sem fechamento")
+            return argumentos
+        argumentos.append(_TRECHO_ENTRE_ASPAS.sub(
+            lambda aspas: aspas.group(1) if aspas.group(1) is not None else aspas.group(2), encontrado.group(1)))
+        posicao = encontrado.end()
+
+
+def _campos_da_linha(argumentos: List[str]) -> Dict[str, str]:
+    """Opções campo:valor de uma linha de argumentos; ValueError se algum não tiver ':'"""
+    soltos = [argumento for argumento in argumentos if ':' not in argumento]
+    if soltos:
+        raise ValueError(f"argumento sem campo: {soltos[0]} (use campo:valor)")
+    return dict(argumento.split(':', 1) for argumento in argumentos)
+
+
+def comando_novo_lote(entrada):
+    """
+    Executa 'pagto novo -': um pagamento por linha, no formato campo:valor (aspas para valores
+    com espaço, ex.: beneficiario:"Posto Silva"). Linhas vazias e começadas por # são ignoradas.
+    Valida tudo antes e grava numa única transação: com qualquer linha inválida, nada é gravado
+    """
+    pagamentos = []
+    erros = []
+    for numero, linha in enumerate(entrada, 1):
+        linha = linha.strip()
+        if not linha or linha.startswith('#'):
+            continue
+        try:
+            pagamento, comprovante = _pagamento_de_campos(_campos_da_linha(_dividir_linha(linha)))
+            if comprovante:
+                raise ValueError("comprovante não é aceito em lote (use pagto novo ... comprovante:arquivo)")
+            pagamentos.append(pagamento)
+        except ValueError as e:
+            erros.append(f"Linha {numero}: {e}")
+    
+    if erros:
+        for erro in erros[:20]:
+            print(f"✗ {erro}")
+        if len(erros) > 20:
+            print(f"✗ ... e mais {len(erros) - 20} linha(s) com erro")
+        print("\n✗ Nenhum pagamento foi registrado")
+        sys.exit(1)
+    if not pagamentos:
+        print("\nNenhum pagamento na entrada.\n")
+        return
+    
+    gerenciador = GerenciadorPagamentos()
+    inicio = time.perf_counter()
+    ids, suspeitos = gerenciador.adicionar_lote(pagamentos)
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    
+    print(f"\n✓ {len(ids)} pagamento(s) registrado(s) em {duracao_ms:.0f} ms (IDs {min(ids)} a {max(ids)})")
+    if suspeitos:
+        amostra = ", ".join(str(id_pag) for id_pag in suspeitos[:10])
+        print(f"⚠ {len(suspeitos)} possível(is) duplicata(s): IDs {amostra}{' ...' if len(suspeitos) > 10 else ''}")
+        print("💡 Confira com: pagto duplicados")
+    print()
+
+
+def comando_novo(argumentos: List[str] = None):
+    """Executa o comando 'pagto novo' (perguntando), 'pagto novo campo:valor ...' ou 'pagto novo -'"""
+    if argumentos == ['-']:
+        comando_novo_lote(sys.stdin)
+        return
+    if argumentos:
+        try:
+            pagamento, comprovante = _pagamento_de_campos(_campos_da_linha(argumentos))
+        except ValueError as e:
+            print(f"\n✗ Pagamento inválido: {e}")
+            sys.exit(1)
+        GerenciadorPagamentos().adicionar_pagamento(pagamento, caminho_comprovante=comprovante)
+        return
+    
     print("\n=== NOVO PAGAMENTO ===\n")
     
-    contexto = solicitar_contexto()
-    categoria = solicitar_input("Categoria", obrigatorio=True)
-    beneficiario = solicitar_input("Beneficiário", obrigatorio=True)
+    gerenciador = GerenciadorPagamentos()
+    contexto = solicitar_contexto(sugestoes=gerenciador.listar_sugestoes('contexto'))
+    categoria = solicitar_input("Categoria", obrigatorio=True,
+                                sugestoes=gerenciador.listar_sugestoes('categoria', contexto))
+    beneficiario = solicitar_input("Beneficiário", obrigatorio=True,
+                                   sugestoes=gerenciador.listar_sugestoes('beneficiario', contexto))
     data_pagamento = solicitar_data()
-    conta = solicitar_input("Conta", obrigatorio=True)
+    conta = solicitar_input("Conta", obrigatorio=True, sugestoes=gerenciador.listar_sugestoes('conta', contexto))
     valor = solicitar_valor()
     devendo_para = solicitar_input("Devendo para (opcional)", obrigatorio=False)
     pendente = solicitar_pendente()
@@ -729,15 +3905,45 @@ def comando_novo():
         contexto=contexto
     )
     
-    gerenciador = GerenciadorPagamentos()
     gerenciador.adicionar_pagamento(pagamento, caminho_comprovante=comprovante)
 
 
-def comando_todos(filtros: Dict[str, str] = None, ordenacao: str = None):
-    """Executa o comando 'pagto todos'"""
+def comando_todos(filtros: Dict[str, str] = None, ordenacao: str = None, acompanhar: bool = False):
+    """Executa o comando 'pagto todos' (com --acompanhar, mostra de novo a cada mudança no banco)"""
+    filtros = dict(filtros) if filtros else None
+    arquivo = extrair_opcao(filtros, 'arquivo', 'n').lower() in ['s', 'sim', '1', 'true', 'yes']
+    texto_intervalo = extrair_opcao(filtros, 'intervalo', '1')
+    try:
+        intervalo = float(texto_intervalo.replace(',', '.'))
+    except ValueError:
+        intervalo = 0
+    if intervalo <= 0:
+        print(f"\n✗ Intervalo inválido: {texto_intervalo}")
+        sys.exit(1)
+    filtros = filtros or None
+    
     gerenciador = GerenciadorPagamentos()
-    pagamentos = gerenciador.listar_todos(filtros=filtros, ordenacao=ordenacao)
+    if not acompanhar:
+        _exibir_todos(gerenciador.listar_todos(filtros=filtros, ordenacao=ordenacao, incluir_arquivados=arquivo),
+                      filtros, ordenacao)
+        return
     
+    limpar = sys.stdout.isatty()
+    try:
+        for pagamentos in gerenciador.acompanhar_listagem(filtros=filtros, ordenacao=ordenacao,
+                                                           incluir_arquivados=arquivo, intervalo=intervalo):
+            if limpar:
+                sys.stdout.write("\033[H\033[2J")
+            _exibir_todos(pagamentos, filtros, ordenacao)
+            print(f"\n🔁 Atualizado às {datetime.now().strftime('%H:%M:%S')}; mostra de novo quando o banco "
+                  f"mudar (Ctrl+C para sair)")
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        print()
+
+
+def _exibir_todos(pagamentos: List[RegistroPagamento], filtros: Dict[str, str] = None, ordenacao: str = None):
+    """Mostra a listagem de 'pagto todos' (ou a mensagem de lista vazia)"""
     if not pagamentos:
         if filtros:
             print("\nNenhum pagamento encontrado com os filtros aplicados.")
@@ -754,40 +3960,306 @@ def comando_todos(filtros: Dict[str, str] = None, ordenacao: str = None):
     
     print("\n=== TODOS OS PAGAMENTOS ===\n")
     
-    # Cabeçalho da tabela com Conta incluída
-    print(f"{'ID':<5} {'Data':<12} {'Categoria':<16} {'Beneficiário':<30} {'Conta':<15} {'Valor':>13} {'St':<6} {'📎':<3} {'📝':<3}")
-    print("-" * 120)
-    
-    total = 0.0
-    for pag in pagamentos:
+    imprimir_tabela_pagamentos(pagamentos, mostrar_status=True)
+
+
+class NavegadorPagamentos:
+    """
+    Estado de 'pagto navegar': uma janela contígua da listagem com no máximo PAGINAS_NAVEGADOR
+    páginas em volta da tela. Quando a seleção chega a uma tela da borda, a página vizinha é
+    buscada por keyset a partir da primeira ou da última linha guardada, e as linhas que ficam
+    longe da tela são descartadas, então a memória e o tempo não crescem com o tamanho do livro.
+    """
+
+    def __init__(self, gerenciador: GerenciadorPagamentos, ordem: str = 'data', descendente: bool = False):
+        self.gerenciador = gerenciador
+        self.filtros: Dict[str, str] = {}
+        self.ordem = ordem
+        self.descendente = descendente
+        self.linhas: List[Tuple] = []  # (chave, RegistroPagamento), contíguas, na ordem da listagem
+        self.posicao = 0               # posição de linhas[0] na listagem inteira
+        self.no_inicio = True
+        self.no_fim = True
+        self.topo = 0                  # índice em self.linhas da primeira linha na tela
+        self.selecionado = 0           # índice em self.linhas da linha selecionada
+        self.altura = 1
+        self.quantidade = 0
+        self.total = 0.0
+
+    @property
+    def registro(self) -> Optional[RegistroPagamento]:
+        """Pagamento selecionado (None se a listagem estiver vazia)"""
+        return self.linhas[self.selecionado][1] if self.linhas else None
+
+    def _pagina(self, a_partir: Tuple = None, para_tras: bool = False) -> List[Tuple]:
+        """Busca uma página da listagem atual"""
+        return self.gerenciador.pagina_pagamentos(self.filtros or None, self.ordem, self.descendente,
+                                                  a_partir=a_partir, para_tras=para_tras)
+
+    def filtrar(self, filtros: Dict[str, str]):
+        """Troca os filtros e volta ao início; ValueError se algum filtro for inválido"""
+        desconhecidos = [campo for campo in filtros if campo.lower() not in MAPEAMENTO_FILTROS]
+        if desconhecidos:
+            raise ValueError(f"filtro desconhecido: {', '.join(desconhecidos)}")
+        anteriores = self.filtros
+        self.filtros = dict(filtros)
         try:
-            valor = float(pag['valor'])
-            total += valor
-        except (ValueError, KeyError, TypeError):
-            valor = 0.0
-        
-        # Status do pagamento (versão curta)
-        status = "⏳Pend" if pag.get('pendente') == 1 else "✓Pago"
-        
-        # Indicador de comprovante
-        comp_icon = "📎" if pag.get('comprovante') else ""
-        
-        # Indicador de observação
-        obs_icon = "📝" if pag.get('observacao') else ""
-        
-        print(f"{pag.get('id', 0):<5} "
-              f"{pag.get('data_pagamento', ''):<12} "
-              f"{pag.get('categoria', '')[:15]:<16} "
-              f"{pag.get('beneficiario', '')[:29]:<30} "
-              f"{pag.get('conta', '')[:14]:<15} "
-              f"{formatar_moeda(valor):>13} "
-              f"{status:<6} "
-              f"{comp_icon:<3} "
-              f"{obs_icon:<3}")
-    
-    print("-" * 120)
-    print(f"{'TOTAL:':<78} {formatar_moeda(total):>13}")
-    print(f"\nRegistros encontrados: {len(pagamentos)}\n")
+            self.quantidade, self.total = self.gerenciador.resumo_listagem(self.filtros or None)
+            self.inicio()
+        except (ValueError, sqlite3.Error):
+            self.filtros = anteriores
+            raise ValueError(f"filtro inválido: {' '.join(f'{c}:{v}' for c, v in filtros.items())}")
+
+    def ordenar(self, ordem: str, descendente: bool):
+        """Troca a ordenação e volta ao início"""
+        self.ordem, self.descendente = ordem, descendente
+        self.inicio()
+
+    def inicio(self):
+        """Vai para a primeira linha da listagem"""
+        self.linhas = self._pagina()
+        self.posicao = self.topo = self.selecionado = 0
+        self.no_inicio, self.no_fim = True, len(self.linhas) < LINHAS_PAGINA_NAVEGADOR
+
+    def fim(self):
+        """Vai para a última linha da listagem"""
+        self.linhas = self._pagina(para_tras=True)
+        self.posicao = max(self.quantidade - len(self.linhas), 0)
+        self.no_inicio, self.no_fim = len(self.linhas) < LINHAS_PAGINA_NAVEGADOR, True
+        self.topo = self.selecionado = 0
+        self.mover(len(self.linhas))
+
+    def recarregar(self):
+        """Busca de novo a partir da linha do topo da tela (depois de editar ou deletar)"""
+        self.quantidade, self.total = self.gerenciador.resumo_listagem(self.filtros or None)
+        if not self.linhas:
+            self.inicio()
+            return
+        chave = self.linhas[self.topo][0]
+        deslocamento = self.selecionado - self.topo
+        self.posicao += self.topo
+        # IDs são inteiros: a chave com id ∓ 1 é o limite logo antes da própria linha do topo
+        self.linhas = self._pagina(a_partir=chave[:-1] + (chave[-1] + (1 if self.descendente else -1),))
+        self.no_inicio, self.no_fim = self.posicao == 0, len(self.linhas) < LINHAS_PAGINA_NAVEGADOR
+        self.topo, self.selecionado = 0, 0
+        self.mover(deslocamento)
+
+    def _carregar_depois(self) -> int:
+        """Acrescenta a página seguinte e descarta as linhas antigas acima da tela; retorna o deslocamento dos índices"""
+        pagina = self._pagina(a_partir=self.linhas[-1][0])
+        self.no_fim = len(pagina) < LINHAS_PAGINA_NAVEGADOR
+        self.linhas.extend(pagina)
+
+        descartar = min(len(self.linhas) - LINHAS_PAGINA_NAVEGADOR * PAGINAS_NAVEGADOR, self.topo)
+        if descartar <= 0:
+            return 0
+        del self.linhas[:descartar]
+        self.posicao += descartar
+        self.topo -= descartar
+        self.selecionado -= descartar
+        self.no_inicio = False
+        return -descartar
+
+    def _carregar_antes(self) -> int:
+        """Acrescenta a página anterior e descarta as linhas abaixo da tela; retorna o deslocamento dos índices"""
+        pagina = self._pagina(a_partir=self.linhas[0][0], para_tras=True)
+        self.no_inicio = len(pagina) < LINHAS_PAGINA_NAVEGADOR
+        self.linhas[:0] = pagina
+        self.posicao = 0 if self.no_inicio else max(self.posicao - len(pagina), 0)
+        self.topo += len(pagina)
+        self.selecionado += len(pagina)
+
+        descartar = min(len(self.linhas) - LINHAS_PAGINA_NAVEGADOR * PAGINAS_NAVEGADOR,
+                        len(self.linhas) - (self.topo + self.altura))
+        if descartar > 0:
+            del self.linhas[-descartar:]
+            self.no_fim = False
+        return len(pagina)
+
+    def mover(self, passos: int, altura: int = None):
+        """Move a seleção, buscando as páginas vizinhas antes de a tela chegar à borda da janela"""
+        self.altura = altura or self.altura
+        if not self.linhas:
+            return
+        alvo = self.selecionado + passos
+        while alvo + self.altura >= len(self.linhas) and not self.no_fim:
+            alvo += self._carregar_depois()
+        while alvo - self.altura < 0 and not self.no_inicio:
+            alvo += self._carregar_antes()
+
+        self.selecionado = max(0, min(alvo, len(self.linhas) - 1))
+        if self.selecionado < self.topo:
+            self.topo = self.selecionado
+        elif self.selecionado >= self.topo + self.altura:
+            self.topo = self.selecionado - self.altura + 1
+
+
+def _linha_navegador(registro: RegistroPagamento, largura_id: int = 7) -> str:
+    """Uma linha da tabela do navegador (mesmas colunas de 'pagto todos')"""
+    status = "Pend" if registro.pendente == 1 else "Pago"
+    marcas = ("C" if registro.comprovante else " ") + ("O" if registro.observacao else " ")
+    return (f"{registro.id:>{largura_id}} {registro.data_pagamento:<10} {registro.categoria[:15]:<15} "
+            f"{registro.beneficiario[:28]:<28} {registro.conta[:14]:<14} "
+            f"{formatar_moeda(registro.valor or 0.0):>15} {status:<4} {marcas}")
+
+
+def _detalhe_navegador(registro: RegistroPagamento) -> str:
+    """Linha de rodapé com o que não cabe na tabela: contexto, dívida, comprovante e observação"""
+    partes = [f"Contexto: {registro.contexto or '-'}"]
+    if registro.devendo_para:
+        partes.append(f"Devendo para: {registro.devendo_para}")
+    if registro.comprovante:
+        partes.append(f"Comprovante: {_nome_original_comprovante(registro.comprovante)}")
+    if registro.observacao:
+        partes.append(f"Obs.: {registro.observacao}")
+    return "  |  ".join(partes)
+
+
+def _fora_do_navegador(tela, acao):
+    """Sai do curses para uma ação interativa (editar, deletar) e volta ao navegador depois"""
+    import curses
+    curses.endwin()
+    try:
+        acao()
+        input("\nEnter para voltar ao navegador...")
+    except (KeyboardInterrupt, EOFError):
+        print()
+    tela.refresh()
+
+
+def _tela_navegador(tela, navegador: NavegadorPagamentos):
+    """Laço de desenho e teclas de 'pagto navegar' (chamado por curses.wrapper)"""
+    import curses
+    import shlex
+    try:
+        curses.curs_set(0)
+    except curses.error:
+        pass
+    tela.keypad(True)
+    ordens = list(CHAVES_NAVEGADOR)
+    mensagem = ""
+
+    def escrever(y, texto, atributo=curses.A_NORMAL):
+        try:
+            tela.addnstr(y, 0, texto.ljust(largura), largura - 1, atributo)
+        except curses.error:
+            pass
+
+    def perguntar(texto):
+        escrever(altura_tela - 1, texto)
+        curses.echo()
+        try:
+            curses.curs_set(1)
+        except curses.error:
+            pass
+        resposta = tela.getstr(altura_tela - 1, min(len(texto), largura - 2), 200)
+        curses.noecho()
+        try:
+            curses.curs_set(0)
+        except curses.error:
+            pass
+        return resposta.decode('utf-8', errors='replace').strip()
+
+    while True:
+        altura_tela, largura = tela.getmaxyx()
+        altura = max(altura_tela - 4, 1)
+        navegador.mover(0, altura)
+
+        filtros = " ".join(f"{campo}:{valor}" for campo, valor in navegador.filtros.items())
+        seta = "desc." if navegador.descendente else "cresc."
+        tela.erase()
+        escrever(0, f" pagto navegar | {navegador.quantidade} pagamentos | Total: "
+                    f"{formatar_moeda(navegador.total)} | Ordem: {navegador.ordem} ({seta})"
+                    + (f" | Filtros: {filtros}" if filtros else ""), curses.A_REVERSE)
+        # A coluna de ID acompanha o maior ID da janela carregada (estável ao rolar dentro dela)
+        largura_id = _largura_id((registro.id for _, registro in navegador.linhas), 7)
+        escrever(1, f"{'ID':>{largura_id}} {'Data':<10} {'Categoria':<15} {'Beneficiário':<28} {'Conta':<14} "
+                    f"{'Valor':>15} {'St':<4} CO", curses.A_BOLD)
+        visiveis = navegador.linhas[navegador.topo:navegador.topo + altura]
+        for n, (_, registro) in enumerate(visiveis):
+            selecionada = navegador.topo + n == navegador.selecionado
+            escrever(2 + n, _linha_navegador(registro, largura_id),
+                     curses.A_REVERSE if selecionada else curses.A_NORMAL)
+        if not visiveis:
+            escrever(3, "  Nenhum pagamento encontrado" + (" com os filtros aplicados." if filtros else "."))
+
+        registro = navegador.registro
+        if registro is not None:
+            escrever(altura_tela - 2, _detalhe_navegador(registro), curses.A_DIM)
+            posicao = f"{navegador.posicao + navegador.selecionado + 1}/{navegador.quantidade}"
+        else:
+            posicao = "0/0"
+        rodape = mensagem or ("↑↓ PgUp PgDn Home End  / filtrar  o ordem  r inverter  "
+                              "e editar  d deletar  q sair")
+        escrever(altura_tela - 1, f"{rodape:<{max(largura - len(posicao) - 2, 0)}} {posicao}")
+        tela.refresh()
+
+        tecla = tela.getch()
+        mensagem = ""
+        if tecla in (ord('q'), ord('Q'), 27):
+            return
+        elif tecla in (curses.KEY_DOWN, ord('j')):
+            navegador.mover(1)
+        elif tecla in (curses.KEY_UP, ord('k')):
+            navegador.mover(-1)
+        elif tecla in (curses.KEY_NPAGE, ord(' ')):
+            navegador.mover(altura)
+        elif tecla == curses.KEY_PPAGE:
+            navegador.mover(-altura)
+        elif tecla in (curses.KEY_HOME, ord('g')):
+            navegador.inicio()
+        elif tecla in (curses.KEY_END, ord('G')):
+            navegador.fim()
+        elif tecla == ord('/'):
+            texto = perguntar("Filtros (campo:valor ...; vazio limpa): ")
+            try:
+                filtros_novos, ordenacao = parsear_filtros(shlex.split(texto))
+                navegador.filtrar(filtros_novos)
+                if ordenacao:
+                    ordem = ordenacao.lstrip('-').lower()
+                    if ordem not in CHAVES_NAVEGADOR:
+                        raise ValueError(f"ordenação inválida: {ordenacao}")
+                    navegador.ordenar(ordem, ordenacao.startswith('-'))
+            except ValueError as e:
+                mensagem = f"✗ {str(e)[:1].upper()}{str(e)[1:]}"
+        elif tecla == ord('o'):
+            navegador.ordenar(ordens[(ordens.index(navegador.ordem) + 1) % len(ordens)], navegador.descendente)
+        elif tecla == ord('r'):
+            navegador.ordenar(navegador.ordem, not navegador.descendente)
+        elif tecla in (ord('e'), curses.KEY_ENTER, 10, 13) and registro is not None:
+            _fora_do_navegador(tela, lambda: comando_editar(str(registro.id)))
+            navegador.recarregar()
+        elif tecla in (ord('d'), curses.KEY_DC) and registro is not None:
+            _fora_do_navegador(tela, lambda: comando_delete(str(registro.id)))
+            navegador.recarregar()
+
+
+def comando_navegar(filtros: Dict[str, str] = None, ordenacao: str = None):
+    """Executa o comando 'pagto navegar [filtros] [sort:campo]' (navegador interativo da listagem)"""
+    try:
+        import curses
+    except ImportError:
+        print("\n✗ O navegador precisa do módulo curses (no Windows: pip install windows-curses)")
+        sys.exit(1)
+    if not (sys.stdin.isatty() and sys.stdout.isatty()):
+        print("\n✗ 'pagto navegar' precisa de um terminal; para arquivos e pipes use 'pagto todos'")
+        sys.exit(1)
+
+    ordem = (ordenacao or 'data').lstrip('-').lower()
+    if ordem not in CHAVES_NAVEGADOR:
+        print(f"\n✗ Ordenação inválida: {ordenacao} (use sort:{', sort:'.join(CHAVES_NAVEGADOR)})")
+        sys.exit(1)
+
+    navegador = NavegadorPagamentos(GerenciadorPagamentos(), ordem, bool(ordenacao) and ordenacao.startswith('-'))
+    try:
+        navegador.filtrar(filtros or {})
+    except ValueError as e:
+        print(f"\n✗ {str(e)[:1].upper()}{str(e)[1:]}")
+        sys.exit(1)
+
+    # Sem isso o ESC (sair) espera um segundo inteiro por uma sequência de tecla especial
+    os.environ.setdefault('ESCDELAY', '25')
+    curses.wrapper(_tela_navegador, navegador)
 
 
 def comando_categoria(filtros: Dict[str, str] = None, ordenacao: str = None):
@@ -860,6 +4332,144 @@ def comando_contextos():
     print("   Exemplo: pagto todos contexto:fazenda\n")
 
 
+def comando_estatisticas(filtros: Dict[str, str] = None):
+    """Executa o comando 'pagto estatisticas'"""
+    gerenciador = GerenciadorPagamentos()
+    
+    inicio = time.perf_counter()
+    colunas = gerenciador.carregar_colunas(filtros=filtros)
+    estat = calcular_estatisticas(colunas)
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    
+    if not estat['quantidade']:
+        if filtros:
+            print("\nNenhum pagamento encontrado com os filtros aplicados.")
+            print(f"Filtros: {filtros}")
+        else:
+            print("\nNenhum pagamento registrado ainda.")
+        return
+    
+    if filtros:
+        print(f"\n=== FILTROS APLICADOS: {filtros} ===")
+    
+    print("\n=== ESTATÍSTICAS DOS PAGAMENTOS ===\n")
+    
+    print(f"{'Registros:':<16} {estat['quantidade']}")
+    print(f"{'Total:':<16} {formatar_moeda(estat['total'])}")
+    print(f"{'Média:':<16} {formatar_moeda(estat['media'])}")
+    print(f"{'Desvio padrão:':<16} {formatar_moeda(estat['desvio'])}")
+    print(f"{'Mínimo:':<16} {formatar_moeda(estat['minimo'])}")
+    print(f"{'Máximo:':<16} {formatar_moeda(estat['maximo'])}")
+    
+    print("\nPercentis:")
+    for p, valor in estat['percentis'].items():
+        rotulo = f"P{p}" + (" (mediana)" if p == 50 else "")
+        print(f"  {rotulo:<14} {formatar_moeda(valor):>20}")
+    
+    print("\nDistribuição por faixa de valor:")
+    maior = max(estat['histograma']) or 1
+    limites = FAIXAS_VALOR + [None]
+    for inferior, superior, quantidade in zip(limites, limites[1:], estat['histograma']):
+        faixa = f"{inferior:>6} a {superior:<6}" if superior is not None else f"{'>=' + str(inferior):>6}"
+        barra = "█" * max(1 if quantidade else 0, round(40 * quantidade / maior))
+        print(f"  R$ {faixa:<16} {quantidade:>10}  {barra}")
+    
+    print(f"\n{'Categoria':<20} {'Qtd':>9} {'Total':>18} {'Média':>15} {'Mediana':>15} {'%':>6}")
+    print("-" * 88)
+    for nome, quantidade, total, mediana in sorted(estat['por_categoria'], key=lambda c: c[0] or ""):
+        if not quantidade:
+            continue
+        media = total / quantidade if quantidade else 0.0
+        parcela = 100 * total / estat['total'] if estat['total'] else 0.0
+        print(f"{nome[:19]:<20} {quantidade:>9} {formatar_moeda(total):>18} "
+              f"{formatar_moeda(media):>15} {formatar_moeda(mediana):>15} {parcela:>5.1f}%")
+    print("-" * 88)
+    
+    print(f"\n{'Ano':<8} {'Qtd':>9} {'Total':>18}")
+    print("-" * 37)
+    for ano, quantidade, total in estat['por_ano']:
+        print(f"{ano:<8} {quantidade:>9} {formatar_moeda(total):>18}")
+    print("-" * 37)
+    
+    print(f"\nCalculado em {duracao_ms:.0f} ms ({estat['motor']})\n")
+
+
+def comando_config():
+    """Executa o comando 'pagto config': caminhos em uso e PRAGMAs efetivos da conexão"""
+    arquivo = os.environ.get("PAGTO_CONFIG") or os.path.join(CONFIG_DIR, NOME_CONFIGURACAO)
+    GerenciadorPagamentos(comando="config")
+    conn = _nova_conexao(DB_PATH)
+    efetivos = {pragma: conn.execute(f"PRAGMA {pragma}").fetchone()[0] for pragma in PRAGMAS_AJUSTAVEIS}
+    conn.close()
+    
+    print("\n=== CONFIGURAÇÃO ===\n")
+    print(f"Arquivo:       {arquivo}{'' if os.path.exists(arquivo) else ' (não existe)'}")
+    print(f"Diretório:     {CONFIG_DIR}")
+    print(f"Banco:         {DB_PATH}")
+    print(f"Comprovantes:  {COMPROVANTES_DIR}")
+    print(f"Perfil SQLite: {PERFIL_SQLITE}\n")
+    for pragma, valor in efetivos.items():
+        origem = "" if pragma in AJUSTES_SQLITE else "  (padrão do SQLite)"
+        print(f"  {pragma:<13} {valor}{origem}")
+    print()
+
+
+def comando_lentas(filtros: Dict[str, str] = None):
+    """Executa o comando 'pagto lentas'"""
+    filtros = filtros or {}
+    try:
+        limite = int(filtros.get('limite', 10))
+    except ValueError:
+        print(f"\n✗ Limite inválido: {filtros.get('limite')}")
+        return
+    
+    registros = ler_consultas_lentas()
+    
+    if not registros:
+        print(f"\nNenhuma consulta lenta registrada (limiar: {LIMIAR_LENTAS_MS:g} ms).")
+        print(f"Log: {LENTAS_LOG_PATH}\n")
+        return
+    
+    # Agrupa pela instrução SQL e pelo conjunto de campos filtrados
+    grupos = {}
+    for reg in registros:
+        campos = ",".join(sorted(k.lower() for k in (reg.get('filtros') or {})))
+        chave = (reg.get('sql', ''), campos)
+        grupo = grupos.setdefault(chave, {
+            'sql': chave[0], 'campos': campos, 'ocorrencias': 0, 'total_ms': 0.0,
+            'max_ms': 0.0, 'max_linhas': 0, 'comandos': set(), 'exemplo': {}
+        })
+        duracao = float(reg.get('duracao_ms', 0))
+        grupo['ocorrencias'] += 1
+        grupo['total_ms'] += duracao
+        if duracao >= grupo['max_ms']:
+            grupo['max_ms'] = duracao
+            grupo['exemplo'] = reg.get('filtros') or {}
+        grupo['max_linhas'] = max(grupo['max_linhas'], reg.get('linhas') or 0)
+        if reg.get('comando'):
+            grupo['comandos'].add(reg['comando'])
+    
+    # Piores primeiro: maior tempo acumulado
+    piores = sorted(grupos.values(), key=lambda g: g['total_ms'], reverse=True)[:limite]
+    
+    print(f"\n=== CONSULTAS LENTAS (limiar: {LIMIAR_LENTAS_MS:g} ms, {len(registros)} registros) ===\n")
+    
+    print(f"{'#':<4} {'Ocorr.':>7} {'Total (ms)':>12} {'Média (ms)':>11} {'Máx (ms)':>10} {'Linhas':>9}  Comandos")
+    print("-" * 90)
+    
+    for posicao, grupo in enumerate(piores, start=1):
+        media = grupo['total_ms'] / grupo['ocorrencias']
+        print(f"{posicao:<4} {grupo['ocorrencias']:>7} {grupo['total_ms']:>12.1f} {media:>11.1f} "
+              f"{grupo['max_ms']:>10.1f} {grupo['max_linhas']:>9}  {', '.join(sorted(grupo['comandos']))}")
+        print(f"     SQL: {grupo['sql'][:200]}")
+        if grupo['campos']:
+            print(f"     Filtros: {grupo['campos']}  (pior caso: {grupo['exemplo']})")
+    
+    print("-" * 90)
+    print(f"Log: {LENTAS_LOG_PATH}")
+    print("💡 Combinações de filtros frequentes e lentas são boas candidatas a índices\n")
+
+
 def comando_delete(id_pagamento: str):
     """Executa o comando 'pagto delete [id]'"""
     try:
@@ -878,17 +4488,17 @@ def comando_delete(id_pagamento: str):
         return
     
     # Verifica se já está deletado
-    if pagamento.get('deletado') == 1:
+    if pagamento.deletado == 1:
         print(f"\n⚠ Pagamento ID {id_pagamento} já está deletado.")
         return
     
     # Mostra os dados do pagamento
     print(f"\n=== DELETAR PAGAMENTO ===\n")
-    print(f"ID: {pagamento.get('id')}")
-    print(f"Categoria: {pagamento.get('categoria')}")
-    print(f"Beneficiário: {pagamento.get('beneficiario')}")
-    print(f"Valor: {formatar_moeda(float(pagamento.get('valor', 0)))}")
-    print(f"Data: {pagamento.get('data_pagamento')}")
+    print(f"ID: {pagamento.id}")
+    print(f"Categoria: {pagamento.categoria}")
+    print(f"Beneficiário: {pagamento.beneficiario}")
+    print(f"Valor: {formatar_moeda(pagamento.valor or 0.0)}")
+    print(f"Data: {pagamento.data_pagamento}")
     
     # Confirmação
     confirmacao = input("\nDeseja realmente deletar este pagamento? (s/n): ").strip().lower()
@@ -923,36 +4533,719 @@ def comando_deletados(filtros: Dict[str, str] = None, ordenacao: str = None):
     
     print("\n=== PAGAMENTOS DELETADOS ===\n")
     
-    # Cabeçalho da tabela com Conta incluída
-    print(f"{'ID':<5} {'Data':<12} {'Categoria':<16} {'Beneficiário':<30} {'Conta':<15} {'Valor':>13} {'📎':<3} {'📝':<3}")
-    print("-" * 110)
+    imprimir_tabela_pagamentos(pagamentos, mostrar_status=False)
+
+
+def comando_restaurar(id_pagamento: str):
+    """Executa o comando 'pagto restaurar [id]'"""
+    try:
+        id_int = int(id_pagamento)
+    except ValueError:
+        print(f"\n✗ ID inválido: {id_pagamento}")
+        return
+    
+    gerenciador = GerenciadorPagamentos()
+    pagamento = gerenciador.buscar_por_id(id_int)
+    
+    if not pagamento:
+        print(f"\n✗ Pagamento com ID {id_pagamento} não encontrado.")
+        return
     
-    total = 0.0
-    for pag in pagamentos:
+    if gerenciador.restaurar_pagamento(id_int):
+        print(f"\n✓ Pagamento ID {id_pagamento} restaurado ({pagamento.beneficiario}, "
+              f"{formatar_moeda(pagamento.valor or 0.0)})")
+    else:
+        print(f"\n⚠ Pagamento ID {id_pagamento} não está deletado nem arquivado.")
+
+
+def comando_arquivar(filtros: Dict[str, str] = None):
+    """Executa o comando 'pagto arquivar'"""
+    antes = extrair_opcao(filtros, 'antes')
+    antes_iso = None
+    if antes:
         try:
-            valor = float(pag['valor'])
-            total += valor
-        except (ValueError, KeyError, TypeError):
-            valor = 0.0
-        
-        # Indicador de comprovante
-        comp_icon = "📎" if pag.get('comprovante') else ""
-        
-        # Indicador de observação
-        obs_icon = "📝" if pag.get('observacao') else ""
+            antes_iso = datetime.strptime(antes, "%d/%m/%Y").strftime("%Y-%m-%d")
+        except ValueError:
+            print(f"\n✗ Data inválida: {antes} (use dd/mm/aaaa)")
+            return
+    
+    gerenciador = GerenciadorPagamentos()
+    resultado = gerenciador.arquivar(antes_de=antes_iso)
+    
+    print("\n=== ARQUIVAMENTO ===\n")
+    print(f"Deletados movidos para o arquivo: {resultado['deletados']}")
+    if antes:
+        print(f"Pagamentos anteriores a {antes} arquivados: {resultado['antigos']}")
+    print(f"\nTabela principal: {resultado['quente']} registros")
+    print(f"Arquivo:          {resultado['arquivo']} registros\n")
+    print("💡 Use 'pagto todos arquivo:s' para incluir os arquivados na listagem\n")
+
+
+def _formatar_bytes(tamanho: int) -> str:
+    """Formata um tamanho em bytes de forma legível"""
+    for unidade in ('B', 'KB', 'MB', 'GB'):
+        if tamanho < 1024 or unidade == 'GB':
+            return f"{tamanho:.0f} {unidade}" if unidade == 'B' else f"{tamanho:.1f} {unidade}"
+        tamanho /= 1024
+
+
+def comando_manutencao(filtros: Dict[str, str] = None):
+    """Executa o comando 'pagto manutencao'"""
+    completa = extrair_opcao(filtros, 'completa', 'n').lower() in ['s', 'sim', '1', 'true', 'yes']
+    
+    gerenciador = GerenciadorPagamentos()
+    inicio = time.perf_counter()
+    relatorio = gerenciador.executar_manutencao(completa=completa)
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    
+    print("\n=== MANUTENÇÃO DO BANCO ===\n")
+    for nome, tempo in relatorio['etapas']:
+        print(f"  {nome:<42} {tempo:>10.1f} ms")
+    
+    antes, depois = relatorio['antes'], relatorio['depois']
+    print(f"\n{'':<20} {'Antes':>14} {'Depois':>14}")
+    print("-" * 50)
+    print(f"{'Tamanho':<20} {_formatar_bytes(antes['tamanho']):>14} {_formatar_bytes(depois['tamanho']):>14}")
+    print(f"{'Páginas':<20} {antes['paginas']:>14} {depois['paginas']:>14}")
+    print(f"{'Páginas livres':<20} {antes['livres']:>14} {depois['livres']:>14}")
+    print("-" * 50)
+    
+    integridade = relatorio['integridade']
+    if integridade == ['ok']:
+        print("\n✓ Integridade: ok")
+    else:
+        print("\n✗ Problemas de integridade encontrados:")
+        for linha in integridade[:20]:
+            print(f"  - {linha}")
+    
+    print(f"✓ Manutenção concluída em {duracao_ms:.0f} ms\n")
+    if MANUTENCAO_AUTO_ESCRITAS <= 0:
+        print("💡 Defina PAGTO_MANUTENCAO_AUTO=N para uma manutenção leve automática a cada N escritas\n")
+
+
+def comando_mudancas(filtros: Dict[str, str] = None):
+    """
+    Executa o comando 'pagto mudancas desde:<seq>': uma mudança por linha (JSON) na saída padrão.
+    No layout particionado, desde aceita a posição de cada contexto (desde:120,casa=35,fazenda=8)
+    """
+    try:
+        texto_desde = extrair_opcao(filtros, 'desde', '0')
+        if '=' in texto_desde:
+            desde = {}
+            for parte in texto_desde.split(','):
+                contexto, _, seq = parte.rpartition('=')
+                desde[contexto.strip() or None] = int(seq)
+        else:
+            desde = int(texto_desde)
+        limite = int(extrair_opcao(filtros, 'limite', '0')) or None
+    except ValueError:
+        print("\n✗ desde e limite devem ser números inteiros (ou contexto=seq, separados por vírgula)",
+              file=sys.stderr)
+        return
+    
+    gerenciador = GerenciadorPagamentos()
+    quantidade = 0
+    ultima = {}
+    saida = sys.stdout
+    for mudanca in gerenciador.listar_mudancas(desde=desde, filtros=filtros, limite=limite):
+        saida.write(json.dumps(mudanca, ensure_ascii=False) + "\n")
+        quantidade += 1
+        ultima[mudanca.get('contexto')] = mudanca['seq']
+    saida.flush()
+    
+    # Resumo na saída de erro, para não misturar com o fluxo JSON
+    if not gerenciador._particionado:
+        if ultima:
+            print(f"✓ {quantidade} mudança(s); continue com desde:{ultima[None]}", file=sys.stderr)
+        else:
+            print(f"✓ Nenhuma mudança após a seq {desde}", file=sys.stderr)
+        return
+    
+    # Cada diário segue da sua última seq (ou de onde estava, se nada veio dele)
+    anteriores = desde if isinstance(desde, dict) else dict.fromkeys([None, *gerenciador._particoes(filtros)], desde)
+    posicoes = {**anteriores, **ultima}
+    cursor = ",".join([str(posicoes.get(None, 0))]
+                      + [f"{ctx}={seq}" for ctx, seq in sorted((c, s) for c, s in posicoes.items() if c)])
+    print(f"✓ {quantidade} mudança(s); continue com desde:{cursor}", file=sys.stderr)
+
+
+def comando_sync(argumentos: List[str]):
+    """Executa o comando 'pagto sync exportar|importar <arquivo>' (ou 'pagto sync faixa:N')"""
+    argumentos = list(argumentos)
+    acao = argumentos.pop(0).lower() if argumentos and ':' not in argumentos[0] else None
+    filtros, _ = parsear_filtros(argumentos)
+    caminhos = [arg for arg in argumentos if ':' not in arg]
+    
+    gerenciador = GerenciadorPagamentos()
+    if gerenciador._particionado:
+        print("\n⚠ A sincronização usa o banco único: rode 'pagto particionar desfazer:s' antes.\n")
+        return
+    
+    faixa = extrair_opcao(filtros, 'faixa')
+    if acao is None and faixa is not None:
+        try:
+            proximo = gerenciador.definir_faixa_ids(int(faixa))
+        except ValueError:
+            print(f"\n✗ Faixa inválida: {faixa} (use 0 a {FAIXAS_SYNC - 1})")
+            return
+        print(f"\n✓ Faixa de IDs {faixa}: o próximo pagamento desta cópia terá ID {proximo}\n")
+        return
+    
+    if acao not in ('exportar', 'importar') or not caminhos:
+        print("Erro: Uso: pagto sync exportar <arquivo> [desde:seq] | pagto sync importar <arquivo> [forcar:s]"
+              " | pagto sync faixa:N")
+        sys.exit(1)
+    arquivo = os.path.expanduser(caminhos[0])
+    
+    if acao == 'exportar':
+        desde = extrair_opcao(filtros, 'desde')
+        try:
+            resultado = gerenciador.exportar_changeset(arquivo, desde=int(desde) if desde else None)
+        except (OSError, ValueError) as e:
+            print(f"\n✗ Não foi possível exportar para {arquivo}: {e}")
+            return
+        print(f"\n✓ {resultado['mudancas']} mudança(s) (seq {resultado['desde']} → {resultado['ate']}) "
+              f"gravadas em {arquivo} ({_formatar_bytes(resultado['tamanho'])})\n")
+        return
+    
+    forcar = extrair_opcao(filtros, 'forcar', 'n').lower() in ['s', 'sim', '1', 'true', 'yes']
+    try:
+        resultado = gerenciador.importar_changeset(arquivo, forcar=forcar)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"\n✗ Não foi possível importar {arquivo}: {e}")
+        return
+    
+    print("\n=== SINCRONIZAÇÃO ===\n")
+    print(f"Mudanças aplicadas:        {resultado['aplicadas']}")
+    print(f"Já importadas (puladas):   {resultado['puladas']}")
+    print(f"Conflitos:                 {len(resultado['conflitos'])}")
+    if resultado['conflitos']:
+        print()
+        for seq, op, id_pagamento, motivo in resultado['conflitos'][:50]:
+            print(f"  ⚠ seq {seq:<8} {op:<10} ID {id_pagamento:<10} {motivo}")
+        print("\n💡 Confira os pagamentos acima; com forcar:s a versão importada prevalece")
+    print()
+
+
+def comando_comprovante(argumentos: List[str]):
+    """Executa o comando 'pagto comprovante <id> [destino:arquivo|pasta|-]' ou 'pagto comprovante compactar'"""
+    argumentos = list(argumentos)
+    if argumentos and argumentos[0].lower() == 'compactar':
+        if COMPRESSAO_COMPROVANTES not in SUFIXOS_COMPRESSAO:
+            print(f"\n✗ Compressão desligada (PAGTO_COMPRESSAO={COMPRESSAO_COMPROVANTES}); use zlib ou lzma")
+            print("   Exemplo: PAGTO_COMPRESSAO=zlib pagto comprovante compactar")
+            sys.exit(1)
+        inicio = time.perf_counter()
+        resultado = GerenciadorPagamentos().compactar_comprovantes()
+        economia = resultado['antes'] - resultado['depois']
+        print(f"\n=== COMPRESSÃO DOS COMPROVANTES ({COMPRESSAO_COMPROVANTES}) ===\n")
+        print(f"Comprimidos:        {resultado['comprimidos']}")
+        print(f"Mantidos como estão: {resultado['mantidos']} (formato já comprimido ou sem ganho)")
+        if resultado['ausentes']:
+            print(f"⚠ Arquivos ausentes: {resultado['ausentes']}")
+        if resultado['antes']:
+            print(f"\n✓ {_formatar_bytes(resultado['antes'])} → {_formatar_bytes(resultado['depois'])}: "
+                  f"{_formatar_bytes(economia)} economizados ({economia * 100 / resultado['antes']:.0f}%) "
+                  f"em {time.perf_counter() - inicio:.1f} s\n")
+        else:
+            print("\n✓ Nada a comprimir\n")
+        return
+    
+    filtros, _ = parsear_filtros(argumentos)
+    ids = [arg for arg in argumentos if ':' not in arg]
+    if not ids or not ids[0].isdigit():
+        print("Erro: ID do pagamento não especificado.")
+        print("Uso: pagto comprovante <id> [destino:arquivo|pasta|-] | pagto comprovante compactar")
+        sys.exit(1)
+    
+    caminho = GerenciadorPagamentos().caminho_comprovante(int(ids[0]))
+    if not caminho:
+        print(f"\n✗ O pagamento {ids[0]} não tem comprovante.")
+        sys.exit(1)
+    if not os.path.exists(caminho):
+        print(f"\n✗ Arquivo do comprovante não encontrado: {caminho}")
+        sys.exit(1)
+    
+    destino = extrair_opcao(filtros, 'destino', '.')
+    para_saida = destino == '-'
+    if not para_saida:
+        destino = os.path.expanduser(destino)
+        if os.path.isdir(destino):
+            destino = os.path.join(destino, _nome_original_comprovante(caminho))
+        if os.path.exists(destino):
+            print(f"\n✗ {destino} já existe.")
+            sys.exit(1)
+    
+    # Descomprime em blocos, direto para o destino (ou para a saída padrão, com destino:-)
+    tamanho = 0
+    with _abrir_comprovante(caminho) as entrada:
+        saida = sys.stdout.buffer if para_saida else open(destino + ".tmp", 'wb')
+        try:
+            for bloco in iter(lambda: entrada.read(BLOCO_COMPROVANTE), b""):
+                saida.write(bloco)
+                tamanho += len(bloco)
+        finally:
+            if not para_saida:
+                saida.close()
+    if para_saida:
+        sys.stdout.buffer.flush()
+        return
+    os.replace(destino + ".tmp", destino)
+    
+    guardado = os.path.getsize(caminho)
+    print(f"\n✓ Comprovante salvo em {destino} ({_formatar_bytes(tamanho)})")
+    if guardado < tamanho:
+        print(f"  Guardado com {_formatar_bytes(guardado)} ({(tamanho - guardado) * 100 / tamanho:.1f}% menor)")
+    print()
+
+
+def comando_pacote(argumentos: List[str]):
+    """Executa o comando 'pagto pacote <destino.zip> [filtros]'"""
+    filtros, ordenacao = parsear_filtros(argumentos)
+    caminhos = [arg for arg in argumentos if ':' not in arg]
+    if not caminhos:
+        print("Erro: Arquivo do pacote não especificado.")
+        print("Uso: pagto pacote <destino.zip> [filtros]")
+        sys.exit(1)
+    destino = os.path.abspath(os.path.expanduser(caminhos[0]))
+    if not destino.lower().endswith(".zip"):
+        destino += ".zip"
+    if os.path.exists(destino):
+        print(f"\n✗ {destino} já existe.")
+        sys.exit(1)
+    incluir_arquivados = extrair_opcao(filtros, 'arquivo', 'n').lower() in ['s', 'sim', '1', 'true', 'yes']
+    
+    inicio = time.perf_counter()
+    relatorio = GerenciadorPagamentos().gerar_pacote(destino, filtros=filtros if filtros else None,
+                                                     ordenacao=ordenacao, incluir_arquivados=incluir_arquivados)
+    duracao = time.perf_counter() - inicio
+    
+    print("\n=== PACOTE DE COMPROVANTES ===\n")
+    if filtros:
+        print(f"Filtros:            {filtros}")
+    print(f"Pagamentos:         {relatorio['pagamentos']} (todos no {MANIFESTO_PACOTE})")
+    print(f"Comprovantes:       {relatorio['arquivos']} ({_formatar_bytes(relatorio['bytes'])})")
+    print(f"Sem comprovante:    {relatorio['sem_comprovante']}")
+    if relatorio['ausentes']:
+        amostra = ", ".join(str(i) for i in relatorio['ausentes'][:10])
+        print(f"⚠ Arquivo ausente:  {len(relatorio['ausentes'])} (IDs {amostra}"
+              f"{'...' if len(relatorio['ausentes']) > 10 else ''})")
+    print(f"\n✓ {destino} ({_formatar_bytes(relatorio['tamanho_pacote'])}) em {duracao:.1f} s\n")
+
+
+def comando_backup(argumentos: List[str]):
+    """Executa o comando 'pagto backup [verificar|restaurar] <destino>'"""
+    argumentos = list(argumentos)
+    acao = argumentos.pop(0).lower() if argumentos and argumentos[0].lower() in ('verificar', 'restaurar') else None
+    filtros, _ = parsear_filtros(argumentos)
+    caminhos = [arg for arg in argumentos if ':' not in arg]
+    if not caminhos:
+        print("Erro: Diretório do backup não especificado.")
+        print("Uso: pagto backup <destino> | pagto backup verificar <destino> | pagto backup restaurar <destino>")
+        sys.exit(1)
+    destino = os.path.abspath(os.path.expanduser(caminhos[0]))
+    
+    gerenciador = GerenciadorPagamentos()
+    inicio = time.perf_counter()
+    
+    if acao == 'verificar':
+        completa = extrair_opcao(filtros, 'completa', 'n').lower() in ['s', 'sim', '1', 'true', 'yes']
+        try:
+            resultado = gerenciador.verificar_backup(destino, completa=completa)
+        except (OSError, ValueError) as e:
+            print(f"\n✗ Backup inválido em {destino}: {e}")
+            return
+        print(f"\n=== VERIFICAÇÃO DO BACKUP ({resultado['momento']}) ===\n")
+        print(f"Bancos:        {resultado['bancos']}")
+        print(f"Comprovantes:  {resultado['comprovantes']}")
+        if resultado['problemas']:
+            print("\n✗ Problemas encontrados:")
+            for problema in resultado['problemas'][:20]:
+                print(f"  - {problema}")
+        else:
+            print(f"\n✓ Backup íntegro ({(time.perf_counter() - inicio) * 1000:.0f} ms)\n")
+        return
+    
+    if acao == 'restaurar':
+        if not os.path.exists(os.path.join(destino, MANIFESTO_BACKUP)):
+            print(f"\n✗ Nenhum backup encontrado em {destino}")
+            return
+        confirmacao = input(f"\nOs dados atuais em {CONFIG_DIR} serão substituídos pelo backup. "
+                            f"Continuar? (s/n): ").strip().lower()
+        if confirmacao not in ['s', 'sim', 'yes', 'y']:
+            print("\n✗ Operação cancelada.")
+            return
+        resultado = gerenciador.restaurar_backup(destino)
+        print(f"\n✓ {resultado['bancos']} banco(s) e {resultado['comprovantes']} comprovante(s) restaurados "
+              f"em {(time.perf_counter() - inicio) * 1000:.0f} ms\n")
+        return
+    
+    resultado = gerenciador.fazer_backup(destino)
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    
+    print("\n=== BACKUP ===\n")
+    for banco, paginas in resultado['bancos'].items():
+        print(f"  {banco:<40} {paginas:>10} páginas")
+    print(f"\nComprovantes copiados:    {resultado['copiados']} ({_formatar_bytes(resultado['bytes'])})")
+    print(f"Comprovantes inalterados: {resultado['inalterados']}")
+    print(f"\n✓ Backup concluído em {destino} ({duracao_ms:.0f} ms)")
+    print(f"💡 Confira com: pagto backup verificar {destino}\n")
+
+
+def comando_particionar(filtros: Dict[str, str] = None):
+    """Executa o comando 'pagto particionar'"""
+    desfazer = extrair_opcao(filtros, 'desfazer', 'n').lower() in ['s', 'sim', '1', 'true', 'yes']
+    gerenciador = GerenciadorPagamentos()
+    
+    if desfazer:
+        if not gerenciador._particionado:
+            print("\n⚠ O banco já está no layout único.\n")
+            return
+        total = gerenciador.juntar_particoes()
+        print(f"\n✓ {total} registros trazidos de volta para {DB_PATH}")
+        print("💡 Rode 'pagto manutencao' para compactar o banco principal\n")
+        return
+    
+    if gerenciador._particionado:
+        print(f"\n⚠ O banco já está particionado por contexto ({CONTEXTOS_DIR}).\n")
+        return
+    
+    copiados = gerenciador.particionar()
+    print("\n=== BANCO PARTICIONADO POR CONTEXTO ===\n")
+    print(f"{'Contexto':<20} {'Registros':>12}")
+    print("-" * 33)
+    for contexto, linhas in sorted(copiados.items()):
+        print(f"{contexto:<20} {linhas:>12}")
+    print("-" * 33)
+    print(f"\n✓ Bancos dos contextos em {CONTEXTOS_DIR}")
+    print("💡 Rode 'pagto manutencao' para devolver o espaço do banco principal")
+    print("   Para voltar ao banco único: pagto particionar desfazer:s\n")
+
+
+def _recorrente_novo(gerenciador: GerenciadorPagamentos, filtros: Dict[str, str]):
+    """Cria um modelo recorrente pelas opções campo:valor, perguntando o que faltar"""
+    interativo = not filtros
+    print("\n=== NOVO PAGAMENTO RECORRENTE ===\n")
+    
+    contexto = (extrair_opcao(filtros, 'contexto') or (
+        solicitar_contexto(sugestoes=gerenciador.listar_sugestoes('contexto')) if interativo else "pessoal")).lower()
+    categoria = extrair_opcao(filtros, 'categoria') or solicitar_input(
+        "Categoria", obrigatorio=True, sugestoes=gerenciador.listar_sugestoes('categoria', contexto))
+    beneficiario = extrair_opcao(filtros, 'beneficiario') or solicitar_input(
+        "Beneficiário", obrigatorio=True, sugestoes=gerenciador.listar_sugestoes('beneficiario', contexto))
+    conta = extrair_opcao(filtros, 'conta') or solicitar_input(
+        "Conta", obrigatorio=True, sugestoes=gerenciador.listar_sugestoes('conta', contexto))
+    valor = extrair_opcao(filtros, 'valor')
+    intervalo = extrair_opcao(filtros, 'intervalo') or (
+        solicitar_input("Intervalo (mensal, semanal, quinzenal, anual, 15d, 2m...)", default="mensal")
+        if interativo else "mensal")
+    hoje = datetime.now().strftime("%d/%m/%Y")
+    inicio = extrair_opcao(filtros, 'inicio') or (
+        solicitar_input("Primeiro vencimento (dd/mm/aaaa)", default=hoje) if interativo else hoje)
+    parcelas = extrair_opcao(filtros, 'parcelas')
+    if parcelas is None and interativo:
+        parcelas = solicitar_input("Quantidade de parcelas (vazio = sem limite)")
+    fim = extrair_opcao(filtros, 'fim')
+    if fim is None and interativo and not parcelas:
+        fim = solicitar_input("Último vencimento até (dd/mm/aaaa, vazio = sem data final)")
+    devendo_para = extrair_opcao(filtros, 'devendo', "") or (
+        solicitar_input("Devendo para (opcional)") if interativo else "")
+    observacao = extrair_opcao(filtros, 'observacao', "") or (
+        solicitar_input("Observação (opcional)") if interativo else "")
+    
+    try:
+        valor = float(valor.replace(",", ".")) if valor else solicitar_valor()
+        passo, unidade = _parsear_intervalo(intervalo)
+        data_inicio = datetime.strptime(inicio, "%d/%m/%Y").date()
+        data_fim = datetime.strptime(fim, "%d/%m/%Y").date() if fim else None
+        parcelas = int(parcelas) if parcelas else None
+        if parcelas is not None and parcelas <= 0:
+            raise ValueError("a quantidade de parcelas deve ser positiva")
+    except ValueError as e:
+        print(f"\n✗ Recorrência inválida: {e}")
+        sys.exit(1)
+    
+    modelo = Pagamento(categoria=categoria, beneficiario=beneficiario, conta=conta, valor=valor,
+                       devendo_para=devendo_para, observacao=observacao, contexto=contexto)
+    recorrencia_id = gerenciador.criar_recorrencia(modelo, data_inicio, passo, unidade,
+                                                   parcelas=parcelas, termino=data_fim)
+    
+    limite = f"{parcelas} parcelas" if parcelas else (f"até {fim}" if fim else "sem data final")
+    print(f"\n✓ Recorrência #{recorrencia_id} criada: {beneficiario}, {formatar_moeda(valor)}, "
+          f"{_descrever_intervalo(passo, unidade)} a partir de {inicio} ({limite})")
+    print("💡 Crie os vencimentos com: pagto recorrente gerar [ate:dd/mm/aaaa]\n")
+
+
+def comando_recorrente(argumentos: List[str]):
+    """Executa o comando 'pagto recorrente [novo|listar|gerar|remover]'"""
+    argumentos = list(argumentos)
+    acao = argumentos.pop(0).lower() if argumentos and ':' not in argumentos[0] else 'listar'
+    filtros, _ = parsear_filtros(argumentos)
+    gerenciador = GerenciadorPagamentos()
+    
+    if acao == 'novo':
+        _recorrente_novo(gerenciador, filtros)
+        return
+    
+    if acao == 'remover':
+        ids = [arg for arg in argumentos if ':' not in arg]
+        if not ids or not ids[0].isdigit():
+            print("Erro: ID da recorrência não especificado.")
+            print("Uso: pagto recorrente remover [id]")
+            sys.exit(1)
+        if gerenciador.remover_recorrencia(int(ids[0])):
+            print(f"\n✓ Recorrência #{ids[0]} removida (os pagamentos já gerados foram mantidos)\n")
+        else:
+            print(f"\n✗ Recorrência #{ids[0]} não encontrada.\n")
+        return
+    
+    if acao == 'gerar':
+        ate = extrair_opcao(filtros, 'ate')
+        try:
+            data_limite = datetime.strptime(ate, "%d/%m/%Y").date() if ate else None
+        except ValueError:
+            print(f"\n✗ Data inválida: {ate}")
+            sys.exit(1)
+        inicio = time.perf_counter()
+        geradas = gerenciador.gerar_recorrencias(ate=data_limite)
+        duracao_ms = (time.perf_counter() - inicio) * 1000
         
-        print(f"{pag.get('id', 0):<5} "
-              f"{pag.get('data_pagamento', ''):<12} "
-              f"{pag.get('categoria', '')[:15]:<16} "
-              f"{pag.get('beneficiario', '')[:29]:<30} "
-              f"{pag.get('conta', '')[:14]:<15} "
-              f"{formatar_moeda(valor):>13} "
-              f"{comp_icon:<3} "
-              f"{obs_icon:<3}")
+        if not geradas:
+            print(f"\n✓ Nenhum vencimento novo até {ate or 'hoje'}\n")
+            return
+        print("\n=== VENCIMENTOS GERADOS ===\n")
+        for recorrencia_id, quantidade in sorted(geradas.items()):
+            print(f"  Recorrência #{recorrencia_id:<6} {quantidade:>6} pagamento(s)")
+        print(f"\n✓ {sum(geradas.values())} pagamento(s) pendente(s) criados em {duracao_ms:.0f} ms")
+        print("💡 Veja com: pagto todos pendente:s\n")
+        return
+    
+    if acao != 'listar':
+        print("Erro: Uso: pagto recorrente [listar] | novo [campo:valor...] | gerar [ate:dd/mm/aaaa] | remover [id]")
+        sys.exit(1)
+    
+    recorrencias = gerenciador.listar_recorrencias()
+    if not recorrencias:
+        print("\nNenhum pagamento recorrente cadastrado.")
+        print("💡 Cadastre com: pagto recorrente novo\n")
+        return
+    
+    print("\n=== PAGAMENTOS RECORRENTES ===\n")
+    print(f"{'ID':<5} {'Beneficiário':<25} {'Valor':>14} {'Intervalo':<11} {'Próxima':<11} "
+          f"{'Geradas':>9} {'Contexto':<12}")
+    print("-" * 92)
+    for r in recorrencias:
+        proxima = r['proxima'].strftime("%d/%m/%Y") if r['proxima'] else "concluída"
+        geradas = f"{r['geradas']}/{r['parcelas']}" if r['parcelas'] else str(r['geradas'])
+        print(f"{r['id']:<5} {r['beneficiario'][:25]:<25} {formatar_moeda(r['valor']):>14} "
+              f"{_descrever_intervalo(r['passo'], r['unidade']):<11} {proxima:<11} {geradas:>9} "
+              f"{(r['contexto'] or '')[:12]:<12}")
+    print("-" * 92)
+    print()
+
+
+def comando_fluxo(filtros: Dict[str, str] = None):
+    """Executa o comando 'pagto fluxo [por:dia|semana|mes] [ate:dd/mm/aaaa] [filtros]'"""
+    por = extrair_opcao(filtros, 'por', 'mes').lower()
+    if por not in CHAVES_FLUXO:
+        print(f"\n✗ Agrupamento inválido: {por} (use por:dia, por:semana ou por:mes)")
+        sys.exit(1)
+    ate = extrair_opcao(filtros, 'ate')
+    try:
+        data_limite = datetime.strptime(ate, "%d/%m/%Y").date() if ate else None
+    except ValueError:
+        print(f"\n✗ Data inválida: {ate}")
+        sys.exit(1)
+
+    gerenciador = GerenciadorPagamentos()
+    periodos = gerenciador.projetar_fluxo(filtros=filtros if filtros else None, por=por, ate=data_limite)
+    invalidos = gerenciador.pendentes_com_data_invalida(filtros=filtros if filtros else None)
+    data_limite = data_limite or date.today() + timedelta(days=DIAS_FLUXO_PADRAO)
+
+    nomes = {'dia': "por dia", 'semana': "por semana", 'mes': "por mês"}
+    print(f"\n=== FLUXO DE CAIXA PREVISTO ({nomes[por]}, até {data_limite.strftime('%d/%m/%Y')}) ===\n")
+    if invalidos:
+        exemplos = ", ".join(f"{id_pag} ({data})" for id_pag, data in invalidos[:5])
+        print(f"⚠ {len(invalidos)} pendente(s) com data inválida ficaram fora do fluxo: {exemplos}"
+              f"{' ...' if len(invalidos) > 5 else ''}")
+        print("  Corrija com: pagto editar [id]\n")
+    if not periodos:
+        print("Nenhum pagamento pendente ou recorrente no período.\n")
+        return
+
+    print(f"  {'Período':<16} {'Qtde':>6} {'Pendentes':>17} {'Recorrentes':>17} {'Total':>17} {'Acumulado':>17}")
+    print("-" * 99)
+    for p in periodos:
+        try:
+            if por == 'mes':
+                rotulo = datetime.strptime(p['periodo'], "%Y-%m").strftime("%m/%Y")
+            else:
+                rotulo = datetime.strptime(p['periodo'], "%Y-%m-%d").strftime("%d/%m/%Y")
+                if por == 'semana':
+                    rotulo = f"sem. {rotulo}"
+        except (TypeError, ValueError):
+            # Não deveria chegar aqui (datas inválidas ficam fora da consulta), mas não derruba o relatório
+            rotulo = f"? {p['periodo'] or ''}"
+        alerta = "⚠" if p['vencido'] else " "
+        print(f"{alerta} {rotulo:<16} {p['quantidade']:>6} {formatar_moeda(p['pendentes']):>17} "
+              f"{formatar_moeda(p['previstos']):>17} {formatar_moeda(p['total']):>17} "
+              f"{formatar_moeda(p['acumulado']):>17}")
+    print("-" * 99)
+
+    print(f"{'TOTAL:':<18} {sum(p['quantidade'] for p in periodos):>6} "
+          f"{formatar_moeda(sum(p['pendentes'] for p in periodos)):>17} "
+          f"{formatar_moeda(sum(p['previstos'] for p in periodos)):>17} "
+          f"{formatar_moeda(periodos[-1]['acumulado']):>17}")
+    vencido = sum(p['vencido'] for p in periodos)
+    if vencido:
+        print(f"\n⚠ Vencidos (pendentes com data anterior a hoje): {formatar_moeda(vencido)}")
+    print("\n💡 Recorrentes: vencimentos de 'pagto recorrente' ainda não gerados\n")
+
+
+def _data_iso_para_br(data_iso: Optional[str]) -> str:
+    """aaaa-mm-dd → dd/mm/aaaa (para exibir as datas ISO das consultas agregadas)"""
+    if not data_iso:
+        return "-"
+    return f"{data_iso[8:10]}/{data_iso[5:7]}/{data_iso[:4]}"
+
+
+def comando_extrato(filtros: Dict[str, str] = None):
+    """Executa o comando 'pagto extrato [conta:nome] [filtros]'"""
+    incluir_arquivados = opcao_arquivo(filtros)
+    detalhado = any(MAPEAMENTO_FILTROS.get(campo.lower()) == 'conta' for campo in (filtros or {}))
+    gerenciador = GerenciadorPagamentos()
+
+    if detalhado:
+        linhas = gerenciador.extrato_por_conta(filtros=filtros, incluir_arquivados=incluir_arquivados)
+        largura_id = _largura_id((linha[1] for linha in linhas), 5)
+        extra = largura_id - 5
+        renderizador = RenderizadorTabela([
+            ('ID', largura_id, '<', None),
+            ('Data', 12, '<', None),
+            ('Categoria', 16, '<', 15),
+            ('Beneficiário', 30, '<', 29),
+            ('Valor', 15, '>', None),
+            ('Acumulado', 17, '>', None),
+            ('St', 6, '<', None),
+        ], 107 + extra)
+        renderizador.escrever("\n=== EXTRATO POR CONTA ===\n")
+        if not linhas:
+            renderizador.escrever("\nNenhum pagamento encontrado para os filtros informados.\n\n")
+            return
+
+        for conta, grupo in groupby(linhas, key=operator.itemgetter(0)):
+            ultimo = [0.0]
+
+            def gerar_linhas(grupo=grupo):
+                for _, id_pag, data_pag, categoria, beneficiario, valor, pendente, acumulado in grupo:
+                    ultimo[0] = acumulado
+                    yield (id_pag, data_pag, categoria, beneficiario, formatar_moeda(valor),
+                           formatar_moeda(acumulado), "⏳Pend" if pendente == 1 else "✓Pago")
+
+            renderizador.escrever(f"\n🏦 {conta}\n\n")
+            renderizador.escrever_cabecalho()
+            quantidade = renderizador.escrever_linhas(gerar_linhas())
+            renderizador.escrever(renderizador.separador)
+            renderizador.escrever(f"{'SUBTOTAL (' + str(quantidade) + ' pagamentos):':<{65 + extra}} "
+                                  f"{formatar_moeda(ultimo[0]):>15}\n")
+
+    saldos = gerenciador.saldos_por_conta(filtros=filtros, incluir_arquivados=incluir_arquivados)
+    print("\n=== TOTAIS POR CONTA ===\n")
+    if not saldos:
+        print("Nenhum pagamento encontrado.\n")
+        return
+    print(f"{'Conta':<20} {'Qtde':>8} {'Total':>17} {'Pendentes':>17} {'%':>6} {'Primeiro':>11} {'Último':>11}")
+    print("-" * 96)
+    for s in saldos:
+        print(f"{s['conta'][:20]:<20} {s['quantidade']:>8} {formatar_moeda(s['total']):>17} "
+              f"{formatar_moeda(s['pendentes']):>17} {s['participacao'] or 0:>5.1f}% "
+              f"{_data_iso_para_br(s['primeiro']):>11} {_data_iso_para_br(s['ultimo']):>11}")
+    print("-" * 96)
+    print(f"{'TOTAL:':<20} {sum(s['quantidade'] for s in saldos):>8} "
+          f"{formatar_moeda(sum(s['total'] for s in saldos)):>17} "
+          f"{formatar_moeda(sum(s['pendentes'] for s in saldos)):>17}")
+    if not detalhado:
+        print("\n💡 Use conta:nome para ver cada pagamento com o acumulado da conta")
+        print("   Exemplo: pagto extrato conta:nubank data:2026")
+    print()
+
+
+def comando_ranking(filtros: Dict[str, str] = None):
+    """Executa o comando 'pagto ranking [por:beneficiario|conta|categoria] [limite:N] [filtros]'"""
+    por = extrair_opcao(filtros, 'por', 'beneficiario').lower()
+    if por not in COLUNAS_RANKING:
+        print(f"\n✗ Agrupamento inválido: {por} (use por:{', por:'.join(COLUNAS_RANKING)})")
+        sys.exit(1)
+    limite = extrair_opcao(filtros, 'limite', '10')
+    if not limite.isdigit() or int(limite) <= 0:
+        print(f"\n✗ Limite inválido: {limite}")
+        sys.exit(1)
+    incluir_arquivados = opcao_arquivo(filtros)
+
+    gerenciador = GerenciadorPagamentos()
+    inicio = time.perf_counter()
+    linhas = gerenciador.ranking(por=por, limite=int(limite), filtros=filtros if filtros else None,
+                                 incluir_arquivados=incluir_arquivados)
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+
+    print(f"\n=== RANKING POR {por.upper()} (top {limite}) ===\n")
+    if not linhas:
+        print("Nenhum pagamento encontrado.\n")
+        return
+
+    print(f"{'#':>4}  {'Nome':<30} {'Qtde':>8} {'Total':>17} {'Média':>14} {'%':>6} {'% acum.':>8}")
+    print("-" * 95)
+    for linha in linhas:
+        media = linha['total'] / linha['quantidade'] if linha['quantidade'] else 0.0
+        print(f"{linha['posicao']:>4}  {(linha['grupo'] or '(vazio)')[:30]:<30} {linha['quantidade']:>8} "
+              f"{formatar_moeda(linha['total']):>17} {formatar_moeda(media):>14} "
+              f"{linha['participacao'] or 0:>5.1f}% {linha['acumulado'] or 0:>7.1f}%")
+
+    geral = linhas[0]
+    restantes = geral['grupos'] - len(linhas)
+    if restantes > 0:
+        outros_quantidade = geral['quantidade_geral'] - sum(linha['quantidade'] for linha in linhas)
+        outros_total = geral['total_geral'] - sum(linha['total'] for linha in linhas)
+        participacao = outros_total * 100.0 / geral['total_geral'] if geral['total_geral'] else 0.0
+        print(f"{'':>4}  {f'Outros ({restantes})':<30} {outros_quantidade:>8} "
+              f"{formatar_moeda(outros_total):>17} {'':>14} {participacao:>5.1f}%")
+    print("-" * 95)
+    print(f"{'':>4}  {'TOTAL:':<30} {geral['quantidade_geral']:>8} {formatar_moeda(geral['total_geral']):>17}")
+    print(f"\n✓ {geral['grupos']} grupo(s) em {duracao_ms:.0f} ms\n")
+
+
+def comando_duplicados(filtros: Dict[str, str] = None):
+    """Executa o comando 'pagto duplicados [janela:dias] [filtros]'"""
+    janela = extrair_opcao(filtros, 'janela', str(JANELA_DUPLICADOS_DIAS))
+    if not janela.isdigit():
+        print(f"\n✗ Janela inválida: {janela} (use o número de dias, ex.: janela:0)")
+        sys.exit(1)
+    
+    gerenciador = GerenciadorPagamentos()
+    inicio = time.perf_counter()
+    grupos = gerenciador.encontrar_duplicados(filtros=filtros if filtros else None, janela=int(janela))
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    
+    print(f"\n=== POSSÍVEIS DUPLICATAS (mesmo beneficiário, valor e conta; até {janela} dia(s)) ===\n")
+    if not grupos:
+        print(f"✓ Nenhuma duplicata encontrada ({duracao_ms:.0f} ms)\n")
+        return
     
-    print("-" * 110)
-    print(f"{'TOTAL:':<78} {formatar_moeda(total):>13}")
-    print(f"\nRegistros encontrados: {len(pagamentos)}\n")
+    largura_id = _largura_id((pag.id for grupo in grupos for pag in grupo), 7)
+    for numero, grupo in enumerate(grupos, 1):
+        primeiro = grupo[0]
+        print(f"🔁 Grupo {numero}: {primeiro.beneficiario} - {formatar_moeda(primeiro.valor)} - "
+              f"{primeiro.conta} ({len(grupo)} pagamentos)")
+        for pag in grupo:
+            status = "⏳Pend" if pag.pendente == 1 else "✓Pago"
+            comp_icon = "📎" if pag.comprovante else ""
+            print(f"   {pag.id:<{largura_id}} {pag.data_pagamento:<12} {pag.categoria[:15]:<16} "
+                  f"{pag.contexto[:12]:<13} {status:<6} {comp_icon}")
+        print()
+    
+    excedentes = sum(len(grupo) - 1 for grupo in grupos)
+    print(f"✓ {len(grupos)} grupo(s), {excedentes} pagamento(s) possivelmente repetido(s) ({duracao_ms:.0f} ms)")
+    print("💡 Para remover um repetido: pagto delete <id>  (janela:0 mostra só datas iguais)\n")
 
 
 def comando_editar(id_pagamento: str):
@@ -973,7 +5266,7 @@ def comando_editar(id_pagamento: str):
         return
     
     # Verifica se está deletado
-    if pagamento.get('deletado') == 1:
+    if pagamento.deletado == 1:
         print(f"\n✗ Não é possível editar um pagamento deletado.")
         return
     
@@ -982,30 +5275,34 @@ def comando_editar(id_pagamento: str):
     print("Digite LIMPAR para apagar o campo\n")
     
     # Mostra contexto atual
-    print(f"🏷️  Contexto atual: {pagamento.get('contexto', 'pessoal')}")
+    print(f"🏷️  Contexto atual: {pagamento.contexto or 'pessoal'}")
     
     # Mostra comprovante atual se existir
-    if pagamento.get('comprovante'):
-        print(f"📎 Comprovante atual: {pagamento.get('comprovante')}")
+    if pagamento.comprovante:
+        print(f"📎 Comprovante atual: {pagamento.comprovante}")
     
     # Mostra observação atual se existir
-    if pagamento.get('observacao'):
-        print(f"📝 Observação atual: {pagamento.get('observacao')}\n")
+    if pagamento.observacao:
+        print(f"📝 Observação atual: {pagamento.observacao}\n")
     
     # Solicita novos valores (mostrando os atuais)
-    contexto = solicitar_contexto(valor_atual=pagamento.get('contexto'))
-    categoria = solicitar_input("Categoria", obrigatorio=True, valor_atual=pagamento.get('categoria'))
-    beneficiario = solicitar_input("Beneficiário", obrigatorio=True, valor_atual=pagamento.get('beneficiario'))
-    data_pagamento = solicitar_data(valor_atual=pagamento.get('data_pagamento'))
-    conta = solicitar_input("Conta", obrigatorio=True, valor_atual=pagamento.get('conta'))
-    valor = solicitar_valor(valor_atual=str(pagamento.get('valor')))
-    devendo_para = solicitar_input("Devendo para", obrigatorio=False, valor_atual=pagamento.get('devendo_para'), permite_limpar=True)
-    pendente = solicitar_pendente(valor_atual=str(pagamento.get('pendente')))
-    observacao = solicitar_input("Observação", obrigatorio=False, valor_atual=pagamento.get('observacao'), permite_limpar=True)
+    contexto = solicitar_contexto(valor_atual=pagamento.contexto,
+                                  sugestoes=gerenciador.listar_sugestoes('contexto'))
+    categoria = solicitar_input("Categoria", obrigatorio=True, valor_atual=pagamento.categoria,
+                                sugestoes=gerenciador.listar_sugestoes('categoria', contexto))
+    beneficiario = solicitar_input("Beneficiário", obrigatorio=True, valor_atual=pagamento.beneficiario,
+                                   sugestoes=gerenciador.listar_sugestoes('beneficiario', contexto))
+    data_pagamento = solicitar_data(valor_atual=pagamento.data_pagamento)
+    conta = solicitar_input("Conta", obrigatorio=True, valor_atual=pagamento.conta,
+                            sugestoes=gerenciador.listar_sugestoes('conta', contexto))
+    valor = solicitar_valor(valor_atual=str(pagamento.valor))
+    devendo_para = solicitar_input("Devendo para", obrigatorio=False, valor_atual=pagamento.devendo_para, permite_limpar=True)
+    pendente = solicitar_pendente(valor_atual=str(pagamento.pendente))
+    observacao = solicitar_input("Observação", obrigatorio=False, valor_atual=pagamento.observacao, permite_limpar=True)
     
     # Pergunta sobre comprovante
     comprovante = None
-    if pagamento.get('comprovante'):
+    if pagamento.comprovante:
         atualizar_comprovante = input("Atualizar comprovante? (s/n) [Não]: ").strip().lower()
         if atualizar_comprovante in ['s', 'sim', 'yes', 'y']:
             comprovante = solicitar_comprovante()
@@ -1046,14 +5343,47 @@ def mostrar_ajuda():
 Comandos disponíveis:
 
   pagto novo              - Registra um novo pagamento (com contexto, comprovante e observação)
+  pagto novo campo:valor  - Registra sem perguntas; 'pagto novo -' lê vários da entrada padrão
   pagto todos             - Lista todos os pagamentos em formato tabular
+  pagto todos --acompanhar - Mantém a lista na tela, atualizada quando o banco muda (intervalo:N)
+  pagto navegar           - Navegador interativo da lista (filtrar, ordenar, editar, deletar)
   pagto categoria         - Mostra total agregado por categoria
   pagto contextos         - Lista todos os contextos com estatísticas
   pagto delete [id]       - Marca um pagamento como deletado
   pagto deletados         - Lista todos os pagamentos deletados
+  pagto restaurar [id]    - Restaura um pagamento deletado ou arquivado
+  pagto arquivar          - Move deletados (e antigos, com antes:dd/mm/aaaa) para o arquivo
   pagto editar [id]       - Edita um pagamento existente
+  pagto duplicados        - Pagamentos possivelmente repetidos (janela:dias, filtros)
+  pagto ranking           - Maiores beneficiários, contas ou categorias (por:..., limite:N, filtros)
+  pagto extrato           - Totais por conta; com conta:nome, cada pagamento com o acumulado
+  pagto fluxo             - Saídas previstas (pendentes e recorrentes) por dia, semana ou mês
+  pagto recorrente        - Pagamentos recorrentes (novo, listar, gerar ate:dd/mm/aaaa, remover [id])
+  pagto manutencao        - ANALYZE, vacuum incremental e verificação de integridade (completa:s)
+  pagto mudancas          - Exporta o diário de mudanças em JSON, uma por linha (desde:seq, limite:N)
+  pagto sync exportar|importar <arquivo> - Sincroniza cópias do banco por changesets
+  pagto comprovante [id]  - Extrai o comprovante de um pagamento (destino:...); compactar comprime os antigos
+  pagto pacote <arq.zip>  - ZIP com os comprovantes e um manifesto CSV dos pagamentos filtrados
+  pagto backup <destino>  - Backup online do banco e incremental dos comprovantes (verificar, restaurar)
+  pagto particionar       - Passa a usar um banco por contexto (desfazer:s volta ao banco único)
+  pagto estatisticas      - Média, mediana, percentis e distribuições (aceita filtros)
+  pagto lentas            - Resume as consultas mais lentas registradas (limite:N)
+  pagto config            - Mostra os caminhos e os ajustes do SQLite em uso
   pagto ajuda             - Mostra esta mensagem de ajuda
 
+Novo pagamento sem perguntas:
+  pagto novo aceita os campos no formato campo:valor (os nomes dos filtros):
+  categoria, beneficiario, conta e valor são obrigatórios; data (padrão: hoje),
+  pendente, devendo, observacao, contexto e comprovante são opcionais.
+  Com '-', lê um pagamento por linha da entrada padrão e grava todos numa única
+  transação (se alguma linha for inválida, nenhum é gravado).
+
+  Exemplos:
+    pagto novo categoria:Luz beneficiario:CEMIG conta:Nubank valor:150,50
+    pagto novo categoria:Diesel "beneficiario:Posto Silva" conta:Itau valor:300 contexto:fazenda pendente:s
+    pagto novo - < pagamentos.txt
+      (linhas como: categoria:Luz beneficiario:"Posto Silva" conta:Itau valor:80 data:05/03/2026)
+
 Contextos:
   Separe seus pagamentos por contexto (pessoal, fazenda, trabalho, etc.)
   O contexto padrão é "pessoal"
@@ -1062,8 +5392,11 @@ Contextos:
     pagto todos contexto:fazenda       - Lista apenas pagamentos da fazenda
     pagto categoria contexto:trabalho  - Categorias do contexto trabalho
     pagto contextos                    - Lista todos os contextos
+  
+  No 'pagto novo' e no 'pagto editar', contexto, categoria, beneficiário e conta
+  sugerem os valores já usados (os do contexto escolhido primeiro); TAB completa.
 
-Filtros (aplicáveis em todos, categoria e deletados):
+Filtros (aplicáveis em todos, categoria, estatisticas e deletados):
   Use o formato campo:valor para filtrar resultados
   
   Campos disponíveis:
@@ -1088,6 +5421,215 @@ Ordenação (aplicável em todos e deletados):
     sort:valor                 - Ordena por valor ascendente
     sort:-valor                - Ordena por valor descendente
 
+Consultas lentas:
+  Instruções que demoram mais que PAGTO_LENTAS_MS (padrão: 200 ms) são gravadas
+  em {LENTAS_LOG_PATH} (com rotação), junto dos filtros usados e do comando
+  
+  Exemplos:
+    pagto lentas                       - Piores consultas por tempo acumulado
+    pagto lentas limite:5              - Apenas as 5 piores
+    PAGTO_LENTAS_MS=0 pagto todos      - Registra todas as instruções desta execução
+
+Arquivo de pagamentos:
+  Pagamentos deletados são movidos para uma tabela de arquivo, mantendo a
+  tabela principal pequena. 'deletados', 'restaurar' e 'editar' leem o arquivo
+  de forma transparente; 'todos' só inclui os arquivados com arquivo:s. Os
+  relatórios (categoria, estatisticas, ranking, extrato, fluxo) contam os ativos
+  arquivados com 'arquivar antes:', então os totais não mudam ao arquivar
+  
+  Exemplos:
+    pagto arquivar                     - Arquiva deletados remanescentes
+    pagto arquivar antes:01/01/2020    - Arquiva também os anteriores a 2020
+    pagto todos arquivo:s              - Lista incluindo os arquivados
+    pagto restaurar 12                 - Volta o pagamento 12 para a tabela principal
+
+Manutenção:
+  pagto manutencao atualiza as estatísticas do planejador (ANALYZE, PRAGMA optimize),
+  devolve páginas livres ao sistema (vacuum incremental) e roda quick_check.
+  Com completa:s, faz VACUUM completo e integrity_check.
+  PAGTO_MANUTENCAO_AUTO=N roda uma manutenção leve a cada N escritas.
+
+Diário de mudanças:
+  Toda inclusão, alteração, exclusão, arquivamento e restauração é registrada por
+  gatilhos com uma sequência crescente (seq), os campos alterados e os valores
+  antigos e novos. pagto mudancas desde:N devolve só o que mudou depois de N.
+  No banco por contexto, cada contexto tem a sua sequência: o resumo mostra a posição
+  de cada um para continuar (desde:120,casa=35,fazenda=8), e limite:N vale para o total.
+  
+  Exemplos:
+    pagto mudancas                     - Todo o diário
+    pagto mudancas desde:120           - Só as mudanças após a seq 120
+    pagto mudancas desde:120 limite:50 - No máximo 50 mudanças
+
+Sincronização entre máquinas:
+  pagto sync exportar grava num arquivo pequeno (gzip) só as mudanças feitas nesta
+  cópia desde a última exportação; pagto sync importar aplica o arquivo da outra
+  cópia numa transação, pulando o que já foi importado. Mudanças no mesmo ID feitas
+  nas duas cópias são relatadas como conflito (forcar:s faz a importada prevalecer).
+  Antes da primeira sincronização, reserve em cada máquina uma faixa de IDs diferente
+  (faixa:0 a faixa:9), para que os pagamentos novos das duas cópias não colidam.
+  
+  Exemplos:
+    pagto sync faixa:0                          - No computador, IDs seguem como estão
+    pagto sync faixa:1                          - No notebook, IDs a partir de 1000000001
+    pagto sync exportar /mnt/pendrive/note.gz   - Exporta as mudanças locais
+    pagto sync importar /mnt/pendrive/pc.gz     - Aplica as mudanças da outra máquina
+
+Backup:
+  pagto backup copia o banco com a API de backup online do SQLite (em passos, sem
+  bloquear quem está gravando) e só os comprovantes novos ou alterados desde o
+  último backup no mesmo destino. O manifesto backup.json registra os SHA-256.
+  
+  Exemplos:
+    pagto backup /mnt/externo/pagto              - Faz (ou atualiza) o backup
+    pagto backup verificar /mnt/externo/pagto    - Confere hashes e integridade (completa:s)
+    pagto backup restaurar /mnt/externo/pagto    - Restaura banco e comprovantes
+
+Banco por contexto:
+  pagto particionar separa cada contexto em seu próprio banco em {CONTEXTOS_DIR}.
+  Comandos filtrados por contexto:nome abrem só o banco daquele contexto; os demais
+  (ex.: pagto contextos) anexam os bancos e agregam entre eles. Os IDs continuam únicos.
+
+Pagamentos recorrentes:
+  Aluguel, parcelas e salários viram modelos com intervalo (mensal, semanal, quinzenal,
+  anual, 15d, 2m...), primeiro vencimento e limite por parcelas:N ou fim:dd/mm/aaaa.
+  pagto recorrente gerar cria de uma vez, como pendentes, os vencimentos até hoje (ou
+  até ate:dd/mm/aaaa). Rodar de novo não duplica: cada modelo lembra até onde já gerou.
+  
+  Exemplos:
+    pagto recorrente novo                            - Cadastra perguntando os campos
+    pagto recorrente novo categoria:Moradia beneficiario:Imobiliária conta:Itaú valor:1500
+    pagto recorrente novo categoria:Financiamento beneficiario:Banco conta:Caixa valor:2300 intervalo:mensal inicio:10/01/2026 parcelas:48 contexto:fazenda
+    pagto recorrente gerar ate:31/12/2026            - Cria os vencimentos do ano
+    pagto recorrente                                 - Lista modelos e próximos vencimentos
+    pagto recorrente remover 3                       - Remove o modelo (mantém os já gerados)
+
+Duplicatas:
+  pagto duplicados agrupa pagamentos com o mesmo beneficiário, valor e conta (sem
+  diferenciar maiúsculas nem espaços nas pontas) com datas a até janela:N dias
+  (padrão: 3) umas das outras. Aceita os filtros de 'todos'. O 'pagto novo' avisa
+  na hora quando o pagamento registrado se parece com um já existente.
+
+  Exemplos:
+    pagto duplicados                            - Todas as possíveis duplicatas
+    pagto duplicados janela:0 data:2026         - Só repetidos no mesmo dia, em 2026
+    pagto duplicados contexto:fazenda conta:itau
+
+Acompanhar a listagem:
+  pagto todos --acompanhar (com os filtros de sempre) deixa a lista na tela e só
+  consulta e desenha de novo quando algum processo grava no banco. Enquanto nada
+  muda, a cada intervalo:N segundos (padrão: 1) só é lido o PRAGMA data_version,
+  na mesma conexão: custa quase nada, ao contrário de 'watch pagto todos'.
+
+  Exemplos:
+    pagto todos pendente:s --acompanhar                 - Pendentes, sempre atualizados
+    pagto todos contexto:fazenda --acompanhar intervalo:5
+
+Navegador interativo:
+  pagto navegar abre a lista dos pagamentos ativos numa tela de terminal (curses).
+  Só as linhas em volta da tela são buscadas, página a página a partir da última
+  linha vista (sem OFFSET), então abrir e rolar é imediato mesmo com milhões de
+  pagamentos. Aceita os filtros de 'todos' e sort:data|valor|categoria|
+  beneficiario|conta|id (com - para decrescente; nos textos, o valor desempata).
+
+  Teclas: ↑↓ (j/k), PgUp/PgDn, Home/End (g/G), / muda os filtros (aceita sort:),
+  o troca a ordem, r inverte, e (ou Enter) edita, d deleta, q (ou Esc) sai.
+
+  Exemplos:
+    pagto navegar                               - Tudo, em ordem cronológica
+    pagto navegar contexto:fazenda sort:-valor  - Maiores pagamentos da fazenda primeiro
+
+Ranking:
+  pagto ranking ordena beneficiários (padrão), contas, categorias ou contextos pelo
+  total pago, com quantidade, média, participação e participação acumulada.
+  Aceita os filtros de 'todos', por:, limite:N (padrão: 10) e arquivo:s/n.
+
+  Exemplos:
+    pagto ranking data:2026                     - Top 10 beneficiários de 2026
+    pagto ranking por:categoria contexto:fazenda limite:5
+    pagto ranking por:conta pendente:s          - Contas com mais pendências
+
+Extrato por conta:
+  pagto extrato mostra o total, os pendentes e o período de cada conta. Com conta:nome,
+  lista também os pagamentos da conta em ordem cronológica com o acumulado, para
+  conferir com o extrato do banco. Aceita os filtros de 'todos' e arquivo:s/n.
+
+  Exemplos:
+    pagto extrato                               - Totais de todas as contas
+    pagto extrato conta:nubank data:2026        - Pagamentos do Nubank em 2026, com acumulado
+    pagto extrato conta:itau pendente:n         - Só os já pagos, para conciliar
+
+Fluxo de caixa:
+  pagto fluxo soma, por período, os pagamentos pendentes (inclusive os vencidos) e os
+  vencimentos das recorrências ainda não gerados, com o total acumulado. Aceita os
+  filtros de 'todos', por:dia|semana|mes (padrão: mes) e ate:dd/mm/aaaa (padrão: 90 dias).
+
+  Exemplos:
+    pagto fluxo                                 - Próximos 90 dias, por mês
+    pagto fluxo por:semana contexto:fazenda     - Semanas da fazenda
+    pagto fluxo por:dia ate:31/12/2026          - Dia a dia até o fim do ano
+
+Estatísticas:
+  pagto estatisticas aceita os mesmos filtros de 'todos'. Na primeira execução após
+  uma alteração no banco, um snapshot colunar é gravado em {ANALISE_DIR}
+  (as seguintes leem só os arrays). Com NumPy instalado, os cálculos são vetorizados.
+  
+  Exemplos:
+    pagto estatisticas                      - Todos os pagamentos ativos
+    pagto estatisticas contexto:fazenda     - Apenas a fazenda
+    pagto estatisticas valor:>100 data:2025 - Valores acima de 100 em 2025
+
+Diretório de dados:
+  Defina PAGTO_DIR para usar outro diretório (ex.: bancos de teste ou benchmark)
+  Exemplo: PAGTO_DIR=/tmp/pagto-teste pagto todos
+  PAGTO_DIR=:memoria: usa um diretório temporário em memória, apagado ao sair.
+  Os comprovantes ficam em pastas por faixa de ID, com até {COMPROVANTES_POR_PASTA} arquivos cada
+  (ex.: comprovantes/0001/1234_Posto_300.pdf); os da versão anterior são movidos sozinhos.
+
+Comprovantes:
+  Por padrão o comprovante é guardado como foi anexado. Com PAGTO_COMPRESSAO=zlib ele
+  é guardado comprimido (.gz; lzma guarda em .xz, menor e mais lento), exceto formatos
+  que já são comprimidos (JPEG, PNG, ZIP...) ou quando o ganho é menor que 10%.
+  pagto comprovante <id> devolve o arquivo original, descomprimido em blocos.
+
+  Exemplos:
+    pagto comprovante 1234                      - Salva o original na pasta atual
+    pagto comprovante 1234 destino:~/recibo.pdf - Salva com outro nome
+    pagto comprovante 1234 destino:- | lpr      - Manda para a saída padrão
+    PAGTO_COMPRESSAO=zlib pagto comprovante compactar - Comprime os já guardados
+
+  pagto pacote gera um ZIP com os comprovantes originais dos pagamentos que atendem
+  aos filtros de 'todos' (e arquivo:s) e o {MANIFESTO_PACOTE} de todos eles (com ';' e
+  vírgula decimal, para o Excel), indicando o arquivo, o tamanho e o SHA-256 de cada um.
+  Os arquivos vão em blocos para o ZIP: a memória não cresce com o tamanho do pacote.
+
+  Exemplos:
+    pagto pacote fazenda-2025.zip contexto:fazenda data:2025
+    pagto pacote ~/contador/marco.zip data:/03/2026 pendente:n
+
+  O arquivo pagto.conf no diretório de dados (ou em PAGTO_CONFIG) pode mover o banco
+  e os comprovantes e ajustar o SQLite; as variáveis PAGTO_BANCO, PAGTO_COMPROVANTES,
+  PAGTO_PERFIL e PAGTO_SQLITE têm precedência sobre ele:
+
+    [caminhos]
+    banco = /mnt/ssd/pagto/pagamentos.db   ; os bancos dos contextos ficam ao lado
+    comprovantes = ~/Documentos/comprovantes
+
+    [sqlite]
+    perfil = rapido                        ; padrao, rapido, seguro ou memoria
+    cache_size = -131072                   ; também: mmap_size, temp_store, journal_mode, synchronous
+
+  O perfil rapido usa WAL com synchronous=NORMAL: uma queda de energia pode perder
+  as últimas escritas, e uma escrita em dois bancos (layout por contexto) não é
+  atômica entre eles. O perfil memoria não protege contra quedas: só para testes.
+  Exemplo: PAGTO_SQLITE="cache_size=-65536,synchronous=OFF" pagto estatisticas
+
+Vários processos ao mesmo tempo:
+  As escritas pegam o lock do banco logo no início (BEGIN IMMEDIATE) e esperam até
+  PAGTO_BUSY_TIMEOUT_MS (padrão: 5000) se outro processo estiver gravando; persistindo,
+  tentam de novo PAGTO_TENTATIVAS_ESCRITA vezes (padrão: 5) com espera aleatória.
+  O comprovante é copiado na mesma transação do pagamento: ou ficam os dois, ou nenhum.
+
 Edição de campos:
   Durante a edição, use a palavra LIMPAR para apagar um campo opcional
   Exemplo: ao editar "Devendo para", digite LIMPAR para remover o valor
@@ -1139,13 +5681,46 @@ def main():
     filtros, ordenacao = parsear_filtros(sys.argv[2:]) if len(sys.argv) > 2 else ({}, None)
     
     if comando == "novo":
-        comando_novo()
+        comando_novo(sys.argv[2:])
     elif comando == "todos":
-        comando_todos(filtros=filtros if filtros else None, ordenacao=ordenacao)
+        comando_todos(filtros=filtros if filtros else None, ordenacao=ordenacao,
+                      acompanhar='--acompanhar' in sys.argv[2:])
+    elif comando == "navegar":
+        comando_navegar(filtros=filtros if filtros else None, ordenacao=ordenacao)
     elif comando == "categoria":
         comando_categoria(filtros=filtros if filtros else None, ordenacao=ordenacao)
     elif comando == "contextos":
         comando_contextos()
+    elif comando == "manutencao":
+        comando_manutencao(filtros=filtros)
+    elif comando == "mudancas":
+        comando_mudancas(filtros=filtros)
+    elif comando == "sync":
+        comando_sync(sys.argv[2:])
+    elif comando == "backup":
+        comando_backup(sys.argv[2:])
+    elif comando == "comprovante":
+        comando_comprovante(sys.argv[2:])
+    elif comando == "pacote":
+        comando_pacote(sys.argv[2:])
+    elif comando == "duplicados":
+        comando_duplicados(filtros=filtros)
+    elif comando == "ranking":
+        comando_ranking(filtros=filtros)
+    elif comando == "extrato":
+        comando_extrato(filtros=filtros)
+    elif comando == "fluxo":
+        comando_fluxo(filtros=filtros)
+    elif comando == "recorrente":
+        comando_recorrente(sys.argv[2:])
+    elif comando == "particionar":
+        comando_particionar(filtros=filtros)
+    elif comando == "estatisticas":
+        comando_estatisticas(filtros=filtros if filtros else None)
+    elif comando == "lentas":
+        comando_lentas(filtros=filtros)
+    elif comando == "config":
+        comando_config()
     elif comando == "delete":
         # Para delete, o segundo argumento é o ID, não um filtro
         if len(sys.argv) < 3 or ':' in sys.argv[2]:
@@ -1155,6 +5730,14 @@ def main():
         comando_delete(sys.argv[2])
     elif comando == "deletados":
         comando_deletados(filtros=filtros if filtros else None, ordenacao=ordenacao)
+    elif comando == "restaurar":
+        if len(sys.argv) < 3 or ':' in sys.argv[2]:
+            print("Erro: ID do pagamento não especificado.")
+            print("Uso: pagto restaurar [id]")
+            sys.exit(1)
+        comando_restaurar(sys.argv[2])
+    elif comando == "arquivar":
+        comando_arquivar(filtros=filtros)
     elif comando == "editar":
         # Para editar, o segundo argumento é o ID, não um filtro
         if len(sys.argv) < 3 or ':' in sys.argv[2]:
@@ -1171,4 +5754,10 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except BrokenPipeError:
+        # Saída encerrada antes do fim (ex.: pagto todos | head): sai sem traceback
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)